@@ -0,0 +1,228 @@
+import time
+import asyncio
+import argparse
+import bittensor as bt
+
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, List, Optional
+
+"""
+Continuous batching for the streaming miner. Instead of every request running its own token loop, a single scheduler
+steps all active streams together with one model call per decode step. New requests join the batch between two
+steps and finished ones leave it, so the batch stays full while requests come and go.
+
+Run this file to watch the scheduler serve concurrent streams with the stand-in model:
+    python batching.py --streams 16 --max_batch_size 8
+"""
+
+
+class EchoModel:
+    """
+    A stand-in for a language model with the interface used by the scheduler. It "generates" the tokens of the
+    prompt, one per decode step, and runs on CPU.
+
+    Args:
+        tokenize (Callable[[str], List[str]]): Splits a prompt into the strings of its tokens, e.g.
+            `StreamEngine.tokenize`.
+    """
+
+    def __init__(self, tokenize: Callable[[str], List[str]]):
+        self.tokenize = tokenize
+
+    def prefill(self, prompt: str) -> dict:
+        """Processes the prompt and returns the state of its sequence."""
+        return {"tokens": self.tokenize(prompt), "position": 0}
+
+    def step(self, states: List[dict]) -> List[Optional[str]]:
+        """
+        Runs one decode step for a batch of sequences, advancing their states. Returns the next token of each
+        sequence, or None for the sequences that finished.
+        """
+        tokens = []
+        for state in states:
+            if state["position"] < len(state["tokens"]):
+                tokens.append(state["tokens"][state["position"]])
+                state["position"] += 1
+            else:
+                tokens.append(None)
+        return tokens
+
+
+class _Sequence:
+    def __init__(self, prompt: str, paused: Callable[[], bool] = None):
+        self.prompt = prompt
+        self.paused = paused
+        self.state = None
+        self.tokens: asyncio.Queue = asyncio.Queue()
+        self.cancelled = False
+
+
+class BatchScheduler:
+    """
+    Steps all active streams through one shared model call per decode step.
+
+    Requests are submitted with `generate`, which returns an async iterator of the tokens of the completion, so it
+    can be used in place of `StreamEngine.generate`. Prompts are prefilled and decode steps run in an executor, so
+    the event loop keeps sending tokens while the model works. A stream whose client went away leaves the batch at
+    the next step, and a stream whose client reads slowly is skipped by the decode steps while it is paused, so its
+    tokens do not pile up in memory.
+
+    Args:
+        model: The model, with `prefill(prompt) -> state` and `step(states) -> tokens` like `EchoModel`.
+        max_batch_size (int): Maximum number of streams stepped together; the others wait for a free slot.
+        step_delay (float): Minimum duration of a decode step in seconds, to simulate the latency of a real model.
+    """
+
+    def __init__(
+        self, model, max_batch_size: int = 32, step_delay: float = 0.0
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.step_delay = step_delay
+        self.waiting: Deque[_Sequence] = deque()
+        self.active: List[_Sequence] = []
+        self._wakeup: asyncio.Event = None
+        self._task: asyncio.Task = None
+
+        self.steps = 0
+        self.tokens = 0
+        self.completed = 0
+        self.skipped = 0
+
+    async def generate(
+        self, prompt: str, paused: Callable[[], bool] = None
+    ) -> AsyncIterator[str]:
+        """
+        Submits the prompt and yields the tokens of its completion as the batch produces them. The stream is skipped
+        by the decode steps while `paused()` returns True, e.g. `StreamWriter.is_paused`.
+        """
+        sequence = _Sequence(prompt, paused)
+        self.waiting.append(sequence)
+        self._ensure_running()
+        self._wakeup.set()
+        try:
+            while True:
+                token = await sequence.tokens.get()
+                if token is None:
+                    return
+                if isinstance(token, Exception):
+                    raise token
+                yield token
+        finally:
+            # Leaves the batch at the next step if the client went away.
+            sequence.cancelled = True
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.active and not self.waiting:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # New requests join the batch between two steps.
+            joining = []
+            free = self.max_batch_size - len(self.active)
+            while self.waiting and len(joining) < free:
+                sequence = self.waiting.popleft()
+                if not sequence.cancelled:
+                    joining.append(sequence)
+            for sequence in joining:
+                try:
+                    sequence.state = await loop.run_in_executor(
+                        None, self.model.prefill, sequence.prompt
+                    )
+                    self.active.append(sequence)
+                except Exception as e:
+                    bt.logging.error(f"Prefill failed: {e}")
+                    sequence.tokens.put_nowait(e)
+
+            self.active = [s for s in self.active if not s.cancelled]
+            stepping = [
+                s for s in self.active if s.paused is None or not s.paused()
+            ]
+            if not stepping:
+                if self.active:
+                    # Every client is reading slowly; give them time to catch up.
+                    self.skipped += len(self.active)
+                    await asyncio.sleep(max(self.step_delay, 0.001))
+                continue
+
+            start_time = time.perf_counter()
+            try:
+                tokens = await loop.run_in_executor(
+                    None, self.model.step, [s.state for s in stepping]
+                )
+            except Exception as e:
+                bt.logging.error(f"Decode step failed: {e}")
+                for sequence in stepping:
+                    sequence.tokens.put_nowait(e)
+                failed = set(stepping)
+                self.active = [s for s in self.active if s not in failed]
+                continue
+            self.steps += 1
+            self.skipped += len(self.active) - len(stepping)
+
+            # Finished streams leave the batch.
+            finished = set()
+            for sequence, token in zip(stepping, tokens):
+                sequence.tokens.put_nowait(token)
+                if token is None:
+                    self.completed += 1
+                    finished.add(sequence)
+                else:
+                    self.tokens += 1
+            self.active = [s for s in self.active if s not in finished]
+
+            if self.step_delay > 0:
+                await asyncio.sleep(
+                    max(
+                        self.step_delay - (time.perf_counter() - start_time), 0
+                    )
+                )
+
+    def stats(self) -> dict:
+        """Returns the scheduler counters and the mean batch size."""
+        return {
+            "active": len(self.active),
+            "waiting": len(self.waiting),
+            "steps": self.steps,
+            "tokens": self.tokens,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "mean_batch_size": self.tokens / self.steps if self.steps else 0.0,
+        }
+
+
+async def main(args):
+    scheduler = BatchScheduler(
+        EchoModel(str.split),
+        max_batch_size=args.max_batch_size,
+        step_delay=args.step_delay,
+    )
+
+    async def stream(index):
+        prompt = " ".join(f"s{index}w{i}" for i in range(args.tokens))
+        tokens = [token async for token in scheduler.generate(prompt)]
+        assert tokens == prompt.split()
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(stream(index) for index in range(args.streams)))
+    elapsed = time.perf_counter() - start_time
+    print(f"elapsed:         {elapsed:.3f}s")
+    print(f"stats:           {scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve concurrent streams with the stand-in model."
+    )
+    parser.add_argument("--streams", type=int, default=16)
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--max_batch_size", type=int, default=8)
+    parser.add_argument("--step_delay", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
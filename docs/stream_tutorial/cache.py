@@ -0,0 +1,279 @@
+import json
+import time
+import asyncio
+import hashlib
+
+from collections import OrderedDict
+from starlette.types import Send
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from protocol import StreamPrompting
+
+
+class _InflightStream:
+    """
+    The frames of a stream being generated, which any number of requests follow as they are produced.
+
+    The generation is paced by the slowest follower: `append` waits while a follower has more than
+    `max_buffer_bytes` bytes left to send, so a slow client pauses the generation like it pauses a `StreamWriter`.
+    Once the completion is larger than `max_bytes`, and can no longer be cached, frames sent to every follower are
+    dropped, so memory stays bounded whatever the length of the completion.
+    """
+
+    def __init__(self, max_buffer_bytes: int, max_bytes: int):
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_bytes = max_bytes
+        self.frames: List[bytes] = []
+        # Index in the stream of frames[0], greater than 0 once sent frames were dropped.
+        self.start = 0
+        self.size = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        # Index of the next frame and number of bytes sent, for every follower.
+        self._followers: Dict[object, List[int]] = {}
+        self._waiter = asyncio.get_running_loop().create_future()
+        self._drained = asyncio.get_running_loop().create_future()
+
+    @property
+    def cacheable(self) -> bool:
+        return self.size <= self.max_bytes
+
+    def _notify(self):
+        waiter = self._waiter
+        self._waiter = asyncio.get_running_loop().create_future()
+        waiter.set_result(None)
+
+    def _notify_drained(self):
+        if not self._drained.done():
+            self._drained.set_result(None)
+
+    def _lag(self) -> int:
+        return self.size - min(sent for _, sent in self._followers.values())
+
+    async def append(self, frame: bytes):
+        """Adds a frame, then waits until the slowest follower is less than `max_buffer_bytes` bytes behind."""
+        self.frames.append(frame)
+        self.size += len(frame)
+        self._notify()
+        self._trim()
+        while self._followers and self._lag() > self.max_buffer_bytes:
+            self._drained = asyncio.get_running_loop().create_future()
+            await self._drained
+
+    def _trim(self):
+        if self.cacheable:
+            return
+        # Frames sent to every follower are not needed any more.
+        end = min(
+            (index for index, _ in self._followers.values()),
+            default=self.start + len(self.frames),
+        )
+        del self.frames[: end - self.start]
+        self.start = end
+
+    def finish(self, error: BaseException = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def follow(self) -> AsyncIterator[bytes]:
+        """Yields the frames from the start of the stream. The next frame is yielded once the previous one was sent."""
+        follower = object()
+        position = self._followers[follower] = [self.start, 0]
+        try:
+            while True:
+                while position[0] < self.start + len(self.frames):
+                    frame = self.frames[position[0] - self.start]
+                    yield frame
+                    position[0] += 1
+                    position[1] += len(frame)
+                    self._trim()
+                    self._notify_drained()
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await asyncio.shield(self._waiter)
+        finally:
+            del self._followers[follower]
+            self._trim()
+            self._notify_drained()
+
+
+class PromptCache:
+    """
+    A bounded cache of streamed completions, keyed by a hash of the roles and messages of the prompt.
+
+    Entries expire `ttl` seconds after they were stored, and the least recently used entries are evicted once the
+    cache holds `max_entries` entries or `max_bytes` bytes of completions. Cached completions are replayed as a stream
+    without the pacing of the model. Concurrent requests for the same prompt share one generation: it runs in its own
+    task, and every request streams its frames as they are produced, so a client disconnecting does not stop the
+    others. The generation is paced by the slowest of these clients, which keeps at most `max_buffer_bytes` bytes
+    waiting for any of them, like a `StreamWriter` does without the cache.
+
+    The cache must be used from a single event loop, which is the case for requests served by the axon.
+
+    Args:
+        max_entries (int): Maximum number of cached completions.
+        max_bytes (int): Maximum total size of the cached completions in bytes.
+        ttl (float): Number of seconds a cached completion stays valid.
+        max_buffer_bytes (int): Number of bytes waiting to be sent to a client above which the generation is paused.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 300,
+        max_buffer_bytes: int = 64 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_buffer_bytes = max_buffer_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, _InflightStream] = {}
+        self._tasks = set()
+        self.size_bytes = 0
+
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(synapse: StreamPrompting) -> str:
+        """Returns the cache key of the prompt of the synapse."""
+        payload = json.dumps(
+            [type(synapse).__name__, synapse.roles, synapse.messages]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        """Returns the cached frames for the key, or None if they are missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, frames, size = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return frames
+
+    def put(self, key: str, frames: List[bytes]):
+        """Stores the frames of a completion, evicting the least recently used entries to stay within bounds."""
+        size = sum(len(frame) for frame in frames)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, frames, size)
+        self.size_bytes += size
+        while (
+            len(self._entries) > self.max_entries
+            or self.size_bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+    async def stream(
+        self,
+        key: str,
+        token_streamer: Callable[[Send], Awaitable[None]],
+        send: Send,
+    ):
+        """
+        Streams the completion for the key to `send`: replayed from the cache on a hit, followed from the generation
+        in progress for the same key, or generated by `token_streamer` on a miss and cached once it is complete.
+        Failed generations, and completions larger than `max_bytes`, are not cached.
+        """
+        frames = self.get(key)
+        if frames is not None:
+            self.hits += 1
+            source = self._replay(frames)
+        else:
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight.start > 0:
+                # Too large to be cached, and its first frames are gone: generates it again without the cache.
+                self.misses += 1
+                await token_streamer(send)
+                return
+            if inflight is not None:
+                self.shared += 1
+            else:
+                self.misses += 1
+                inflight = self._generate(key, token_streamer)
+            source = inflight.follow()
+
+        try:
+            async for frame in source:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": frame,
+                        "more_body": True,
+                    }
+                )
+        finally:
+            # Stops following right away if the client went away, so it does not pace the generation.
+            await source.aclose()
+        await send(
+            {"type": "http.response.body", "body": b"", "more_body": False}
+        )
+
+    @staticmethod
+    async def _replay(frames: List[bytes]) -> AsyncIterator[bytes]:
+        for frame in frames:
+            yield frame
+
+    def _generate(
+        self, key: str, token_streamer: Callable[[Send], Awaitable[None]]
+    ) -> _InflightStream:
+        inflight = _InflightStream(self.max_buffer_bytes, self.max_bytes)
+        self._inflight[key] = inflight
+
+        async def record(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                await inflight.append(message["body"])
+
+        async def generate():
+            try:
+                await token_streamer(record)
+                if inflight.cacheable:
+                    self.put(key, inflight.frames)
+                inflight.finish()
+            except asyncio.CancelledError:
+                inflight.finish(
+                    RuntimeError("Generation of the completion was cancelled.")
+                )
+                raise
+            except Exception as e:
+                inflight.finish(e)
+            finally:
+                del self._inflight[key]
+
+        # Keep a reference to the task so it is not garbage collected before it finishes.
+        task = asyncio.create_task(generate())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return inflight
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the cache counters and the hit rate, counting shared generations as hits."""
+        requests = self.hits + self.shared + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.shared) / requests
+            if requests
+            else 0.0,
+        }
@@ -57,11 +57,45 @@ def get_config() -> "bt.Config":
     # Run config.
     parser.add_argument(
         "--miner.blocks_per_epoch",
-        type=str,
+        type=int,
         help="Blocks until the miner repulls the metagraph from the chain",
         default=100,
     )
 
+    # Prompt cache.
+    parser.add_argument(
+        "--miner.prompt_cache.off",
+        action="store_true",
+        help="If set, completions of recent prompts are not cached.",
+        default=False,
+    )
+    parser.add_argument(
+        "--miner.prompt_cache.size",
+        type=int,
+        help="Maximum number of cached completions.",
+        default=1024,
+    )
+    parser.add_argument(
+        "--miner.prompt_cache.max_bytes",
+        type=int,
+        help="Maximum total size of the cached completions in bytes.",
+        default=64 * 1024 * 1024,
+    )
+    parser.add_argument(
+        "--miner.prompt_cache.ttl",
+        type=float,
+        help="Number of seconds a cached completion stays valid.",
+        default=300,
+    )
+
+    # Backpressure.
+    parser.add_argument(
+        "--miner.max_buffer_bytes",
+        type=int,
+        help="Bytes waiting to be sent to a client above which generation of its stream is paused.",
+        default=64 * 1024,
+    )
+
     # Switches.
     parser.add_argument(
         "--miner.no_serve",
@@ -0,0 +1,295 @@
+import time
+import torch
+import asyncio
+import argparse
+import bittensor as bt
+
+from typing import AsyncIterator, Callable, List, Optional
+
+from protocol import StreamPrompting
+from scoring import StreamScorer, CompositeScorer, RepetitionScorer
+
+"""
+A fan-out consumer for streaming subnets: a validator sends one StreamPrompting request to many miners and consumes
+all their streams at once, measuring each of them and cutting off the ones that stall or take too long.
+
+Usage:
+    python consumer.py --netuid 8 --uids 1 2 3 --network test --budget 20 --stall_timeout 3
+"""
+
+
+class StreamResult:
+    """
+    The outcome of one miner stream.
+
+    Attributes:
+        uid (int): The uid of the miner.
+        status (str): "completed", "stalled" (no chunk for `stall_timeout` seconds), "over_budget" (still streaming
+            after `budget` seconds), "rejected" (cancelled by the scorer) or "error".
+        completion (str): The text received, possibly partial if the stream was cancelled.
+        ttft (float): Seconds from the request to the first non-empty chunk, None if none arrived.
+        duration (float): Seconds from the request to the end of the stream.
+        tokens (int): Number of tokens received.
+        tokens_per_second (float): Tokens received per second after the first one.
+        synapse (StreamPrompting): The final synapse yielded by the dendrite, None if the stream did not complete.
+        score (float): Final score given by the scorer, None without a scorer.
+        rejection (str): Why the scorer rejected the stream, None if it did not.
+    """
+
+    def __init__(self, uid: int):
+        self.uid = uid
+        self.status = "error"
+        self.completion = ""
+        self.ttft: Optional[float] = None
+        self.duration = 0.0
+        self.tokens = 0
+        self.tokens_per_second = 0.0
+        self.synapse: Optional[StreamPrompting] = None
+        self.score: Optional[float] = None
+        self.rejection: Optional[str] = None
+
+    @property
+    def completed(self) -> bool:
+        return self.status == "completed"
+
+    def __repr__(self) -> str:
+        ttft = "-" if self.ttft is None else f"{self.ttft:.3f}s"
+        return (
+            f"StreamResult(uid={self.uid}, status={self.status}, ttft={ttft}, tokens={self.tokens}, "
+            f"tokens_per_second={self.tokens_per_second:.1f}, duration={self.duration:.3f}s)"
+        )
+
+
+def count_words(text: str) -> int:
+    """Counts whitespace separated words, a cheap approximation of the number of tokens."""
+    return len(text.split())
+
+
+class StreamConsumer:
+    """
+    Drives many StreamPrompting responses concurrently and measures each of them.
+
+    Every stream is consumed in its own task. A stream is cancelled, and its connection closed, when no chunk arrived
+    for `stall_timeout` seconds or when it is still running after `budget` seconds; what it sent until then is kept
+    in its result.
+
+    With a `scorer_factory`, every stream gets its own scorer, which receives the chunks as they arrive. A stream is
+    cancelled as soon as its scorer rejects it, so no more bandwidth or time is spent on it.
+
+    Args:
+        dendrite (bt.dendrite): The dendrite used to query the miners.
+        stall_timeout (float): Maximum number of seconds between two chunks.
+        budget (float): Maximum number of seconds for a whole stream.
+        count_tokens (Callable[[str], int], optional): Counts the tokens of a completion, e.g. with the tokenizer of
+            the model served by the miners. Defaults to counting words.
+        scorer_factory (Callable[[], StreamScorer], optional): Creates the incremental scorer of a stream.
+    """
+
+    def __init__(
+        self,
+        dendrite: "bt.dendrite",
+        stall_timeout: float = 5.0,
+        budget: float = 30.0,
+        count_tokens: Callable[[str], int] = None,
+        scorer_factory: Callable[[], StreamScorer] = None,
+    ):
+        self.dendrite = dendrite
+        self.stall_timeout = stall_timeout
+        self.budget = budget
+        self.count_tokens = count_tokens or count_words
+        self.scorer_factory = scorer_factory
+
+    async def query(
+        self,
+        axons: List["bt.AxonInfo"],
+        uids: List[int],
+        synapse: StreamPrompting,
+    ) -> List[StreamResult]:
+        """
+        Sends the synapse to all the axons and consumes their streams concurrently.
+
+        Returns:
+            List[StreamResult]: One result per uid, in the order of `uids`.
+        """
+        start_time = time.perf_counter()
+        streams = await self.dendrite(
+            axons,
+            synapse,
+            deserialize=False,
+            streaming=True,
+            timeout=self.budget,
+        )
+        return await asyncio.gather(
+            *(
+                self.consume(uid, stream, start_time)
+                for uid, stream in zip(uids, streams)
+            )
+        )
+
+    async def consume(
+        self, uid: int, stream: AsyncIterator, start_time: float
+    ) -> StreamResult:
+        """Consumes one stream until it ends, stalls, exceeds the budget or is rejected by its scorer."""
+        result = StreamResult(uid)
+        scorer = self.scorer_factory() if self.scorer_factory else None
+        deadline = start_time + self.budget
+        chunks = []
+        first_token_time = None
+        try:
+            while True:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    result.status = "over_budget"
+                    break
+                try:
+                    item = await asyncio.wait_for(
+                        stream.__anext__(), min(self.stall_timeout, remaining)
+                    )
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    result.status = (
+                        "stalled"
+                        if time.perf_counter() < deadline
+                        else "over_budget"
+                    )
+                    break
+
+                if not isinstance(item, list):
+                    # The last item is the synapse, with the completion filled in.
+                    result.synapse = item
+                    result.status = (
+                        "completed" if item.is_success else "error"
+                    )
+                    continue
+                text = "".join(item)
+                if not text:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                    result.ttft = first_token_time - start_time
+                chunks.append(text)
+                if scorer is not None:
+                    scorer.update(text)
+                    if scorer.rejected:
+                        result.status = "rejected"
+                        break
+        except Exception as e:
+            result.status = "error"
+            bt.logging.debug(f"Stream of uid {uid} failed: {e}")
+        finally:
+            # Closes the connection of a cancelled stream.
+            await stream.aclose()
+
+        end_time = time.perf_counter()
+        result.duration = end_time - start_time
+        result.completion = "".join(chunks)
+        if scorer is not None:
+            result.score = scorer.finish()
+            result.rejection = scorer.rejection
+        result.tokens = self.count_tokens(result.completion)
+        if first_token_time is not None and end_time > first_token_time:
+            result.tokens_per_second = result.tokens / (
+                end_time - first_token_time
+            )
+        return result
+
+
+def get_rewards(
+    results: List[StreamResult],
+    reward_fn: Callable[[StreamResult], float],
+    device: str = "cpu",
+) -> torch.FloatTensor:
+    """
+    Returns a tensor of rewards for the given stream results, in their order. Streams that did not complete, including
+    the ones rejected by their scorer, get a reward of 0; the others get `reward_fn(result)`, which can use the
+    completion and its score as well as the ttft and throughput.
+
+    Args:
+        results (List[StreamResult]): The results returned by `StreamConsumer.query`.
+        reward_fn (Callable[[StreamResult], float]): Rewards one completed stream.
+        device (str): Device of the returned tensor.
+
+    Returns:
+        torch.FloatTensor: A tensor of rewards for the given results.
+    """
+    return torch.FloatTensor(
+        [reward_fn(result) if result.completed else 0.0 for result in results]
+    ).to(device)
+
+
+async def main(args):
+    wallet = bt.wallet(name=args.wallet_name, hotkey=args.hotkey)
+    metagraph = bt.metagraph(
+        netuid=args.netuid, network=args.network, sync=True, lite=False
+    )
+    uids = args.uids or [
+        uid for uid, axon in enumerate(metagraph.axons) if axon.is_serving
+    ]
+    synapse = StreamPrompting(roles=["user"], messages=[args.message])
+
+    consumer = StreamConsumer(
+        bt.dendrite(wallet=wallet),
+        stall_timeout=args.stall_timeout,
+        budget=args.budget,
+        scorer_factory=lambda: CompositeScorer([RepetitionScorer()]),
+    )
+    results = await consumer.query(
+        [metagraph.axons[uid] for uid in uids], uids, synapse
+    )
+    for result in results:
+        print(result, result.rejection or "")
+
+    # Rewards the throughput of the streams that completed, weighted by their score.
+    rewards = get_rewards(
+        results, lambda result: result.score * result.tokens_per_second
+    )
+    print(f"rewards: {rewards}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Query many miners with a streaming synapse at once."
+    )
+    parser.add_argument(
+        "--netuid", type=int, required=True, help="Network Unique ID"
+    )
+    parser.add_argument(
+        "--uids",
+        type=int,
+        nargs="*",
+        default=[],
+        help="Uids of the miners to query. Defaults to every serving axon.",
+    )
+    parser.add_argument(
+        "--wallet_name", type=str, default="default", help="Name of the wallet"
+    )
+    parser.add_argument(
+        "--hotkey", type=str, default="default", help="Hotkey for the wallet"
+    )
+    parser.add_argument(
+        "--network",
+        type=str,
+        default="test",
+        help='Network type, e.g., "test" or "mainnet"',
+    )
+    parser.add_argument(
+        "--message",
+        type=str,
+        default="hello this is a test of a streaming response.",
+        help="Prompt sent to the miners.",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=30.0,
+        help="Maximum number of seconds for a whole stream.",
+    )
+    parser.add_argument(
+        "--stall_timeout",
+        type=float,
+        default=5.0,
+        help="Maximum number of seconds between two chunks of a stream.",
+    )
+
+    asyncio.run(main(parser.parse_args()))
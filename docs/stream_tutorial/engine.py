@@ -0,0 +1,87 @@
+import asyncio
+import bittensor as bt
+
+from starlette.types import Send
+from transformers import GPT2TokenizerFast
+from typing import AsyncIterator, Callable, List
+
+from batching import BatchScheduler
+from writer import FlushPolicy, StreamWriter
+
+
+class StreamEngine:
+    """
+    Generates and sends streamed completions. It is created once by the miner and shared by all requests: the
+    tokenizer is only loaded at startup, and streams are paced with `asyncio.sleep`, so concurrent streams are
+    interleaved on the axon event loop instead of waiting for each other.
+
+    The "model" is a stand-in that echoes the prompt token by token, `token_delay` seconds apart. Replace
+    `generate` with a real model to serve actual completions. With a `scheduler`, the completions of all requests are
+    generated together by continuous batching instead.
+
+    Args:
+        tokenizer_name (str): Name of the pretrained tokenizer.
+        token_delay (float): Seconds between two generated tokens.
+        flush_policy (FlushPolicy): When buffered tokens are sent to the client.
+        max_buffer_bytes (int): Bytes waiting to be sent to a client above which its stream is paused.
+        scheduler (BatchScheduler, optional): Generates the completions by continuous batching.
+    """
+
+    def __init__(
+        self,
+        tokenizer_name: str = "gpt2",
+        token_delay: float = 0.03,
+        flush_policy: FlushPolicy = None,
+        max_buffer_bytes: int = 64 * 1024,
+        scheduler: BatchScheduler = None,
+    ):
+        self.tokenizer = GPT2TokenizerFast.from_pretrained(tokenizer_name)
+        self.token_delay = token_delay
+        self.flush_policy = flush_policy or FlushPolicy()
+        self.max_buffer_bytes = max_buffer_bytes
+        self.scheduler = scheduler
+
+    def tokenize(self, text: str) -> List[str]:
+        """Splits the text into the strings of its tokens."""
+        input_ids = self.tokenizer(text).input_ids
+        return self.tokenizer.batch_decode([[id] for id in input_ids])
+
+    async def generate(
+        self, text: str, paused: Callable[[], bool] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yields the tokens of the completion of `text`. With a scheduler, the stream is skipped by the decode steps
+        while `paused()` returns True.
+        """
+        if self.scheduler is not None:
+            async for token in self.scheduler.generate(text, paused=paused):
+                yield token
+            return
+
+        # Tokenizing a long prompt takes a while; keep it off the event loop.
+        tokens = await asyncio.get_running_loop().run_in_executor(
+            None, self.tokenize, text
+        )
+        for token in tokens:
+            if self.token_delay > 0:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+    async def stream(self, text: str, send: Send):
+        """
+        Generates the completion of `text` and streams it to the client through a `StreamWriter`. While the client
+        reads too slowly, generation waits, and the batch scheduler skips this stream.
+        """
+        writer = StreamWriter(
+            send,
+            flush_policy=self.flush_policy,
+            max_buffer_bytes=self.max_buffer_bytes,
+        )
+        try:
+            async for token in self.generate(text, paused=writer.is_paused):
+                await writer.write(token)
+        except BaseException:
+            writer.abort()
+            raise
+        await writer.close()
+        bt.logging.trace(f"Streamed completion: {writer.stats()}")
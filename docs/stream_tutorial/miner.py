@@ -6,14 +6,16 @@ import threading
 import traceback
 from abc import ABC, abstractmethod
 from functools import partial
-from starlette.types import Send
 
 import bittensor as bt
-from transformers import GPT2Tokenizer
 from typing import List, Dict, Tuple, Union, Callable, Awaitable
 
 from protocol import StreamPrompting
 from config import get_config, check_config
+from engine import StreamEngine
+from writer import FlushPolicy
+from cache import PromptCache
+from batching import BatchScheduler, EchoModel
 
 
 class StreamMiner(ABC):
@@ -26,7 +28,17 @@ class StreamMiner(ABC):
         check_config(StreamMiner, self.config)
         bt.logging.info(self.config)  # TODO: duplicate print?
 
-        self.prompt_cache: Dict[str, Tuple[str, int]] = {}
+        # Completions of recent prompts, replayed when the same prompt is sent again.
+        self.prompt_cache: PromptCache = (
+            None
+            if self.config.miner.prompt_cache.off
+            else PromptCache(
+                max_entries=self.config.miner.prompt_cache.size,
+                max_bytes=self.config.miner.prompt_cache.max_bytes,
+                ttl=self.config.miner.prompt_cache.ttl,
+                max_buffer_bytes=self.config.miner.max_buffer_bytes,
+            )
+        )
 
         # Activating Bittensor's logging with the set configurations.
         bt.logging(config=self.config, logging_dir=self.config.full_path)
@@ -72,11 +84,23 @@ class StreamMiner(ABC):
         bt.logging.info(f"Axon created: {self.axon}")
 
         # Instantiate runners
+        self.exit_event = threading.Event()
         self.should_exit: bool = False
         self.is_running: bool = False
         self.thread: threading.Thread = None
         self.lock = asyncio.Lock()
-        self.request_timestamps: Dict = {}
+
+    @property
+    def should_exit(self) -> bool:
+        return self.exit_event.is_set()
+
+    @should_exit.setter
+    def should_exit(self, value: bool):
+        # Backed by an event so that setting it wakes up the main loop immediately.
+        if value:
+            self.exit_event.set()
+        else:
+            self.exit_event.clear()
 
     @abstractmethod
     def config(self) -> "bt.Config":
@@ -91,10 +115,10 @@ class StreamMiner(ABC):
         """
         A wrapper method around the `prompt` method that will be defined by the subclass.
 
-        This method acts as an intermediary layer to perform pre-processing before calling the
-        actual `prompt` method implemented in the subclass. Specifically, it checks whether a
-        prompt is in cache to avoid reprocessing recent requests. If the prompt is not in the
-        cache, the subclass `prompt` method is called.
+        This method acts as an intermediary layer around the actual `prompt` method implemented in
+        the subclass. Specifically, it serves prompts found in the prompt cache by replaying their
+        completion, and lets concurrent requests for the same prompt share one generation. Only
+        on a miss is the stream produced by the subclass `prompt` method generated.
 
         Args:
             synapse (StreamPrompting): The incoming request object encapsulating the details of the request.
@@ -103,14 +127,19 @@ class StreamMiner(ABC):
             StreamPrompting: The response object to be sent back in reply to the incoming request, essentially
             the filled synapse request object.
 
-        Raises:
-            ValueError: If the prompt is found in the cache indicating it was sent recently.
-
         Example:
             This method is not meant to be called directly but is invoked internally when a request
             is received, and it subsequently calls the `prompt` method of the subclass.
         """
-        return self.prompt(synapse)
+        response = self.prompt(synapse)
+        if self.prompt_cache is None:
+            return response
+        response.token_streamer = partial(
+            self.prompt_cache.stream,
+            self.prompt_cache.key(synapse),
+            response.token_streamer,
+        )
+        return response
 
     @abstractmethod
     def prompt(self, synapse: StreamPrompting) -> StreamPrompting:
@@ -176,24 +205,25 @@ class StreamMiner(ABC):
         step = 0
         try:
             while not self.should_exit:
-                start_epoch = time.time()
-
-                # --- Wait until next epoch.
+                # --- Sleep until the predicted start of the next epoch, then check the chain once.
+                # If the chain is behind the prediction, sleep again for the remaining blocks.
+                target_block = (
+                    self.last_epoch_block + self.config.miner.blocks_per_epoch
+                )
                 current_block = self.subtensor.get_current_block()
-                while (
-                    current_block - self.last_epoch_block
-                    < self.config.miner.blocks_per_epoch
-                ):
-                    # --- Wait for next bloc.
-                    time.sleep(1)
+                while current_block < target_block:
+                    if self.exit_event.wait(
+                        (target_block - current_block) * bt.__blocktime__
+                    ):
+                        break
                     current_block = self.subtensor.get_current_block()
 
-                    # --- Check if we should exit.
-                    if self.should_exit:
-                        break
+                # --- Check if we should exit.
+                if self.should_exit:
+                    break
 
                 # --- Update the metagraph with the latest network state.
-                self.last_epoch_block = self.subtensor.get_current_block()
+                self.last_epoch_block = current_block
 
                 metagraph = self.subtensor.metagraph(
                     netuid=self.config.netuid,
@@ -211,6 +241,10 @@ class StreamMiner(ABC):
                     f"Emission:{metagraph.E[self.my_subnet_uid]}"
                 )
                 bt.logging.info(log)
+                if self.prompt_cache is not None:
+                    bt.logging.info(
+                        f"Prompt cache: {self.prompt_cache.stats()}"
+                    )
 
                 step += 1
 
@@ -297,7 +331,55 @@ class StreamingTemplateMiner(StreamMiner):
             parser (argparse.ArgumentParser):
                 The command line argument parser to which custom arguments should be added.
         """
-        pass
+        parser.add_argument(
+            "--miner.tokenizer",
+            type=str,
+            help="Name of the pretrained tokenizer used by the streaming engine.",
+            default="gpt2",
+        )
+        parser.add_argument(
+            "--miner.token_delay",
+            type=float,
+            help="Seconds between two generated tokens.",
+            default=0.03,
+        )
+        parser.add_argument(
+            "--miner.flush_bytes",
+            type=int,
+            help="Buffered bytes above which tokens are sent to the client.",
+            default=64,
+        )
+        parser.add_argument(
+            "--miner.flush_interval",
+            type=float,
+            help="Maximum number of seconds a token is buffered before it is sent to the client.",
+            default=0.1,
+        )
+        parser.add_argument(
+            "--miner.max_batch_size",
+            type=int,
+            help="Maximum number of streams generated together by continuous batching. If 0, every stream is generated on its own.",
+            default=0,
+        )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Loaded once and shared by all requests.
+        self.engine = StreamEngine(
+            tokenizer_name=self.config.miner.tokenizer,
+            token_delay=self.config.miner.token_delay,
+            flush_policy=FlushPolicy(
+                max_bytes=self.config.miner.flush_bytes,
+                max_delay=self.config.miner.flush_interval,
+            ),
+            max_buffer_bytes=self.config.miner.max_buffer_bytes,
+        )
+        if self.config.miner.max_batch_size > 0:
+            self.engine.scheduler = BatchScheduler(
+                EchoModel(self.engine.tokenize),
+                max_batch_size=self.config.miner.max_batch_size,
+                step_delay=self.config.miner.token_delay,
+            )
 
     def prompt(self, synapse: StreamPrompting) -> StreamPrompting:
         """
@@ -305,8 +387,9 @@ class StreamingTemplateMiner(StreamMiner):
 
         This function serves as the main entry point for handling streaming prompts. It takes
         the incoming synapse which contains messages to be processed and returns a streaming
-        response. The function uses the GPT-2 tokenizer and a simulated model to tokenize and decode
-        the incoming message, and then sends the response back to the client token by token.
+        response. The completion is generated and sent by the shared `StreamEngine`, which uses
+        the GPT-2 tokenizer and a simulated model, and coalesces tokens into frames according
+        to its flush policy.
 
         Args:
             synapse (StreamPrompting): The incoming StreamPrompting instance containing the messages to be processed.
@@ -317,78 +400,10 @@ class StreamingTemplateMiner(StreamMiner):
 
         Usage:
             This function can be extended and customized based on specific requirements of the
-            miner. Developers can swap out the tokenizer, model, or adjust how streaming responses
-            are generated to suit their specific applications.
+            miner. Developers can swap out the engine, or adjust how streaming responses are
+            generated to suit their specific applications.
         """
-        bt.logging.trace("HI. PROMPT()")
-        tokenizer = GPT2Tokenizer.from_pretrained("gpt2")
-
-        # Simulated function to decode token IDs into strings. In a real-world scenario,
-        # this can be replaced with an actual model inference step.
-        def model(ids):
-            return (tokenizer.decode(id) for id in ids)
-
-        async def _prompt(text: str, send: Send):
-            """
-            Asynchronously processes the input text and sends back tokens as a streaming response.
-
-            This function takes an input text, tokenizes it using the GPT-2 tokenizer, and then
-            uses the simulated model to decode token IDs into strings. It then sends each token
-            back to the client as a streaming response, with a delay between tokens to simulate
-            the effect of real-time streaming.
-
-            Args:
-                text (str): The input text message to be processed.
-                send (Send): An asynchronous function that allows sending back the streaming response.
-
-            Usage:
-                This function can be adjusted based on the streaming requirements, speed of
-                response, or the model being used. Developers can also introduce more sophisticated
-                processing steps or modify how tokens are sent back to the client.
-            """
-            bt.logging.trace("HI. _PROMPT()")
-            input_ids = tokenizer(
-                text, return_tensors="pt"
-            ).input_ids.squeeze()
-            buffer = []
-            bt.logging.debug(f"Input text: {text}")
-            bt.logging.debug(f"Input ids: {input_ids}")
-
-            N = 3  # Number of tokens to send back to the client at a time
-            for token in model(input_ids):
-                bt.logging.trace(f"appending token: {token}")
-                buffer.append(token)
-                # If buffer has N tokens, send them back to the client.
-                if len(buffer) == N:
-                    time.sleep(0.1)
-                    joined_buffer = "".join(buffer)
-                    bt.logging.debug(f"sedning tokens: {joined_buffer}")
-                    await send(
-                        {
-                            "type": "http.response.body",
-                            "body": joined_buffer.encode("utf-8"),
-                            "more_body": True,
-                        }
-                    )
-                    bt.logging.debug(f"Streamed tokens: {joined_buffer}")
-                    buffer = []  # Clear the buffer for next batch of tokens
-
-            # Send any remaining tokens in the buffer
-            if buffer:
-                joined_buffer = "".join(buffer)
-                await send(
-                    {
-                        "type": "http.response.body",
-                        "body": joined_buffer.encode("utf-8"),
-                        "more_body": False,  # No more tokens to send
-                    }
-                )
-                bt.logging.trace(f"Streamed tokens: {joined_buffer}")
-
-        message = synapse.messages[0]
-        bt.logging.trace(f"message in _prompt: {message}")
-        token_streamer = partial(_prompt, message)
-        bt.logging.trace(f"token streamer: {token_streamer}")
+        token_streamer = partial(self.engine.stream, synapse.messages[0])
         return synapse.create_streaming_response(token_streamer)
 
 
@@ -1,3 +1,4 @@
+import codecs
 import pydantic
 import bittensor as bt
 
@@ -69,6 +70,8 @@ class StreamPrompting(bt.StreamingSynapse):
         description="Completion status of the current StreamPrompting object. This attribute is mutable and can be updated.",
     )
 
+    _chunks: List[str] = pydantic.PrivateAttr(default_factory=list)
+
     async def process_streaming_response(self, response: StreamingResponse):
         """
         `process_streaming_response` is an asynchronous method designed to process the incoming streaming response from the
@@ -76,27 +79,43 @@ class StreamPrompting(bt.StreamingSynapse):
         prompts or messages, are decoded and appropriately managed.
 
         As the streaming response is consumed, the tokens are decoded from their 'utf-8' encoded format, split based on
-        newline characters, and concatenated into the `completion` attribute. This accumulation of decoded tokens in the
+        newline characters, and accumulated into the `completion` attribute. This accumulation of decoded tokens in the
         `completion` attribute allows for a continuous and coherent accumulation of the streaming content.
 
+        The chunks are decoded incrementally, so a multi-byte character split across two chunks is decoded once both
+        halves arrived, and the decoded text is kept in a list that is joined into `completion` once, when the stream
+        ends, keeping the cost linear in the length of the completion.
+
         Args:
             response: The streaming response object containing the content chunks to be processed. Each chunk in this
                       response is expected to be a set of tokens that can be decoded and split into individual messages or prompts.
         """
-        if self.completion is None:
-            self.completion = ""
-        bt.logging.debug(
-            "Processing streaming response (StreamingSynapse base class)."
-        )
-        async for chunk in response.content.iter_any():
-            bt.logging.debug(f"Processing chunk: {chunk}")
-            tokens = chunk.decode("utf-8").split("\n")
-            for token in tokens:
-                bt.logging.debug(f"--processing token: {token}")
-                if token:
-                    self.completion += token
-            bt.logging.debug(f"yielding tokens {tokens}")
-            yield tokens
+        self._chunks = [self.completion] if self.completion else []
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            async for chunk in response.content.iter_any():
+                text = decoder.decode(chunk)
+                tokens = text.split("\n")
+                if len(tokens) > 1:
+                    text = "".join(tokens)
+                if text:
+                    self._chunks.append(text)
+                yield tokens
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                self._chunks.append(tail)
+        finally:
+            # Also materialized if the consumer stops early.
+            self.completion = self.accumulated_completion()
+
+    def accumulated_completion(self) -> str:
+        """
+        Returns the completion received so far. While a stream is being processed, `completion` is only updated at
+        the end; use this method to read the partial completion.
+        """
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else (self.completion or "")
 
     def deserialize(self) -> str:
         """
@@ -0,0 +1,179 @@
+import re
+
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from typing import List, Optional
+
+"""
+Incremental scoring of streamed completions. A scorer receives the text of every chunk as it arrives, keeps a running
+partial score and rejects the stream as soon as it is provably bad, so the consumer can cancel it instead of spending
+bandwidth and time on a response that will score zero.
+
+Scorers keep state for one stream: create a new one for every stream.
+"""
+
+
+class StreamScorer(ABC):
+    """
+    Base class of incremental scorers. Subclasses implement `update`, keep `score` up to date, and call `reject` when
+    the completion can no longer be valid, whatever the rest of the stream is.
+    """
+
+    def __init__(self):
+        self.score = 0.0
+        self.rejection: Optional[str] = None
+
+    @property
+    def rejected(self) -> bool:
+        return self.rejection is not None
+
+    def reject(self, reason: str):
+        """Marks the stream as invalid. Its score is 0."""
+        self.rejection = reason
+        self.score = 0.0
+
+    @abstractmethod
+    def update(self, text: str):
+        """Receives the text of the next chunk."""
+        ...
+
+    def finish(self) -> float:
+        """Called once the stream ended. Returns the final score."""
+        return 0.0 if self.rejected else self.score
+
+
+class PrefixScorer(StreamScorer):
+    """
+    Rejects completions that do not start with `prefix`, as soon as the first mismatching character arrives. The
+    partial score is the fraction of the prefix received so far.
+    """
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+        self.matched = 0
+        self.score = 1.0 if not prefix else 0.0
+
+    def update(self, text: str):
+        if self.rejected or self.matched >= len(self.prefix):
+            return
+        expected = self.prefix[self.matched : self.matched + len(text)]
+        if not text.startswith(expected):
+            self.reject(f"Completion does not start with {self.prefix!r}.")
+            return
+        self.matched += len(expected)
+        self.score = self.matched / len(self.prefix)
+
+    def finish(self) -> float:
+        if not self.rejected and self.matched < len(self.prefix):
+            self.reject(f"Completion is shorter than {self.prefix!r}.")
+        return super().finish()
+
+
+class RepetitionScorer(StreamScorer):
+    """
+    Rejects completions repeating the same word n-gram more than `max_repeats` times. The partial score is the
+    fraction of distinct n-grams among the n-grams received so far.
+
+    Args:
+        n (int): Number of words of the n-grams.
+        max_repeats (int): Maximum number of occurrences of an n-gram.
+    """
+
+    def __init__(self, n: int = 4, max_repeats: int = 3):
+        super().__init__()
+        self.n = n
+        self.max_repeats = max_repeats
+        self.counts = Counter()
+        self.total = 0
+        self.window = deque(maxlen=n)
+        # The last word of a chunk may continue in the next one.
+        self.partial_word = ""
+
+    def update(self, text: str):
+        if self.rejected:
+            return
+        words = (self.partial_word + text).split(" ")
+        self.partial_word = words.pop()
+        self._add_words(words)
+
+    def _add_words(self, words: List[str]):
+        for word in words:
+            if not word:
+                continue
+            self.window.append(word)
+            if len(self.window) < self.n:
+                continue
+            ngram = tuple(self.window)
+            self.counts[ngram] += 1
+            self.total += 1
+            if self.counts[ngram] > self.max_repeats:
+                self.reject(
+                    f"{' '.join(ngram)!r} is repeated more than {self.max_repeats} times."
+                )
+                return
+        if self.total:
+            self.score = len(self.counts) / self.total
+
+    def finish(self) -> float:
+        if not self.rejected and self.partial_word:
+            self._add_words([self.partial_word])
+            self.partial_word = ""
+        if not self.rejected and not self.total:
+            # Too short to contain an n-gram.
+            self.score = 1.0
+        return super().finish()
+
+
+class FormatScorer(StreamScorer):
+    """
+    Rejects completions containing a match of the `invalid` regular expression, e.g. markup the answer must not
+    contain. Matches spanning two chunks are found as long as they are at most `max_match_length` characters long.
+    The partial score is 1 while no match was found.
+    """
+
+    def __init__(self, invalid: str, max_match_length: int = 64):
+        super().__init__()
+        self.invalid = re.compile(invalid)
+        self.max_match_length = max_match_length
+        self.tail = ""
+        self.score = 1.0
+
+    def update(self, text: str):
+        if self.rejected:
+            return
+        window = self.tail + text
+        match = self.invalid.search(window)
+        if match is not None:
+            self.reject(f"Completion contains {match.group(0)!r}.")
+            return
+        self.tail = window[-self.max_match_length :]
+
+
+class CompositeScorer(StreamScorer):
+    """Combines scorers: the stream is rejected if any of them rejects it, and its score is the mean of theirs."""
+
+    def __init__(self, scorers: List[StreamScorer]):
+        super().__init__()
+        self.scorers = scorers
+
+    def update(self, text: str):
+        for scorer in self.scorers:
+            scorer.update(text)
+            if scorer.rejected:
+                self.reject(scorer.rejection)
+                return
+        self.score = sum(scorer.score for scorer in self.scorers) / len(
+            self.scorers
+        )
+
+    def finish(self) -> float:
+        if self.rejected:
+            return 0.0
+        scores = [scorer.finish() for scorer in self.scorers]
+        for scorer in self.scorers:
+            if scorer.rejected:
+                self.reject(scorer.rejection)
+                return 0.0
+        self.score = sum(scores) / len(scores)
+        return self.score
@@ -0,0 +1,201 @@
+import time
+import asyncio
+
+from starlette.types import Send
+from typing import Dict, List, Optional
+
+
+class FlushPolicy:
+    """
+    Decides when buffered tokens are sent to the client: once the buffer holds `max_bytes` bytes, or once its oldest
+    token has waited `max_delay` seconds. The first token of a stream is always sent right away to keep the time to
+    first token low. Larger frames keep the number of sends, and their overhead, low on fast streams.
+
+    Args:
+        max_bytes (int): Size of the buffer in bytes above which it is flushed.
+        max_delay (float): Maximum number of seconds a token waits in the buffer.
+    """
+
+    def __init__(self, max_bytes: int = 64, max_delay: float = 0.1):
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+
+    def should_flush(self, size: int, first_token_time: float) -> bool:
+        return (
+            size >= self.max_bytes
+            or time.monotonic() - first_token_time >= self.max_delay
+        )
+
+
+class StreamWriter:
+    """
+    Writes the body of a streaming response for any `StreamingSynapse`, coalescing tokens into frames according to
+    a `FlushPolicy` and applying backpressure when the client reads slowly.
+
+    Frames are sent by a background task, so a slow `send` does not block the producer until `max_buffer_bytes`
+    bytes are waiting to be sent. From then on the writer is paused: `write` waits until the buffer has been sent,
+    and producers that generate for several streams at once, such as the batch scheduler, can check `paused` to skip
+    this stream until then. A slow client therefore neither grows the memory of the miner nor holds back the other
+    streams.
+
+    Example:
+        async def token_streamer(send: Send):
+            writer = StreamWriter(send)
+            try:
+                async for token in generate(prompt):
+                    await writer.write(token)
+            except BaseException:
+                writer.abort()
+                raise
+            await writer.close()
+
+    Args:
+        send (Send): The ASGI send function of the response.
+        flush_policy (FlushPolicy, optional): When buffered tokens are sent.
+        max_buffer_bytes (int): Number of bytes waiting to be sent above which the writer is paused.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        flush_policy: FlushPolicy = None,
+        max_buffer_bytes: int = 64 * 1024,
+    ):
+        self._send = send
+        self.flush_policy = flush_policy or FlushPolicy()
+        self.max_buffer_bytes = max_buffer_bytes
+
+        self._buffer: List[bytes] = []
+        self._buffer_size = 0
+        self._first_token_time = 0.0
+        self._first_frame = True
+        # Bytes written but not sent yet, including the frame being sent.
+        self._pending_bytes = 0
+        self._flush_needed = asyncio.Event()
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+        self._error: Optional[BaseException] = None
+
+        self.bytes_sent = 0
+        self.flushes = 0
+        self.pauses = 0
+        self.paused_time = 0.0
+
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def is_paused(self) -> bool:
+        return self.paused
+
+    async def write(self, token: str):
+        """
+        Buffers a token. Waits while the writer is paused.
+
+        Raises:
+            Exception: The error raised by `send`, e.g. when the client went away.
+        """
+        if self._error is not None:
+            raise self._error
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+        data = token.encode("utf-8")
+        if not self._buffer:
+            self._first_token_time = time.monotonic()
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+        self._pending_bytes += len(data)
+        if self._first_frame or self.flush_policy.should_flush(
+            self._buffer_size, self._first_token_time
+        ):
+            self._first_frame = False
+            self._flush_needed.set()
+
+        if self._pending_bytes >= self.max_buffer_bytes:
+            self._resumed.clear()
+            self._flush_needed.set()
+            self.pauses += 1
+            start_time = time.monotonic()
+            await self._resumed.wait()
+            self.paused_time += time.monotonic() - start_time
+            if self._error is not None:
+                raise self._error
+
+    async def _run(self):
+        try:
+            while True:
+                timeout = None
+                if self._buffer:
+                    timeout = max(
+                        self._first_token_time
+                        + self.flush_policy.max_delay
+                        - time.monotonic(),
+                        0,
+                    )
+                try:
+                    await asyncio.wait_for(self._flush_needed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_needed.clear()
+
+                if self._buffer:
+                    frame = b"".join(self._buffer)
+                    self._buffer = []
+                    self._buffer_size = 0
+                    await self._send_frame(frame, more_body=True)
+                    self._pending_bytes -= len(frame)
+                    if self._pending_bytes < self.max_buffer_bytes:
+                        self._resumed.set()
+
+                if self._closing and not self._buffer:
+                    return
+        except Exception as e:
+            self._error = e
+            # Wakes up a paused producer so it sees the error.
+            self._resumed.set()
+
+    async def _send_frame(self, frame: bytes, more_body: bool):
+        await self._send(
+            {
+                "type": "http.response.body",
+                "body": frame,
+                "more_body": more_body,
+            }
+        )
+        self.bytes_sent += len(frame)
+        self.flushes += 1
+
+    async def close(self):
+        """
+        Sends the buffered tokens and ends the response.
+
+        Raises:
+            Exception: The error raised by `send`, e.g. when the client went away.
+        """
+        self._closing = True
+        if self._flusher is not None:
+            self._flush_needed.set()
+            await self._flusher
+        if self._error is not None:
+            raise self._error
+        await self._send_frame(b"", more_body=False)
+
+    def abort(self):
+        """Stops the background task without ending the response, e.g. when the producer failed."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the number of bytes sent and flushes, and how often and how long the writer was paused."""
+        return {
+            "bytes_sent": self.bytes_sent,
+            "flushes": self.flushes,
+            "bytes_per_flush": self.bytes_sent / self.flushes
+            if self.flushes
+            else 0.0,
+            "pauses": self.pauses,
+            "paused_time": self.paused_time,
+        }
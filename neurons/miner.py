@@ -37,11 +37,37 @@ class Miner(BaseMinerNeuron):
     This class provides reasonable default behavior for a miner such as blacklisting unrecognized hotkeys, prioritizing requests based on stake, and forwarding requests to the forward function. If you need to define custom
     """
 
-    def __init__(self, config=None):
-        super(Miner, self).__init__(config=config)
+    def __init__(
+        self, config=None, subtensor=None, metagraph=None, forward_pool=None
+    ):
+        # A subtensor, metagraph and forward pool are passed in when the miner is served by a `MinerHost`.
+        super(Miner, self).__init__(
+            config=config,
+            subtensor=subtensor,
+            metagraph=metagraph,
+            forward_pool=forward_pool,
+        )
 
         # TODO(developer): Anything specific to your use case you can do here
 
+    @staticmethod
+    def worker_forward(
+        state: typing.Any, request: typing.Dict[str, typing.Any]
+    ) -> typing.Dict[str, typing.Any]:
+        """
+        The CPU bound part of the forward function. It runs in a forward pool worker process when
+        `--forward_pool.size` is greater than 0, and inline otherwise.
+
+        Args:
+            state (Any): The per worker state returned by `worker_init`, e.g. a loaded model.
+            request (Dict[str, Any]): The fields of the incoming 'Dummy' synapse.
+
+        Returns:
+            Dict[str, Any]: The fields to set on the response, here 'dummy_output' set to twice the 'dummy_input' value.
+        """
+        # TODO(developer): Replace with actual implementation logic.
+        return {"dummy_output": request["dummy_input"] * 2}
+
     async def forward(
         self, synapse: template.protocol.Dummy
     ) -> template.protocol.Dummy:
@@ -56,11 +82,18 @@ class Miner(BaseMinerNeuron):
             template.protocol.Dummy: The synapse object with the 'dummy_output' field set to twice the 'dummy_input' value.
 
         The 'forward' function is a placeholder and should be overridden with logic that is appropriate for
-        the miner's intended operation. This method demonstrates a basic transformation of input data.
+        the miner's intended operation. Here the work is delegated to `worker_forward`, so it can be moved off
+        the axon event loop with `--forward_pool.size`.
         """
-        # TODO(developer): Replace with actual implementation logic.
-        synapse.dummy_output = synapse.dummy_input * 2
-        return synapse
+        return await self.run_worker_forward(synapse)
+
+    def warmup_synapses(self) -> typing.List[template.protocol.Dummy]:
+        """
+        Returns synthetic requests that are sent through `forward` before the axon is served, so the first real
+        requests do not pay for lazy initialization.
+        """
+        # TODO(developer): Replace with requests representative of your workload.
+        return [template.protocol.Dummy(dummy_input=1)]
 
     async def blacklist(
         self, synapse: template.protocol.Dummy
@@ -0,0 +1,137 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Reports the import time of the template package and of the neurons, so regressions in startup time are caught.
+
+Every target is imported in a fresh interpreter with `python -X importtime`. The report shows the median wall time
+over the repeats, minus the startup of a bare interpreter, and the packages whose modules took the longest to import. A target
+ending in `.py` is a neuron script, run with `--help`.
+
+With --budget, exits with status 1 if a target takes longer than the budget, e.g. in CI:
+    python scripts/benchmarks/bench_startup.py --targets template --budget 0.05
+
+Usage:
+    python scripts/benchmarks/bench_startup.py --targets template template.protocol neurons/validator.py --top 15
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Lets the neuron scripts import the template package without installing it.
+ENV = dict(os.environ, PYTHONPATH=ROOT)
+
+
+def command(target: str, import_time: bool = False) -> list:
+    flags = ["-X", "importtime"] if import_time else []
+    if target.endswith(".py"):
+        return [sys.executable, *flags, os.path.join(ROOT, target), "--help"]
+    if target:
+        return [sys.executable, *flags, "-c", f"import {target}"]
+    return [sys.executable, *flags, "-c", "pass"]
+
+
+def wall_time(target: str, repeats: int) -> float:
+    """Median seconds to run the target in a fresh interpreter."""
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        subprocess.run(
+            command(target),
+            cwd=ROOT,
+            env=ENV,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times)
+
+
+def slowest_packages(target: str, top: int) -> list:
+    """Returns (microseconds, package) of the `top` top level packages whose modules took the longest to import."""
+    result = subprocess.run(
+        command(target, import_time=True),
+        cwd=ROOT,
+        env=ENV,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, _, module = line[len("import time:") :].split("|")
+        package = module.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_time)
+    return sorted(
+        ((elapsed, package) for package, elapsed in packages.items()),
+        reverse=True,
+    )[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        default=[
+            "template",
+            "template.utils",
+            "template.protocol",
+            "template.base.validator",
+            "neurons/validator.py",
+        ],
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Maximum number of seconds per target.",
+    )
+    args = parser.parse_args()
+
+    baseline = wall_time("", args.repeats)
+    print(f"interpreter:     {baseline * 1e3:.1f}ms")
+
+    over_budget = []
+    for target in args.targets:
+        elapsed = max(wall_time(target, args.repeats) - baseline, 0.0)
+        print(f"\n{target}: {elapsed * 1e3:.1f}ms")
+        for elapsed_us, package in slowest_packages(target, args.top):
+            print(f"    {elapsed_us / 1e3:8.1f}ms  {package}")
+        if args.budget is not None and elapsed > args.budget:
+            over_budget.append(target)
+
+    if over_budget:
+        print(
+            f"\nOver the budget of {args.budget * 1e3:.0f}ms: {', '.join(over_budget)}"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
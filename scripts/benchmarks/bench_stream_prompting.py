@@ -0,0 +1,133 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Benchmarks the accumulation of streamed completions in StreamPrompting.
+
+Streams a long completion made of ASCII and multi-byte tokens in chunks cut at random byte offsets, as they arrive
+from the network, and compares `StreamPrompting.process_streaming_response` with the previous accumulation, which
+decoded every chunk on its own and appended every token to a string. The previous accumulation is fed chunks cut at
+character boundaries, since it fails on characters split across chunks.
+
+Usage:
+    python scripts/benchmarks/bench_stream_prompting.py --tokens 100000 --tokens_per_chunk 3
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+from types import SimpleNamespace
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), "..", "..", "docs", "stream_tutorial"),
+)
+
+from protocol import StreamPrompting
+
+TOKENS = [" the", " stream", " of", " tokens", " é", " naïve", " 東京", " 🙂", "\n"]
+
+
+class Content:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def iter_any(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def make_chunks(args):
+    tokens = [random.choice(TOKENS) for _ in range(args.tokens)]
+    text = "".join(tokens)
+    data = text.encode("utf-8")
+
+    # Cut at random byte offsets, including in the middle of characters.
+    chunk_bytes = args.tokens_per_chunk * len(data) // len(tokens)
+    byte_chunks, start = [], 0
+    while start < len(data):
+        end = start + random.randint(1, 2 * chunk_bytes)
+        byte_chunks.append(data[start:end])
+        start = end
+
+    # Cut at token boundaries for the previous accumulation.
+    token_chunks = [
+        "".join(tokens[i : i + args.tokens_per_chunk]).encode("utf-8")
+        for i in range(0, len(tokens), args.tokens_per_chunk)
+    ]
+    return text, byte_chunks, token_chunks
+
+
+async def previous_accumulation(chunks):
+    synapse = StreamPrompting(roles=["user"], messages=["benchmark"])
+    async for chunk in Content(chunks).iter_any():
+        tokens = chunk.decode("utf-8").split("\n")
+        for token in tokens:
+            if token:
+                synapse.completion += token
+    return synapse.completion
+
+
+async def current_accumulation(chunks):
+    synapse = StreamPrompting(roles=["user"], messages=["benchmark"])
+    response = SimpleNamespace(content=Content(chunks))
+    async for _ in synapse.process_streaming_response(response):
+        pass
+    return synapse.completion
+
+
+def measure(fn, chunks, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        completion = asyncio.run(fn(chunks))
+        best = min(best, time.perf_counter() - start_time)
+    return completion, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=100000)
+    parser.add_argument("--tokens_per_chunk", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    text, byte_chunks, token_chunks = make_chunks(args)
+    expected = text.replace("\n", "")
+
+    previous, previous_time = measure(
+        previous_accumulation, token_chunks, args.repeats
+    )
+    current, current_time = measure(
+        current_accumulation, byte_chunks, args.repeats
+    )
+    assert previous == expected
+    assert current == expected, "Completion does not match the streamed text."
+
+    print(f"tokens:          {args.tokens}")
+    print(f"chunks:          {len(byte_chunks)}")
+    print(f"previous:        {previous_time * 1e3:.1f}ms")
+    print(f"current:         {current_time * 1e3:.1f}ms")
+    print(f"speedup:         {previous_time / current_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
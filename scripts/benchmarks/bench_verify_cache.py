@@ -0,0 +1,118 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+"""
+Benchmarks the miner verification cache at high request rates.
+
+Simulates validators sending rapid small requests, a fraction of which are replays, and reports the cost per
+request, the throughput and the memory bound (number of remembered requests). Signatures are checked with a stub by
+default so the cache itself is measured; pass --sr25519 to sign and verify real requests.
+
+Usage:
+    python scripts/benchmarks/bench_verify_cache.py --requests 1000000 --validators 64 --window 1
+"""
+
+import time
+import uuid
+import random
+import argparse
+
+from types import SimpleNamespace
+
+from template.miner.verify import VerificationCache, verify_sr25519
+
+
+def make_requests(args, axon_hotkey, keypairs):
+    requests = []
+    endpoints = [(keypair, str(uuid.uuid1())) for keypair in keypairs]
+    for index in range(args.requests):
+        # Nonces are nanosecond timestamps, the requests are spaced by `interval` seconds of simulated time.
+        nonce = int(index * args.interval * 1e9)
+        keypair, endpoint_uuid = random.choice(endpoints)
+        body_hash = f"{random.getrandbits(64):016x}"
+        message = f"{nonce}.{keypair.ss58_address}.{axon_hotkey}.{endpoint_uuid}.{body_hash}"
+        signature = (
+            "0x" + keypair.sign(message).hex() if args.sr25519 else "stub"
+        )
+        requests.append(
+            SimpleNamespace(
+                dendrite=SimpleNamespace(
+                    hotkey=keypair.ss58_address,
+                    uuid=endpoint_uuid,
+                    nonce=nonce,
+                    signature=signature,
+                ),
+                computed_body_hash=body_hash,
+            )
+        )
+        if random.random() < args.replay_rate:
+            requests.append(requests[-1])
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--validators", type=int, default=64)
+    parser.add_argument("--replay_rate", type=float, default=0.05)
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--max_entries", type=int, default=100000)
+    parser.add_argument("--interval", type=float, default=1e-5)
+    parser.add_argument("--sr25519", action="store_true")
+    args = parser.parse_args()
+
+    import bittensor as bt
+
+    keypairs = [
+        bt.Keypair.create_from_mnemonic(bt.Keypair.generate_mnemonic())
+        for _ in range(args.validators)
+    ]
+    axon_hotkey = bt.Keypair.create_from_mnemonic(
+        bt.Keypair.generate_mnemonic()
+    ).ss58_address
+    requests = make_requests(args, axon_hotkey, keypairs)
+
+    now = 0
+    cache = VerificationCache(
+        window=args.window,
+        max_entries=args.max_entries,
+        verify_signature=verify_sr25519
+        if args.sr25519
+        else lambda hotkey, message, signature: True,
+        timer=lambda: now,
+    )
+    peak_entries = 0
+    start_time = time.perf_counter()
+    for request in requests:
+        now = request.dendrite.nonce
+        try:
+            cache.verify(request, axon_hotkey)
+        except Exception:
+            pass
+        peak_entries = max(peak_entries, len(cache))
+    elapsed = time.perf_counter() - start_time
+
+    print(f"requests:        {len(requests)}")
+    print(f"elapsed:         {elapsed:.3f}s")
+    print(f"throughput:      {len(requests) / elapsed:,.0f} requests/s")
+    print(f"cost:            {elapsed / len(requests) * 1e6:.2f} us/request")
+    print(f"peak entries:    {peak_entries} (max {args.max_entries})")
+    print(f"stats:           {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
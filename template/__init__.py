@@ -27,9 +27,11 @@ __spec_version__ = (
     + (1 * int(version_split[2]))
 )
 
-# Import all submodules.
-from . import protocol
-from . import base
-from . import validator
-from . import api
-from .subnet_links import SUBNET_LINKS
+# Submodules are imported on first access, so that importing the package does not import bittensor and torch.
+from .utils.lazy import attach
+
+__getattr__, __dir__ = attach(
+    __name__,
+    submodules=["protocol", "base", "validator", "api"],
+    attributes={"SUBNET_LINKS": "subnet_links"},
+)
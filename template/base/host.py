@@ -0,0 +1,211 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import copy
+import argparse
+import threading
+import traceback
+import bittensor as bt
+
+from typing import List, Type
+
+from template.base.miner import BaseMinerNeuron
+from template.miner.pool import ForwardPool
+from template.miner.metagraph import LiteMetagraph
+from template.utils.config import add_host_args
+
+
+class MinerHost:
+    """
+    Serves several registered hotkeys of the same miner from a single process.
+
+    Each hotkey gets its own miner instance, with its own wallet, axon, port and blacklist. The chain connection, the
+    metagraph and the forward pool are created once and shared by all of them, so memory and startup time stay
+    roughly constant as hotkeys are added: the model is loaded once per pool worker, not once per hotkey. The pool
+    always has at least one worker, even when `--forward_pool.size` is 0.
+
+    The host runs a single maintenance loop for all miners: it resyncs the shared metagraph once per epoch and stops
+    the axon of any hotkey that got deregistered.
+
+    Args:
+        miner_cls (Type[BaseMinerNeuron]): The miner class to instantiate for every hotkey.
+        config (bt.Config, optional): The host configuration. Parsed from the command line if not given.
+    """
+
+    @classmethod
+    def config(cls, miner_cls: Type[BaseMinerNeuron]) -> "bt.Config":
+        parser = argparse.ArgumentParser()
+        bt.wallet.add_args(parser)
+        bt.subtensor.add_args(parser)
+        bt.logging.add_args(parser)
+        bt.axon.add_args(parser)
+        miner_cls.add_args(parser)
+        add_host_args(cls, parser)
+        return bt.config(parser)
+
+    def __init__(self, miner_cls: Type[BaseMinerNeuron], config=None):
+        self.config = config or MinerHost.config(miner_cls)
+        if self.config.mock:
+            raise ValueError("The miner host does not support --mock.")
+
+        hotkeys = self.config.host.hotkeys
+        ports = self.config.host.ports or [
+            self.config.axon.port + i for i in range(len(hotkeys))
+        ]
+        if not hotkeys:
+            raise ValueError("No hotkeys to serve, set --host.hotkeys.")
+        if len(ports) != len(hotkeys):
+            raise ValueError(
+                f"Got {len(ports)} ports for {len(hotkeys)} hotkeys."
+            )
+
+        bt.logging(config=self.config)
+        bt.logging.info(
+            f"Setting up miner host for hotkeys {hotkeys} on ports {ports}."
+        )
+
+        # Shared between all the miners.
+        self.subtensor = bt.subtensor(config=self.config)
+        if self.config.neuron.lite_metagraph:
+            self.metagraph = LiteMetagraph(
+                self.config.netuid,
+                full_sync_interval=self.config.neuron.full_sync_interval,
+            ).sync(subtensor=self.subtensor)
+        else:
+            self.metagraph = self.subtensor.metagraph(self.config.netuid)
+        self.forward_pool = ForwardPool(
+            init_fn=miner_cls.worker_init,
+            forward_fn=miner_cls.worker_forward,
+            num_workers=max(1, self.config.forward_pool.size),
+            max_queue=self.config.forward_pool.max_queue,
+        )
+        self.forward_pool.start()
+
+        self.miners: List[BaseMinerNeuron] = []
+        for hotkey, port in zip(hotkeys, ports):
+            miner_config = copy.deepcopy(self.config)
+            miner_config.wallet.hotkey = hotkey
+            miner_config.axon.port = port
+            self.miners.append(
+                miner_cls(
+                    config=miner_config,
+                    subtensor=self.subtensor,
+                    metagraph=self.metagraph,
+                    forward_pool=self.forward_pool,
+                )
+            )
+
+        # Instantiate runners
+        self.exit_event = threading.Event()
+        self.is_running: bool = False
+        self.thread: threading.Thread = None
+
+    @property
+    def should_exit(self) -> bool:
+        return self.exit_event.is_set()
+
+    @should_exit.setter
+    def should_exit(self, value: bool):
+        # Propagated to the miners, whose wait_for_block drives the main loop.
+        for event in [self.exit_event] + [m.exit_event for m in self.miners]:
+            if value:
+                event.set()
+            else:
+                event.clear()
+
+    def run(self):
+        """
+        Publishes and starts the axon of every miner, then keeps the shared metagraph in sync until `should_exit` is set.
+        """
+        # Warm up all the miners together, then serve each one as soon as it is ready.
+        for miner in self.miners:
+            miner.start_warmup()
+        for miner in self.miners:
+            miner.wait_until_ready()
+            miner.serve_axon()
+
+        try:
+            while not self.should_exit and self.miners:
+                leader = self.miners[0]
+                if not leader.wait_for_block(
+                    leader.last_sync_block + self.config.neuron.epoch_length
+                ):
+                    break
+
+                # The metagraph is shared, resyncing it once updates every miner.
+                leader.resync_metagraph()
+                for miner in list(self.miners):
+                    miner.last_sync_block = leader.last_sync_block
+                    miner.chain.observe(self.metagraph)
+                    miner.step += 1
+                    if (
+                        miner.wallet.hotkey.ss58_address
+                        not in self.metagraph.hotkeys
+                    ):
+                        bt.logging.error(
+                            f"Wallet: {miner.wallet} is not registered on netuid {self.config.netuid} anymore, stopping its axon."
+                        )
+                        miner.axon.stop()
+                        self.miners.remove(miner)
+
+        # If someone intentionally stops the host, it'll safely terminate operations.
+        except KeyboardInterrupt:
+            self.stop()
+            bt.logging.success("Miner host killed by keyboard interrupt.")
+            exit()
+
+        # In case of unforeseen errors, the host will log the error and continue operations.
+        except Exception as e:
+            bt.logging.error(traceback.format_exc())
+
+    def stop(self):
+        """Stops every axon and the shared forward pool."""
+        for miner in self.miners:
+            miner.axon.stop()
+        self.forward_pool.shutdown()
+
+    def run_in_background_thread(self):
+        """
+        Starts the host's operations in a separate background thread.
+        This is useful for non-blocking operations.
+        """
+        if not self.is_running:
+            bt.logging.debug("Starting miner host in background thread.")
+            self.should_exit = False
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+            self.is_running = True
+            bt.logging.debug("Started")
+
+    def stop_run_thread(self):
+        """
+        Stops the host's operations that are running in the background thread.
+        """
+        if self.is_running:
+            bt.logging.debug("Stopping miner host in background thread.")
+            self.should_exit = True
+            self.thread.join(5)
+            self.stop()
+            self.is_running = False
+            bt.logging.debug("Stopped")
+
+    def __enter__(self):
+        self.run_in_background_thread()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_run_thread()
@@ -18,14 +18,31 @@
 import time
 import torch
 import asyncio
+import inspect
+import functools
 import threading
 import argparse
 import traceback
 
 import bittensor as bt
 
+from abc import abstractmethod
+from typing import Any, Callable, Dict, List
+from concurrent.futures import Executor
+
 from template.base.neuron import BaseNeuron
+from template.miner.pool import ForwardPool
+from template.miner.cache import ResponseCache
+from template.miner.verify import VerificationCache
+from template.miner.handler import SynapseHandler
+from template.miner.deadline import Deadline
+from template.miner.metagraph import LiteMetagraph
 from template.utils.config import add_miner_args
+from template.utils.synapse import (
+    synapse_fields,
+    response_fields,
+    apply_fields,
+)
 
 
 class BaseMinerNeuron(BaseNeuron):
@@ -40,8 +57,16 @@ class BaseMinerNeuron(BaseNeuron):
         super().add_args(parser)
         add_miner_args(cls, parser)
 
-    def __init__(self, config=None):
-        super().__init__(config=config)
+    def __init__(
+        self,
+        config=None,
+        subtensor=None,
+        metagraph=None,
+        forward_pool: ForwardPool = None,
+    ):
+        super().__init__(
+            config=config, subtensor=subtensor, metagraph=metagraph
+        )
 
         # Warn if allowing incoming requests from anyone.
         if not self.config.blacklist.force_validator_permit:
@@ -53,12 +78,53 @@ class BaseMinerNeuron(BaseNeuron):
                 "You are allowing non-registered entities to send requests to your miner. This is a security risk."
             )
 
+        # Worker state used by `worker_forward`, either in a pool of processes or inline in this one, built during the
+        # warm-up. A pool passed in is shared with other miners and is not shut down by this one.
+        self.forward_pool: ForwardPool = forward_pool
+        self.owns_forward_pool: bool = False
+        self.worker_state: Any = None
+        self.worker_state_ready = threading.Event()
+        if forward_pool is None and self.config.forward_pool.size > 0:
+            self.forward_pool = ForwardPool(
+                init_fn=type(self).worker_init,
+                forward_fn=type(self).worker_forward,
+                num_workers=self.config.forward_pool.size,
+                max_queue=self.config.forward_pool.max_queue,
+            )
+            self.owns_forward_pool = True
+
+        # Cache of responses for the synapse types listed in --response_cache.synapses.
+        self.response_cache: ResponseCache = None
+        if self.config.response_cache.synapses:
+            self.response_cache = ResponseCache(
+                max_size=self.config.response_cache.size,
+                ttl=self.config.response_cache.ttl,
+            )
+
+        # Warm-up and readiness reporting, see `start_warmup`.
+        self.warmup_done = threading.Event()
+        self.warmup_thread: threading.Thread = None
+        self.time_to_ready: float = None
+        self.first_request_latency: float = None
+
         # The axon handles request processing, allowing validators to send this miner requests.
         self.axon = bt.axon(wallet=self.wallet, config=self.config)
 
+        # Bounded, replay-protected request verification, replacing the axon default.
+        self.verify_cache: VerificationCache = None
+        if not self.config.verify_cache.off:
+            self.verify_cache = VerificationCache(
+                window=self.config.verify_cache.window,
+                max_entries=self.config.verify_cache.max_entries,
+                max_endpoints=self.config.verify_cache.max_endpoints,
+                clock_skew=self.config.verify_cache.clock_skew,
+            )
+
         # Attach determiners which functions are called when servicing a request.
+        # Subclasses serving more synapse types attach them with `attach_handler`.
         bt.logging.info(f"Attaching forward function to miner axon.")
-        self.axon.attach(
+        self.handlers: Dict[str, SynapseHandler] = {}
+        self.attach_handler(
             forward_fn=self.forward,
             blacklist_fn=self.blacklist,
             priority_fn=self.priority,
@@ -66,11 +132,304 @@ class BaseMinerNeuron(BaseNeuron):
         bt.logging.info(f"Axon created: {self.axon}")
 
         # Instantiate runners
+        self.exit_event = threading.Event()
         self.should_exit: bool = False
         self.is_running: bool = False
         self.thread: threading.Thread = None
         self.lock = asyncio.Lock()
 
+        # Block at which the metagraph was last synced, used to schedule the next sync. The chain state is anchored to
+        # the current block when the metagraph was loaded from a snapshot, whose own block can be many epochs old.
+        self.last_sync_block: int = (
+            self.chain.block
+            if self.metagraph_reconciler is not None
+            else int(self.metagraph.block)
+        )
+
+    @property
+    def should_exit(self) -> bool:
+        return self.exit_event.is_set()
+
+    @should_exit.setter
+    def should_exit(self, value: bool):
+        # Backed by an event so that setting it wakes up the main loop immediately.
+        if value:
+            self.exit_event.set()
+        else:
+            self.exit_event.clear()
+
+    def load_metagraph(self):
+        """
+        Uses the lite metagraph (hotkeys, stake and validator permits only) if `--neuron.lite_metagraph` is set.
+        """
+        if not self.config.neuron.lite_metagraph:
+            return super().load_metagraph()
+        return LiteMetagraph(
+            self.config.netuid,
+            full_sync_interval=self.config.neuron.full_sync_interval,
+        ).sync(subtensor=self.subtensor)
+
+    @staticmethod
+    def worker_init() -> Any:
+        """
+        Builds the state used by `worker_forward`, e.g. loads the model. With `--forward_pool.size` > 0 it is called
+        once in every worker process, otherwise once in the miner process. Either way it runs during the warm-up.
+        """
+        return None
+
+    @staticmethod
+    @abstractmethod
+    def worker_forward(state: Any, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Synchronous, CPU bound body of the forward function. Receives the state built by `worker_init` and the
+        protocol fields of the incoming synapse, and returns the fields to set on the response.
+
+        It must be a static method so it can be shipped to the forward pool workers. Use `run_worker_forward` from
+        `forward` to call it.
+        """
+        ...
+
+    async def run_worker_forward(self, synapse: bt.Synapse) -> bt.Synapse:
+        """
+        Runs `worker_forward` for the synapse, on the forward pool if it is enabled, and fills in the response fields.
+        """
+        request = synapse_fields(synapse)
+        if self.forward_pool is not None:
+            response = await self.forward_pool.run(request)
+        else:
+            if not self.worker_state_ready.is_set():
+                raise RuntimeError(
+                    "Worker state is not initialized yet, the miner is still warming up."
+                )
+            response = self.worker_forward(self.worker_state, request)
+        return apply_fields(synapse, response)
+
+    def attach_handler(
+        self,
+        forward_fn: Callable,
+        blacklist_fn: Callable = None,
+        priority_fn: Callable = None,
+        max_concurrency: int = None,
+        max_queue: int = None,
+        executor: Executor = None,
+    ) -> SynapseHandler:
+        """
+        Attaches a forward function for one synapse type to the axon, served by its own `SynapseHandler`. The
+        synapse type is taken from the annotation of the `synapse` argument of `forward_fn`, and `blacklist_fn` and
+        `priority_fn` must take the same type.
+
+        Example:
+            self.attach_handler(
+                forward_fn=self.forward_stream,
+                blacklist_fn=self.blacklist_stream,
+                priority_fn=self.priority_stream,
+                max_concurrency=4,
+                max_queue=16,
+            )
+
+        Args:
+            forward_fn (Callable): The forward function. Must be async unless `executor` is given.
+            blacklist_fn (Callable, optional): The blacklist function for this synapse type.
+            priority_fn (Callable, optional): The priority function for this synapse type.
+            max_concurrency (int, optional): Maximum number of concurrent requests. Defaults to `--handler.max_concurrency`.
+            max_queue (int, optional): Maximum number of waiting requests. Defaults to `--handler.max_queue`.
+            executor (Executor, optional): Executor running a synchronous `forward_fn` off the axon event loop.
+
+        Returns:
+            SynapseHandler: The handler, which holds the metrics of this synapse type.
+        """
+        synapse_type = next(
+            iter(inspect.signature(forward_fn).parameters.values())
+        ).annotation
+        handler = SynapseHandler(
+            name=synapse_type.__name__,
+            max_concurrency=self.config.handler.max_concurrency
+            if max_concurrency is None
+            else max_concurrency,
+            max_queue=self.config.handler.max_queue
+            if max_queue is None
+            else max_queue,
+            executor=executor,
+            stream_start_timeout=self.config.handler.stream_start_timeout,
+        )
+        self.axon.attach(
+            forward_fn=self._wrap_forward(forward_fn, handler),
+            blacklist_fn=blacklist_fn,
+            priority_fn=priority_fn,
+            verify_fn=self._verify_fn(forward_fn)
+            if self.verify_cache is not None
+            else None,
+        )
+        self.handlers[handler.name] = handler
+        return handler
+
+    def _wrap_forward(self, forward_fn, handler: SynapseHandler):
+        """
+        Wraps the forward function attached to the axon to serve cached responses, to apply the limits of its
+        handler, to cancel requests at their deadline and to report the latency of the first request served. The
+        wrapper keeps the signature of `forward_fn`, which the axon uses to route requests.
+        """
+        run = functools.partial(handler.run, forward_fn)
+
+        async def serve(synapse):
+            if self.is_cacheable(synapse):
+                return await self._cached_forward(run, synapse)
+            return await run(synapse)
+
+        @functools.wraps(forward_fn)
+        async def forward(synapse):
+            start_time = time.perf_counter()
+            if self.config.neuron.deadline_off:
+                response = await serve(synapse)
+            else:
+                deadline = Deadline(
+                    synapse.timeout, margin=self.config.neuron.deadline_margin
+                )
+                response = await deadline.run(serve, synapse)
+                if deadline.cancelled:
+                    bt.logging.warning(
+                        f"{handler.name} request reached its deadline, returning a partial response."
+                    )
+            if self.first_request_latency is None:
+                self.first_request_latency = time.perf_counter() - start_time
+                bt.logging.info(
+                    f"First request served in {self.first_request_latency:.3f}s."
+                )
+            return response
+
+        return forward
+
+    def _verify_fn(self, forward_fn):
+        """
+        Builds the verify function attached to the axon. The axon requires it to take the same synapse type as
+        `forward_fn` and to return None.
+        """
+        synapse_type = next(
+            iter(inspect.signature(forward_fn).parameters.values())
+        ).annotation
+
+        async def verify(synapse) -> None:
+            self.verify_cache.verify(synapse, self.wallet.hotkey.ss58_address)
+
+        verify.__signature__ = inspect.Signature(
+            [
+                inspect.Parameter(
+                    "synapse",
+                    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                    annotation=synapse_type,
+                )
+            ],
+            return_annotation=None,
+        )
+        return verify
+
+    def is_cacheable(self, synapse: bt.Synapse) -> bool:
+        """Returns True if responses to this synapse type may be served from the response cache."""
+        return (
+            self.response_cache is not None
+            and type(synapse).__name__ in self.config.response_cache.synapses
+        )
+
+    async def _cached_forward(self, forward_fn, synapse: bt.Synapse):
+        scope = None
+        if self.config.response_cache.per_caller:
+            scope = synapse.dendrite.hotkey
+        key = self.response_cache.key(synapse, scope=scope)
+
+        # Only the response fields are cached and written back, the request fields of each caller are kept.
+        async def compute():
+            return response_fields(await forward_fn(synapse))
+
+        fields = await self.response_cache.get_or_compute_async(key, compute)
+        return apply_fields(synapse, fields)
+
+    def warmup(self):
+        """
+        Hook for heavy initialization, e.g. loading a model or JIT compiling it. It runs in a background thread in
+        parallel with the first chain sync, and the axon is only served once it returned.
+        """
+        pass
+
+    def warmup_synapses(self) -> List[bt.Synapse]:
+        """
+        Synthetic requests sent through `forward` after `warmup`, so the first real requests hit warm code paths.
+        Called once per warm-up round, so it should return new synapse objects every time.
+        """
+        return []
+
+    def is_ready(self) -> bool:
+        """
+        Readiness criteria checked before the axon is served. Defaults to the warm-up having finished; override it
+        to add your own criteria.
+        """
+        return self.warmup_done.is_set()
+
+    def start_warmup(self):
+        """
+        Starts the forward pool workers or builds the inline worker state, then runs `warmup` and the synthetic
+        requests, in a background thread.
+        """
+        self.warmup_done.clear()
+        self.warmup_thread = threading.Thread(
+            target=self._run_warmup, daemon=True
+        )
+        self.warmup_thread.start()
+
+    def _run_warmup(self):
+        start_time = time.time()
+        try:
+            if self.owns_forward_pool:
+                self.forward_pool.start()
+            elif (
+                self.forward_pool is None
+                and not self.worker_state_ready.is_set()
+            ):
+                self.worker_state = type(self).worker_init()
+                self.worker_state_ready.set()
+            self.warmup()
+            asyncio.run(self._run_warmup_requests())
+        except Exception as e:
+            bt.logging.error(f"Warm-up failed: {traceback.format_exc()}")
+        finally:
+            self.warmup_done.set()
+            bt.logging.info(
+                f"Warm-up finished in {time.time() - start_time:.3f}s."
+            )
+
+    async def _run_warmup_requests(self):
+        # Repeat rounds of synthetic requests until the slowest one is within --warmup.max_latency.
+        for warmup_round in range(self.config.warmup.max_rounds):
+            synapses = self.warmup_synapses()
+            if not synapses:
+                return
+            latencies = []
+            for synapse in synapses:
+                start_time = time.perf_counter()
+                await self.forward(synapse)
+                latencies.append(time.perf_counter() - start_time)
+            bt.logging.info(
+                f"Warm-up round {warmup_round}: {len(latencies)} requests, max latency {max(latencies):.3f}s."
+            )
+            if (
+                not self.config.warmup.max_latency
+                or max(latencies) <= self.config.warmup.max_latency
+            ):
+                return
+
+    def wait_until_ready(self):
+        """
+        Blocks until `is_ready` returns True, or `--warmup.timeout` seconds have passed, in which case the axon is
+        served anyway.
+        """
+        deadline = time.time() + self.config.warmup.timeout
+        while not self.is_ready() and not self.should_exit:
+            if time.time() > deadline:
+                bt.logging.warning(
+                    f"Miner not ready after {self.config.warmup.timeout}s, serving the axon anyway."
+                )
+                return
+            self.exit_event.wait(0.1)
+
     def run(self):
         """
         Initiates and manages the main loop for the miner on the Bittensor network. The main loop handles graceful shutdown on keyboard interrupts and logs unforeseen errors.
@@ -94,42 +453,49 @@ class BaseMinerNeuron(BaseNeuron):
             Exception: For unforeseen errors during the miner's operation, which are logged for diagnosis.
         """
 
-        # Check that miner is registered on the network.
-        self.sync()
+        start_time = time.time()
 
-        # Serve passes the axon information to the network + netuid we are hosting on.
-        # This will auto-update if the axon port of external ip have changed.
-        bt.logging.info(
-            f"Serving miner axon {self.axon} on network: {self.config.subtensor.chain_endpoint} with netuid: {self.config.netuid}"
-        )
-        self.axon.serve(netuid=self.config.netuid, subtensor=self.subtensor)
+        # Warm up in the background while checking that the miner is registered on the network.
+        self.start_warmup()
+        self.sync()
 
-        # Start  starts the miner's axon, making it active on the network.
-        self.axon.start()
+        # Publish and start the axon once the miner is ready to answer quickly.
+        self.wait_until_ready()
+        self.serve_axon()
+        self.time_to_ready = time.time() - start_time
+        bt.logging.info(f"Miner ready in {self.time_to_ready:.3f}s.")
 
         bt.logging.info(f"Miner starting at block: {self.block}")
 
         # This loop maintains the miner's operations until intentionally stopped.
         try:
             while not self.should_exit:
-                while (
-                    self.block - self.metagraph.last_update[self.uid]
-                    < self.config.neuron.epoch_length
+                # Sleep until the next epoch boundary.
+                if not self.wait_for_block(
+                    self.last_sync_block + self.config.neuron.epoch_length
                 ):
-                    # Wait before checking again.
-                    time.sleep(1)
-
-                    # Check if we should exit.
-                    if self.should_exit:
-                        break
+                    break
 
                 # Sync metagraph and potentially set weights.
                 self.sync()
                 self.step += 1
 
+                for name, handler in self.handlers.items():
+                    bt.logging.info(f"{name} handler: {handler.stats()}")
+                if self.response_cache is not None:
+                    bt.logging.info(
+                        f"Response cache: {self.response_cache.stats()}"
+                    )
+                if self.verify_cache is not None:
+                    bt.logging.info(
+                        f"Verification cache: {self.verify_cache.stats()}"
+                    )
+
         # If someone intentionally stops the miner, it'll safely terminate operations.
         except KeyboardInterrupt:
             self.axon.stop()
+            if self.forward_pool is not None and self.owns_forward_pool:
+                self.forward_pool.shutdown()
             bt.logging.success("Miner killed by keyboard interrupt.")
             exit()
 
@@ -137,6 +503,42 @@ class BaseMinerNeuron(BaseNeuron):
         except Exception as e:
             bt.logging.error(traceback.format_exc())
 
+    def serve_axon(self):
+        """Publishes the axon information to the chain and starts serving requests."""
+
+        # Serve passes the axon information to the network + netuid we are hosting on.
+        # This will auto-update if the axon port of external ip have changed.
+        bt.logging.info(
+            f"Serving miner axon {self.axon} on network: {self.config.subtensor.chain_endpoint} with netuid: {self.config.netuid}"
+        )
+        self.axon.serve(netuid=self.config.netuid, subtensor=self.subtensor)
+
+        # Start  starts the miner's axon, making it active on the network.
+        self.axon.start()
+
+    def wait_for_block(self, target_block: int) -> bool:
+        """
+        Sleeps until the chain reaches `target_block`.
+
+        Instead of polling the chain, the wake up time is predicted from the block time and the chain is queried
+        once when waking up. If the chain is behind the prediction, it sleeps again for the remaining blocks.
+
+        Args:
+            target_block (int): The block to wait for.
+
+        Returns:
+            bool: True once the block is reached, False if the miner was asked to exit while waiting.
+        """
+        while not self.should_exit:
+            remaining_blocks = target_block - self.block
+            if remaining_blocks <= 0:
+                return True
+            bt.logging.debug(
+                f"Sleeping {remaining_blocks} blocks until block {target_block}."
+            )
+            self.exit_event.wait(remaining_blocks * bt.__blocktime__)
+        return False
+
     def run_in_background_thread(self):
         """
         Starts the miner's operations in a separate background thread.
@@ -158,6 +560,8 @@ class BaseMinerNeuron(BaseNeuron):
             bt.logging.debug("Stopping miner in background thread.")
             self.should_exit = True
             self.thread.join(5)
+            if self.forward_pool is not None and self.owns_forward_pool:
+                self.forward_pool.shutdown()
             self.is_running = False
             bt.logging.debug("Stopped")
 
@@ -184,9 +588,22 @@ class BaseMinerNeuron(BaseNeuron):
         """
         self.stop_run_thread()
 
+    def should_sync_metagraph(self) -> bool:
+        """
+        Miners never set weights, so their last_update does not move. Schedule syncs from the last sync instead.
+        """
+        return (
+            self.block - self.last_sync_block
+            >= self.config.neuron.epoch_length
+        )
+
     def resync_metagraph(self):
         """Resyncs the metagraph and updates the hotkeys and moving averages based on the new metagraph."""
         bt.logging.info("resync_metagraph()")
 
-        # Sync the metagraph.
-        self.metagraph.sync(subtensor=self.subtensor)
+        # Sync the metagraph. Miners only need the lite neuron info (no weights or bonds).
+        if isinstance(self.metagraph, LiteMetagraph):
+            self.metagraph.refresh(subtensor=self.subtensor)
+        else:
+            self.sync_metagraph(lite=True)
+        self.last_sync_block = int(self.metagraph.block)
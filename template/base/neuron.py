@@ -15,6 +15,7 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
+import os
 import copy
 import typing
 
@@ -23,8 +24,14 @@ import bittensor as bt
 from abc import ABC, abstractmethod
 
 # Sync calls set weights and also resyncs the metagraph.
-from template.utils.config import check_config, add_args, config
-from template.utils.misc import ttl_get_block
+from template.utils.config import (
+    check_config,
+    add_args,
+    config,
+    resolve_device,
+)
+from template.utils.chain import ChainState
+from template.utils.snapshot import MetagraphReconciler, MetagraphSnapshots
 from template import __spec_version__ as spec_version
 from template.mock import MockSubtensor, MockMetagraph
 
@@ -57,18 +64,20 @@ class BaseNeuron(ABC):
 
     @property
     def block(self):
-        return ttl_get_block(self)
+        return self.chain.block
 
-    def __init__(self, config=None):
-        base_config = copy.deepcopy(config or BaseNeuron.config())
+    def __init__(self, config=None, subtensor=None, metagraph=None):
+        # The command line is parsed once; a config passed in overrides it.
         self.config = self.config()
-        self.config.merge(base_config)
+        if config is not None:
+            self.config.merge(copy.deepcopy(config))
         self.check_config(self.config)
 
         # Set up logging with the provided configuration and directory.
         bt.logging(config=self.config, logging_dir=self.config.full_path)
 
         # If a gpu is required, set the device to cuda:N (e.g. cuda:0)
+        self.config.neuron.device = resolve_device(self.config.neuron.device)
         self.device = self.config.neuron.device
 
         # Log the configuration for reference.
@@ -76,26 +85,45 @@ class BaseNeuron(ABC):
 
         # Build Bittensor objects
         # These are core Bittensor classes to interact with the network.
+        # A subtensor and metagraph can be passed in to share them between several neurons in one process.
         bt.logging.info("Setting up bittensor objects.")
 
         # The wallet holds the cryptographic key pairs for the miner.
         if self.config.mock:
             self.wallet = bt.MockWallet(config=self.config)
-            self.subtensor = MockSubtensor(
+            self.subtensor = subtensor or MockSubtensor(
                 self.config.netuid, wallet=self.wallet
             )
-            self.metagraph = MockMetagraph(
-                self.config.netuid, subtensor=self.subtensor
-            )
         else:
             self.wallet = bt.wallet(config=self.config)
-            self.subtensor = bt.subtensor(config=self.config)
-            self.metagraph = self.subtensor.metagraph(self.config.netuid)
+            self.subtensor = subtensor or bt.subtensor(config=self.config)
+
+        # Versioned snapshots of the metagraph, next to the state of the neuron, to restart without a full sync.
+        self.metagraph_snapshots = MetagraphSnapshots(
+            os.path.join(self.config.neuron.full_path, "metagraph"),
+            keep=self.config.neuron.metagraph_snapshot_keep,
+        )
+        self.metagraph_reconciler: typing.Optional[MetagraphReconciler] = None
+        self.metagraph = (
+            metagraph if metagraph is not None else self.load_metagraph()
+        )
 
         bt.logging.info(f"Wallet: {self.wallet}")
         bt.logging.info(f"Subtensor: {self.subtensor}")
         bt.logging.info(f"Metagraph: {self.metagraph}")
 
+        # Registration, current block and last weights update, kept without querying the chain on every step.
+        self.chain = ChainState(
+            self.subtensor,
+            netuid=self.config.netuid,
+            hotkey=self.wallet.hotkey.ss58_address,
+            ttl_blocks=self.config.neuron.epoch_length,
+        )
+        self.chain.observe(self.metagraph)
+        if self.metagraph_reconciler is not None:
+            # The block of the snapshot is old: anchor the block prediction to the chain instead.
+            self.chain.current_block()
+
         # Check if the miner is registered on the Bittensor network before proceeding further.
         self.check_registered()
 
@@ -108,6 +136,90 @@ class BaseNeuron(ABC):
         )
         self.step = 0
 
+    def load_metagraph(self):
+        """
+        Builds and syncs the metagraph used by this neuron. Override it to use a different metagraph implementation.
+
+        Starts from the most recent snapshot if there is one, while a fresh metagraph is fetched in the background.
+        """
+        if self.config.mock:
+            return MockMetagraph(self.config.netuid, subtensor=self.subtensor)
+        if not self.config.neuron.metagraph_snapshot_off:
+            metagraph = self.load_metagraph_snapshot()
+            if metagraph is not None:
+                return metagraph
+        metagraph = self.subtensor.metagraph(self.config.netuid)
+        self.save_metagraph_snapshot(metagraph)
+        return metagraph
+
+    def load_metagraph_snapshot(self) -> typing.Optional["bt.metagraph"]:
+        """
+        Loads the most recent metagraph snapshot and starts fetching a fresh metagraph in the background. Returns None
+        if there is no snapshot, or it is more than `neuron.metagraph_snapshot_max_age` blocks old.
+        """
+        block = self.metagraph_snapshots.latest_block()
+        if block is None:
+            return None
+        age = self.subtensor.get_current_block() - block
+        if age > self.config.neuron.metagraph_snapshot_max_age:
+            bt.logging.info(
+                f"Metagraph snapshot of block {block} is {age} blocks old, syncing instead."
+            )
+            return None
+
+        metagraph = bt.metagraph(
+            netuid=self.config.netuid,
+            network=self.subtensor.network,
+            sync=False,
+        )
+        if not self.metagraph_snapshots.load(metagraph):
+            return None
+        bt.logging.info(
+            f"Loaded metagraph snapshot of block {block} ({age} blocks old), fetching a fresh one in the background."
+        )
+        self.metagraph_reconciler = MetagraphReconciler(
+            self.metagraph_snapshots, self.fetch_metagraph
+        )
+        self.metagraph_reconciler.start()
+        return metagraph
+
+    def fetch_metagraph(self) -> "bt.metagraph":
+        """Fetches a fresh metagraph over a new subtensor connection. Runs in the background."""
+        subtensor = bt.subtensor(config=self.config)
+        try:
+            return subtensor.metagraph(self.config.netuid)
+        finally:
+            subtensor.substrate.close()
+
+    def save_metagraph_snapshot(self, metagraph: "bt.metagraph" = None):
+        """Saves a snapshot of the metagraph, unless snapshots are turned off or the metagraph is not a bt.metagraph."""
+        metagraph = metagraph if metagraph is not None else self.metagraph
+        if (
+            self.config.mock
+            or self.config.neuron.metagraph_snapshot_off
+            or not isinstance(metagraph, bt.metagraph)
+        ):
+            return
+        try:
+            self.metagraph_snapshots.save(metagraph)
+        except Exception as e:
+            bt.logging.warning(f"Failed to save metagraph snapshot: {e}")
+
+    def sync_metagraph(self, **kwargs):
+        """
+        Updates the metagraph in place: from the metagraph fetched in the background if there is one, from the chain
+        otherwise, in which case a snapshot is saved. Keyword arguments are passed to `metagraph.sync`.
+        """
+        reconciler, self.metagraph_reconciler = self.metagraph_reconciler, None
+        if (
+            reconciler is not None
+            and reconciler.succeeded
+            and self.metagraph_snapshots.load(self.metagraph)
+        ):
+            return
+        self.metagraph.sync(subtensor=self.subtensor, **kwargs)
+        self.save_metagraph_snapshot()
+
     @abstractmethod
     async def forward(self, synapse: bt.Synapse) -> bt.Synapse:
         ...
@@ -123,8 +235,9 @@ class BaseNeuron(ABC):
         # Ensure miner or validator hotkey is still registered on the network.
         self.check_registered()
 
-        if self.should_sync_metagraph():
+        if self.metagraph_sync_due():
             self.resync_metagraph()
+            self.chain.observe(self.metagraph)
 
         if self.should_set_weights():
             self.set_weights()
@@ -133,40 +246,47 @@ class BaseNeuron(ABC):
         self.save_state()
 
     def check_registered(self):
-        # --- Check for registration.
-        if not self.subtensor.is_hotkey_registered(
-            netuid=self.config.netuid,
-            hotkey_ss58=self.wallet.hotkey.ss58_address,
-        ):
+        # --- Check for registration. Only asks the chain if the last known status is stale.
+        if not self.chain.is_registered():
             bt.logging.error(
                 f"Wallet: {self.wallet} is not registered on netuid {self.config.netuid}."
                 f" Please register the hotkey using `btcli subnets register` before trying again"
             )
             exit()
 
+    def metagraph_sync_due(self) -> bool:
+        # While a fresh metagraph is fetched in the background, adopt it once ready instead of syncing in the meantime.
+        if self.metagraph_reconciler is not None:
+            return self.metagraph_reconciler.done
+        return self.should_sync_metagraph()
+
     def should_sync_metagraph(self):
         """
         Check if enough epoch blocks have elapsed since the last checkpoint to sync.
         """
         return (
-            self.block - self.metagraph.last_update[self.uid]
-        ) > self.config.neuron.epoch_length
+            self.chain.blocks_since_last_update()
+            > self.config.neuron.epoch_length
+        )
 
     def should_set_weights(self) -> bool:
         # Don't set weights on initialization.
         if self.step == 0:
             return False
 
+        # Don't set weights if you're a miner.
+        if self.neuron_type == "MinerNeuron":
+            return False
+
         # Check if enough epoch blocks have elapsed since the last epoch.
         if self.config.neuron.disable_set_weights:
             return False
 
         # Define appropriate logic for when set weights.
         return (
-            (self.block - self.metagraph.last_update[self.uid])
+            self.chain.blocks_since_last_update()
             > self.config.neuron.epoch_length
-            and self.neuron_type != "MinerNeuron"
-        )  # don't set weights if you're a miner
+        )
 
     def save_state(self):
         bt.logging.warning(
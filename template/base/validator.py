@@ -19,7 +19,6 @@
 
 
 import copy
-import torch
 import asyncio
 import argparse
 import threading
@@ -30,6 +29,8 @@ from traceback import print_exception
 
 from template.base.neuron import BaseNeuron
 from template.mock import MockDendrite
+from template.validator.weights import WeightSubmitter
+from template.validator.scores import RewardBuffer, get_score_backend
 from template.utils.config import add_validator_args
 
 
@@ -60,9 +61,31 @@ class BaseValidatorNeuron(BaseNeuron):
 
         # Set up initial scoring weights for validation
         bt.logging.info("Building validation weights.")
-        self.scores = torch.zeros(
-            self.metagraph.n, dtype=torch.float32, device=self.device
+        self.score_backend = get_score_backend(
+            self.config.neuron.score_backend, device=self.device
         )
+        self.scores = self.score_backend.zeros(self.metagraph.n)
+        # Rewards of the forwards of the current step, applied to the scores once the step is over.
+        self.reward_buffer = RewardBuffer()
+
+        # Weights are set from a background thread with its own subtensor connection, off the forward loop.
+        self.weight_submitter = WeightSubmitter(
+            subtensor=self.subtensor
+            if self.config.mock
+            else bt.subtensor(config=self.config),
+            wallet=self.wallet,
+            netuid=self.config.netuid,
+            metagraph=self.metagraph,
+            version_key=self.spec_version,
+            window=self.config.neuron.epoch_length * bt.__blocktime__,
+            initial_backoff=self.config.neuron.set_weights_backoff,
+            max_backoff=self.config.neuron.set_weights_max_backoff,
+            change_threshold=self.config.neuron.weights_change_threshold,
+            max_staleness=self.config.neuron.weights_max_staleness
+            * bt.__blocktime__,
+            on_success=self.chain.record_weights_set,
+        )
+        self.weight_submitter.start()
 
         # Init sync with the network. Updates the metagraph.
         self.sync()
@@ -144,8 +167,9 @@ class BaseValidatorNeuron(BaseNeuron):
             while True:
                 bt.logging.info(f"step({self.step}) block({self.block})")
 
-                # Run multiple forwards concurrently.
+                # Run multiple forwards concurrently, then apply their rewards together.
                 self.loop.run_until_complete(self.concurrent_forward())
+                self.flush_scores()
 
                 # Check if we should exit.
                 if self.should_exit:
@@ -159,6 +183,7 @@ class BaseValidatorNeuron(BaseNeuron):
         # If someone intentionally stops the validator, it'll safely terminate operations.
         except KeyboardInterrupt:
             self.axon.stop()
+            self.weight_submitter.stop()
             bt.logging.success("Validator killed by keyboard interrupt.")
             exit()
 
@@ -190,6 +215,7 @@ class BaseValidatorNeuron(BaseNeuron):
             bt.logging.debug("Stopping validator in background thread.")
             self.should_exit = True
             self.thread.join(5)
+            self.weight_submitter.stop()
             self.is_running = False
             bt.logging.debug("Stopped")
 
@@ -214,64 +240,36 @@ class BaseValidatorNeuron(BaseNeuron):
             bt.logging.debug("Stopping validator in background thread.")
             self.should_exit = True
             self.thread.join(5)
+            self.weight_submitter.stop()
             self.is_running = False
             bt.logging.debug("Stopped")
 
     def set_weights(self):
         """
         Sets the validator weights to the metagraph hotkeys based on the scores it has received from the miners. The weights determine the trust and incentive level the validator assigns to miner nodes on the network.
+
+        The weights are handed to the weight submitter, which sets them on chain from its own thread and retries on
+        failure, so this returns immediately.
         """
 
+        self.flush_scores()
+
         # Check if self.scores contains any NaN values and log a warning if it does.
-        if torch.isnan(self.scores).any():
+        if self.score_backend.has_nan(self.scores):
             bt.logging.warning(
                 f"Scores contain NaN values. This may be due to a lack of responses from miners, or a bug in your reward functions."
             )
 
         # Calculate the average reward for each uid across non-zero values.
         # Replace any NaN values with 0.
-        raw_weights = torch.nn.functional.normalize(self.scores, p=1, dim=0)
+        raw_weights = self.score_backend.normalize(self.scores)
 
         bt.logging.debug("raw_weights", raw_weights)
         bt.logging.debug("raw_weight_uids", self.metagraph.uids.to("cpu"))
-        # Process the raw weights to final_weights via subtensor limitations.
-        (
-            processed_weight_uids,
-            processed_weights,
-        ) = bt.utils.weight_utils.process_weights_for_netuid(
-            uids=self.metagraph.uids.to("cpu"),
-            weights=raw_weights.to("cpu"),
-            netuid=self.config.netuid,
-            subtensor=self.subtensor,
-            metagraph=self.metagraph,
-        )
-        bt.logging.debug("processed_weights", processed_weights)
-        bt.logging.debug("processed_weight_uids", processed_weight_uids)
-
-        # Convert to uint16 weights and uids.
-        (
-            uint_uids,
-            uint_weights,
-        ) = bt.utils.weight_utils.convert_weights_and_uids_for_emit(
-            uids=processed_weight_uids, weights=processed_weights
-        )
-        bt.logging.debug("uint_weights", uint_weights)
-        bt.logging.debug("uint_uids", uint_uids)
 
-        # Set the weights on chain via our subtensor connection.
-        result, msg = self.subtensor.set_weights(
-            wallet=self.wallet,
-            netuid=self.config.netuid,
-            uids=uint_uids,
-            weights=uint_weights,
-            wait_for_finalization=False,
-            wait_for_inclusion=False,
-            version_key=self.spec_version,
-        )
-        if result is True:
-            bt.logging.info("set_weights on chain successfully!")
-        else:
-            bt.logging.error("set_weights failed", msg)
+        # Processing the weights and the chain call run on the submitter thread.
+        self.weight_submitter.submit(self.metagraph.uids, raw_weights)
+        bt.logging.debug(f"Weight submitter: {self.weight_submitter.stats()}")
 
     def resync_metagraph(self):
         """Resyncs the metagraph and updates the hotkeys and moving averages based on the new metagraph."""
@@ -280,8 +278,8 @@ class BaseValidatorNeuron(BaseNeuron):
         # Copies state of metagraph before syncing.
         previous_metagraph = copy.deepcopy(self.metagraph)
 
-        # Sync the metagraph.
-        self.metagraph.sync(subtensor=self.subtensor)
+        # Sync the metagraph, or adopt the one fetched in the background.
+        self.sync_metagraph()
 
         # Check if the metagraph axon info has changed.
         if previous_metagraph.axons == self.metagraph.axons:
@@ -299,58 +297,53 @@ class BaseValidatorNeuron(BaseNeuron):
         # If so, we need to add new hotkeys and moving averages.
         if len(self.hotkeys) < len(self.metagraph.hotkeys):
             # Update the size of the moving average scores.
-            new_moving_average = torch.zeros((self.metagraph.n)).to(
-                self.device
-            )
             min_len = min(len(self.hotkeys), len(self.scores))
-            new_moving_average[:min_len] = self.scores[:min_len]
-            self.scores = new_moving_average
+            self.scores = self.score_backend.resize(
+                self.scores, self.metagraph.n, keep=min_len
+            )
 
         # Update the hotkeys.
         self.hotkeys = copy.deepcopy(self.metagraph.hotkeys)
 
-    def update_scores(self, rewards: torch.FloatTensor, uids: List[int]):
-        """Performs exponential moving average on the scores based on the rewards received from the miners."""
+    def update_scores(self, rewards, uids: List[int]):
+        """
+        Records the rewards received from the miners. They are applied to the moving average scores by
+        `flush_scores` once the step is over, in the order they were recorded, so concurrent forwards never
+        overwrite each other's updates.
+        """
 
-        # Check if rewards contains NaN values.
-        if torch.isnan(rewards).any():
+        # Check if rewards contains NaN values. They are replaced with 0.
+        if self.score_backend.has_nan(rewards):
             bt.logging.warning(f"NaN values detected in rewards: {rewards}")
-            # Replace any NaN values in rewards with 0.
-            rewards = torch.nan_to_num(rewards, 0)
 
-        # Check if `uids` is already a tensor and clone it to avoid the warning.
-        if isinstance(uids, torch.Tensor):
-            uids_tensor = uids.clone().detach()
-        else:
-            uids_tensor = torch.tensor(uids).to(self.device)
+        self.reward_buffer.append(uids, rewards)
 
-        # Compute forward pass rewards, assumes uids are mutually exclusive.
-        # shape: [ metagraph.n ]
-        scattered_rewards: torch.FloatTensor = self.scores.scatter(
-            0, uids_tensor, rewards
-        ).to(self.device)
-        bt.logging.debug(f"Scattered rewards: {rewards}")
+    def flush_scores(self):
+        """Performs exponential moving average on the scores based on the rewards recorded since the last flush."""
+        if not len(self.reward_buffer):
+            return
 
         # Update scores with rewards produced by this step.
         # shape: [ metagraph.n ]
         alpha: float = self.config.neuron.moving_average_alpha
-        self.scores: torch.FloatTensor = alpha * scattered_rewards + (
-            1 - alpha
-        ) * self.scores.to(self.device)
+        self.scores = self.reward_buffer.flush(
+            self.score_backend, self.scores, alpha
+        )
         bt.logging.debug(f"Updated moving avg scores: {self.scores}")
 
     def save_state(self):
         """Saves the state of the validator to a file."""
         bt.logging.info("Saving validator state.")
+        self.flush_scores()
 
         # Save the state of the validator to file.
-        torch.save(
+        self.score_backend.save(
+            self.config.neuron.full_path,
             {
                 "step": self.step,
                 "scores": self.scores,
                 "hotkeys": self.hotkeys,
             },
-            self.config.neuron.full_path + "/state.pt",
         )
 
     def load_state(self):
@@ -358,7 +351,7 @@ class BaseValidatorNeuron(BaseNeuron):
         bt.logging.info("Loading validator state.")
 
         # Load the state of the validator from file.
-        state = torch.load(self.config.neuron.full_path + "/state.pt")
+        state = self.score_backend.load(self.config.neuron.full_path)
         self.step = state["step"]
         self.scores = state["scores"]
         self.hotkeys = state["hotkeys"]
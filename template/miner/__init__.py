@@ -0,0 +1,6 @@
+from .pool import ForwardPool
+from .metagraph import LiteMetagraph
+from .cache import ResponseCache
+from .verify import VerificationCache
+from .handler import SynapseHandler
+from .deadline import Deadline, current_deadline
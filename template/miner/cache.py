@@ -0,0 +1,63 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+
+import json
+import hashlib
+import bittensor as bt
+
+from typing import Optional
+
+from template.utils.cache import TTLCache
+from template.utils.synapse import request_fields
+
+
+class ResponseCache(TTLCache):
+    """
+    A bounded cache of miner responses, keyed by a canonical hash of the request fields of the synapse. Response
+    fields are left out of the key, so a request whose response fields were pre-filled by the client still hits the
+    cache. See `request_fields` for how request fields are found; a synapse type can name them explicitly with a
+    `cache_key_fields: typing.ClassVar[typing.Tuple[str, ...]]` class variable.
+
+    Entries expire `ttl` seconds after they were stored and the least recently used entry is evicted once the cache
+    holds `max_size` entries. Concurrent requests for the same key share a single computation (single-flight) through
+    `get_or_compute_async`: the first one computes the response, the others wait for it instead of computing it
+    again.
+
+    The cache must be used from a single event loop, which is the case for requests served by the axon.
+
+    Args:
+        max_size (int): Maximum number of cached responses.
+        ttl (float): Lifetime of a cached response, in seconds.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(maxsize=max_size, ttl=ttl)
+
+    @staticmethod
+    def key(synapse: bt.Synapse, scope: Optional[str] = None) -> str:
+        """
+        Returns the cache key of a request: a hash of the synapse type, its request fields and an optional scope
+        (e.g. the caller hotkey, to keep responses private to each caller).
+        """
+        payload = json.dumps(
+            [type(synapse).__name__, request_fields(synapse), scope],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,154 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import asyncio
+import contextvars
+import bittensor as bt
+
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+def current_deadline() -> Optional["Deadline"]:
+    """
+    Returns the deadline of the request being served by the current task, or None outside of a request. Forward
+    implementations use it to adapt their work to the time left without changing their signature.
+    """
+    return _current_deadline.get()
+
+
+class Deadline:
+    """
+    The time budget of one request, derived from the timeout the validator sent with the synapse.
+
+    Forward implementations cooperate with it in three ways:
+        - `remaining()` tells how much time is left, e.g. to pick a cheaper model or a smaller search.
+        - `on_cancel(hook)` registers a function called when the request runs out of time, e.g. to stop a
+          generation running on another thread.
+        - `offer(result)` records the best result so far, and `best(results)` does it for an async iterator of
+          improving results. When the deadline is reached, the best result is returned instead of an error.
+
+    Example:
+        async def forward(self, synapse: Dummy) -> Dummy:
+            deadline = current_deadline()
+            async for output in self.refine(synapse.dummy_input):
+                synapse.dummy_output = output
+                deadline.offer(synapse)
+            return synapse
+
+    Args:
+        timeout (float): Timeout of the request in seconds. If None, the request has no deadline.
+        margin (float): Seconds kept aside to send the response back before the validator gives up on it.
+    """
+
+    def __init__(self, timeout: Optional[float], margin: float = 0.0):
+        self.start = time.monotonic()
+        self.expires_at = (
+            float("inf")
+            if timeout is None
+            else self.start + max(timeout - margin, 0.0)
+        )
+        self.partial: Any = None
+        self.cancelled = False
+        self._hooks: List[Callable[[], None]] = []
+
+    def remaining(self) -> float:
+        """Returns the number of seconds left before the deadline, 0 if it has passed."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def _timeout(self) -> Optional[float]:
+        # asyncio.wait_for takes None, not infinity, for no timeout.
+        return None if self.expires_at == float("inf") else self.remaining()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def on_cancel(self, hook: Callable[[], None]):
+        """Registers a function called without arguments when the request is cancelled at the deadline."""
+        if self.cancelled:
+            hook()
+        else:
+            self._hooks.append(hook)
+
+    def offer(self, result: Any):
+        """Records `result` as the best result so far, returned if the deadline is reached."""
+        self.partial = result
+
+    def cancel(self):
+        """Marks the request as cancelled and runs the cancellation hooks. Errors in hooks are logged."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        for hook in self._hooks:
+            try:
+                hook()
+            except Exception as e:
+                bt.logging.error(f"Deadline cancellation hook failed: {e}")
+        self._hooks.clear()
+
+    async def best(
+        self, results: AsyncIterator[Any], default: Any = None
+    ) -> Any:
+        """
+        Consumes an async iterator of improving results until it is exhausted or the deadline is reached, and
+        returns the last result received, or `default` if there was none. Every result is also offered.
+        """
+        iterator = results.__aiter__()
+        best = default
+        while not self.expired:
+            try:
+                result = await asyncio.wait_for(
+                    iterator.__anext__(), self._timeout()
+                )
+            except (StopAsyncIteration, asyncio.TimeoutError):
+                break
+            best = result
+            self.offer(result)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        return best
+
+    async def run(self, forward_fn: Callable[..., Awaitable[Any]], *args):
+        """
+        Runs `forward_fn(*args)` with this deadline as the current deadline, cancelling it once the deadline is
+        reached.
+
+        Returns:
+            The result of `forward_fn`, or the best partial result offered before the deadline.
+
+        Raises:
+            TimeoutError: If the deadline is reached before any partial result was offered.
+        """
+        token = _current_deadline.set(self)
+        try:
+            return await asyncio.wait_for(forward_fn(*args), self._timeout())
+        except asyncio.TimeoutError:
+            self.cancel()
+            if self.partial is not None:
+                return self.partial
+            raise TimeoutError(
+                f"Request cancelled at its deadline after {time.monotonic() - self.start:.3f}s."
+            )
+        finally:
+            _current_deadline.reset(token)
@@ -0,0 +1,194 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import asyncio
+import bittensor as bt
+
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Optional
+
+
+class SynapseHandler:
+    """
+    Serves the requests of one synapse type with its own concurrency limit, waiting queue, executor and metrics, so
+    that a slow workload (e.g. long streams) cannot take all the resources of the other synapse types.
+
+    At most `max_concurrency` requests run at the same time, and at most `max_queue` more wait for a slot; requests
+    beyond that are rejected immediately. For streaming synapses the slot is held until the stream has been fully
+    sent, not only while `forward` runs, since that is where the work happens. If the axon has not started sending a
+    stream `stream_start_timeout` seconds after `forward` returned, e.g. because the client went away, the slot is
+    released anyway so it cannot leak.
+
+    Args:
+        name (str): Name of the synapse type, used in logs.
+        max_concurrency (int): Maximum number of requests served at the same time. If 0, there is no limit.
+        max_queue (int): Maximum number of requests waiting for a slot.
+        executor (Executor, optional): If given, the forward function is synchronous and runs on this executor
+            instead of on the axon event loop.
+        stream_start_timeout (float): Seconds after which the slot of a stream that was never sent is released.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 0,
+        max_queue: int = 256,
+        executor: Optional[Executor] = None,
+        stream_start_timeout: float = 12.0,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.executor = executor
+        self.stream_start_timeout = stream_start_timeout
+        self._semaphore: asyncio.Semaphore = None
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.abandoned = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._window_start = time.time()
+        self._window_completed = 0
+
+    def _acquire_semaphore(self) -> Optional[asyncio.Semaphore]:
+        # Created lazily so that it belongs to the axon event loop.
+        if self.max_concurrency > 0 and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(
+        self, forward_fn: Callable, synapse: bt.Synapse
+    ) -> bt.Synapse:
+        """
+        Runs `forward_fn` on the synapse within the limits of this handler.
+
+        Raises:
+            RuntimeError: If `max_queue` requests are already waiting for a slot.
+        """
+        semaphore = self._acquire_semaphore()
+        if semaphore is not None:
+            if semaphore.locked() and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise RuntimeError(
+                    f"{self.name} handler is full ({self.waiting} requests waiting)."
+                )
+            self.waiting += 1
+            try:
+                await semaphore.acquire()
+            finally:
+                self.waiting -= 1
+
+        self.in_flight += 1
+        start_time = time.perf_counter()
+        streaming = False
+        try:
+            if self.executor is not None:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, forward_fn, synapse
+                )
+            else:
+                response = await forward_fn(synapse)
+
+            # Streaming responses do their work when they are sent; keep the slot until then.
+            if hasattr(response, "token_streamer"):
+                response.token_streamer = self._hold_slot(
+                    response.token_streamer, start_time
+                )
+                streaming = True
+            return response
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            if not streaming:
+                self._release(start_time)
+
+    def _hold_slot(self, token_streamer: Callable, start_time: float):
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._release(start_time)
+
+        def abandon():
+            # The axon never started sending the stream.
+            if not released:
+                self.abandoned += 1
+                release()
+
+        timer = asyncio.get_running_loop().call_later(
+            self.stream_start_timeout, abandon
+        )
+
+        async def streamer(send):
+            timer.cancel()
+            if released:
+                raise RuntimeError(
+                    f"{self.name} stream started after its slot was released."
+                )
+            try:
+                await token_streamer(send)
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                release()
+
+        return streamer
+
+    def _release(self, start_time: float):
+        latency = time.perf_counter() - start_time
+        self.in_flight -= 1
+        self.completed += 1
+        self._window_completed += 1
+        self._latency_sum += latency
+        self._latency_max = max(self._latency_max, latency)
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the counters of this handler. Latency and throughput cover the requests completed since the
+        previous call.
+        """
+        now = time.time()
+        completed = self._window_completed
+        stats = {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "abandoned": self.abandoned,
+            "throughput": completed / max(now - self._window_start, 1e-9),
+            "mean_latency": self._latency_sum / completed
+            if completed
+            else 0.0,
+            "max_latency": self._latency_max,
+        }
+        self._window_start = now
+        self._window_completed = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        return stats
@@ -0,0 +1,143 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import numpy as np
+import bittensor as bt
+
+from typing import List, Optional
+
+
+class LiteMetagraph:
+    """
+    A miner side view of the metagraph that only keeps what `blacklist` and `priority` need: the hotkeys, the stake
+    and the validator permits of the subnet, stored as a list and two compact numpy arrays.
+
+    The full `bt.metagraph` also holds axons, neuron info objects and a dozen float tensors, which adds up when
+    several miners run on the same machine. This class exposes the same attribute names for the columns it keeps
+    (`hotkeys`, `S`, `validator_permit`, `n`, `uids`, `block`), so it is a drop-in replacement for miners.
+
+    `sync` fetches the lite neuron info of the subnet in one call. `refresh` is cheaper: it only reads the hotkey and
+    validator permit storage of the subnet and fetches the stake of the uids whose hotkey changed. Stake of unchanged
+    hotkeys is refreshed by the periodic full `sync`.
+
+    Args:
+        netuid (int): The subnet to track.
+        full_sync_interval (int): Number of `refresh` calls between two full syncs.
+    """
+
+    def __init__(self, netuid: int, full_sync_interval: int = 10):
+        self.netuid = netuid
+        self.full_sync_interval = full_sync_interval
+        self.block: int = 0
+        self.hotkeys: List[str] = []
+        self.S = np.zeros(0, dtype=np.float32)
+        self.validator_permit = np.zeros(0, dtype=bool)
+        self._refreshes_since_sync = 0
+
+    @property
+    def n(self) -> int:
+        return len(self.hotkeys)
+
+    @property
+    def uids(self) -> np.ndarray:
+        return np.arange(self.n)
+
+    def __str__(self) -> str:
+        return f"LiteMetagraph(netuid:{self.netuid}, n:{self.n}, block:{self.block})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def sync(
+        self,
+        subtensor: "bt.subtensor",
+        block: Optional[int] = None,
+        lite: bool = True,
+    ) -> "LiteMetagraph":
+        """
+        Fetches the hotkeys, stake and validator permits of every neuron of the subnet.
+
+        Args:
+            subtensor (bt.subtensor): The chain connection.
+            block (int, optional): The block to sync at. Defaults to the latest block.
+            lite (bool): Ignored, only accepted for compatibility with `bt.metagraph.sync`.
+
+        Returns:
+            LiteMetagraph: The synced metagraph.
+        """
+        neurons = subtensor.neurons_lite(netuid=self.netuid, block=block)
+        self.hotkeys = [neuron.hotkey for neuron in neurons]
+        self.S = np.array(
+            [float(neuron.total_stake) for neuron in neurons],
+            dtype=np.float32,
+        )
+        self.validator_permit = np.array(
+            [neuron.validator_permit for neuron in neurons], dtype=bool
+        )
+        self.block = block or subtensor.get_current_block()
+        self._refreshes_since_sync = 0
+        return self
+
+    def refresh(self, subtensor: "bt.subtensor") -> "LiteMetagraph":
+        """
+        Incrementally updates the metagraph, falling back to a full `sync` every `full_sync_interval` calls or if the
+        storage cannot be read directly.
+
+        Args:
+            subtensor (bt.subtensor): The chain connection.
+
+        Returns:
+            LiteMetagraph: The refreshed metagraph.
+        """
+        self._refreshes_since_sync += 1
+        if self._refreshes_since_sync >= self.full_sync_interval:
+            return self.sync(subtensor)
+
+        try:
+            block = subtensor.get_current_block()
+            keys = subtensor.query_map_subtensor(
+                "Keys", block=block, params=[self.netuid]
+            )
+            permits = subtensor.query_subtensor(
+                "ValidatorPermit", block=block, params=[self.netuid]
+            ).value
+
+            hotkeys = [None] * len(permits)
+            for uid, hotkey in keys:
+                hotkeys[uid.value] = hotkey.value
+
+            stake = np.zeros(len(hotkeys), dtype=np.float32)
+            kept = min(self.n, len(hotkeys))
+            stake[:kept] = self.S[:kept]
+            for uid, hotkey in enumerate(hotkeys):
+                if uid >= self.n or hotkey != self.hotkeys[uid]:
+                    total_stake = subtensor.get_total_stake_for_hotkey(
+                        hotkey, block=block
+                    )
+                    # A hotkey that never received stake has no stake entry.
+                    stake[uid] = (
+                        float(total_stake) if total_stake is not None else 0.0
+                    )
+        except Exception as e:
+            bt.logging.debug(f"Incremental metagraph refresh failed: {e}")
+            return self.sync(subtensor)
+
+        self.hotkeys = hotkeys
+        self.S = stake
+        self.validator_permit = np.array(permits, dtype=bool)
+        self.block = block
+        return self
@@ -0,0 +1,131 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import asyncio
+import threading
+import multiprocessing
+import bittensor as bt
+
+from typing import Any, Callable, Dict
+from concurrent.futures import ProcessPoolExecutor
+
+# Per process state of a pool worker. It is populated once by the initializer and then reused by every request
+# the worker handles, so models and other heavy objects are only loaded once per process.
+_worker_state: Any = None
+_worker_forward: Callable = None
+
+
+def _initialize_worker(init_fn: Callable, forward_fn: Callable):
+    global _worker_state, _worker_forward
+    _worker_forward = forward_fn
+    _worker_state = init_fn()
+
+
+def _run_worker_forward(request: Dict[str, Any]) -> Dict[str, Any]:
+    return _worker_forward(_worker_state, request)
+
+
+def _ping() -> bool:
+    return _worker_forward is not None
+
+
+class ForwardPool:
+    """
+    A pool of worker processes that runs the CPU bound part of a miner's forward outside of the axon event loop.
+
+    Every worker calls `init_fn()` once when it starts and keeps the returned state for its lifetime. Requests are
+    handled by `forward_fn(state, request)`, where `request` is the dictionary of protocol fields of the incoming
+    synapse (see `template.utils.synapse.synapse_fields`) and the return value is the dictionary of fields to write
+    back. Only these small dictionaries cross the process boundary, never the synapse itself.
+
+    Workers are started with the `spawn` method so they do not inherit the miner's threads, sockets or CUDA context.
+    Both callables must therefore be importable, i.e. module level functions or static methods of a module level class.
+
+    Args:
+        init_fn (Callable[[], Any]): Builds the per worker state (e.g. loads the model).
+        forward_fn (Callable[[Any, Dict], Dict]): Handles a single request with the worker state.
+        num_workers (int): Number of worker processes.
+        max_queue (int): Maximum number of requests allowed to wait for a free worker. Requests beyond that are
+            rejected immediately instead of piling up behind the pool.
+    """
+
+    def __init__(
+        self,
+        init_fn: Callable[[], Any],
+        forward_fn: Callable[[Any, Dict[str, Any]], Dict[str, Any]],
+        num_workers: int,
+        max_queue: int,
+    ):
+        self.num_workers = num_workers
+        self.max_queue = max_queue
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_worker,
+            initargs=(init_fn, forward_fn),
+        )
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of requests currently running or waiting in the pool."""
+        return self._pending
+
+    def start(self):
+        """
+        Starts every worker and waits until they are initialized, so the first requests do not pay for process
+        startup or model loading.
+        """
+        bt.logging.info(f"Starting {self.num_workers} forward pool workers.")
+        futures = [
+            self.executor.submit(_ping) for _ in range(self.num_workers)
+        ]
+        for future in futures:
+            future.result()
+        bt.logging.info("Forward pool workers ready.")
+
+    async def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Runs `forward_fn` on a free worker and returns its result.
+
+        Raises:
+            RuntimeError: If the pool already holds `num_workers + max_queue` requests.
+        """
+        with self._pending_lock:
+            if self._pending >= self.num_workers + self.max_queue:
+                raise RuntimeError(
+                    f"Forward pool is full ({self._pending} pending requests)."
+                )
+            self._pending += 1
+        try:
+            future = self.executor.submit(_run_worker_forward, request)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the worker is done, not when the caller stops waiting: a request cancelled at its deadline
+        # keeps its worker busy until it finishes.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future=None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def shutdown(self):
+        """Stops the worker processes, cancelling requests that have not started yet."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,189 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import hashlib
+import bittensor as bt
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+
+@lru_cache(maxsize=4096)
+def _keypair(ss58_address: str) -> "bt.Keypair":
+    # Decoding the ss58 address is done once per hotkey instead of once per request.
+    return bt.Keypair(ss58_address=ss58_address)
+
+
+def verify_sr25519(hotkey: str, message: str, signature: str) -> bool:
+    """Verifies a request signature made by the given hotkey."""
+    return _keypair(hotkey).verify(message, signature)
+
+
+class VerificationCache:
+    """
+    Bounded-memory, replay-protected request verification for the miner axon. It replaces the axon's default
+    verification, which keeps the last nonce of every endpoint it ever saw in an unbounded dictionary.
+
+    Each request is checked in order of increasing cost, so bad requests are rejected before the signature check:
+
+    1. Age: the nonce, a `time.time_ns()` timestamp set by the dendrite, is older than `window` seconds or more than
+       `clock_skew` seconds in the future. Requests older than the window can not be replays of a remembered request
+       and are rejected, whatever is still remembered.
+    2. Replay: the (hotkey, uuid, nonce, body hash) tuple was already accepted. This is a single dictionary lookup.
+    3. Nonce: the nonce is not larger than the last accepted nonce of the same endpoint (hotkey and uuid).
+    4. Signature: the request was not signed by the hotkey. Keypairs are cached per hotkey.
+
+    Accepted tuples are stored as 16 byte digests in buckets by nonce time, each covering `window / num_buckets`
+    seconds. Buckets are dropped once they are older than the window. When more than `max_entries` digests are
+    stored the oldest buckets are dropped early, and nonces up to the end of the dropped buckets are rejected from
+    then on, so memory stays bounded without letting the forgotten requests be replayed. Endpoint nonces are kept
+    for the `max_endpoints` most recently seen endpoints.
+
+    Args:
+        window (float): Number of seconds a nonce is accepted for, and accepted requests are remembered for.
+        max_entries (int): Maximum number of remembered requests.
+        max_endpoints (int): Maximum number of endpoints whose last nonce is remembered.
+        num_buckets (int): Number of time buckets the window is split into.
+        clock_skew (float): Number of seconds a nonce may be ahead of the miner's clock.
+        verify_signature (Callable[[str, str, str], bool]): Signature check, called with the hotkey, the signed
+            message and the signature.
+        timer (Callable[[], int]): Returns the current time in nanoseconds, compared against the nonces.
+    """
+
+    def __init__(
+        self,
+        window: float = 60,
+        max_entries: int = 100000,
+        max_endpoints: int = 10000,
+        num_buckets: int = 8,
+        clock_skew: float = 4,
+        verify_signature: Callable[[str, str, str], bool] = verify_sr25519,
+        timer: Callable[[], int] = time.time_ns,
+    ):
+        self.window = window
+        self.max_entries = max_entries
+        self.max_endpoints = max_endpoints
+        self.window_ns = int(window * 1e9)
+        self.clock_skew_ns = int(clock_skew * 1e9)
+        self.bucket_width_ns = max(1, self.window_ns // num_buckets)
+        self.verify_signature = verify_signature
+        self.timer = timer
+
+        self._seen: Dict[bytes, int] = {}
+        self._buckets: Dict[int, List[bytes]] = {}
+        # Nonces below this one are rejected, their requests may have been dropped to bound memory.
+        self._min_nonce = 0
+        self._nonces: "OrderedDict[str, int]" = OrderedDict()
+
+        self.accepted = 0
+        self.replays = 0
+        self.stale_nonces = 0
+        self.bad_signatures = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _drop(self, bucket: int):
+        for digest in self._buckets.pop(bucket):
+            del self._seen[digest]
+
+    def _expire(self, oldest_nonce: int):
+        oldest = oldest_nonce // self.bucket_width_ns
+        for bucket in [bucket for bucket in self._buckets if bucket < oldest]:
+            self._drop(bucket)
+
+    def _remember(self, digest: bytes, bucket: int):
+        self._buckets.setdefault(bucket, []).append(digest)
+        self._seen[digest] = bucket
+        while len(self._seen) > self.max_entries:
+            oldest = min(self._buckets)
+            self._drop(oldest)
+            self._min_nonce = max(
+                self._min_nonce, (oldest + 1) * self.bucket_width_ns
+            )
+
+    def verify(self, synapse: bt.Synapse, axon_hotkey: str):
+        """
+        Verifies an incoming request.
+
+        Args:
+            synapse (bt.Synapse): The request, with its dendrite terminal information filled by the axon.
+            axon_hotkey (str): The ss58 address of this miner's hotkey, part of the signed message.
+
+        Raises:
+            Exception: If the request is too old, a replay, has a stale nonce or a bad signature. The axon turns it
+                into a rejected request.
+        """
+        dendrite = synapse.dendrite
+        if dendrite is None or dendrite.hotkey is None:
+            raise Exception("Request is missing the dendrite information.")
+        if dendrite.nonce is None:
+            raise Exception("Request is missing the nonce.")
+
+        now = self.timer()
+        oldest_nonce = max(now - self.window_ns, self._min_nonce)
+        self._expire(oldest_nonce)
+        if dendrite.nonce < oldest_nonce:
+            self.stale_nonces += 1
+            raise Exception("Nonce is too old")
+        if dendrite.nonce > now + self.clock_skew_ns:
+            self.stale_nonces += 1
+            raise Exception("Nonce is in the future")
+
+        body_hash = synapse.computed_body_hash
+        digest = hashlib.blake2b(
+            f"{dendrite.hotkey}.{dendrite.uuid}.{dendrite.nonce}.{body_hash}".encode(),
+            digest_size=16,
+        ).digest()
+        if digest in self._seen:
+            self.replays += 1
+            raise Exception("Request was already received.")
+
+        endpoint = f"{dendrite.hotkey}:{dendrite.uuid}"
+        last_nonce = self._nonces.get(endpoint)
+        if last_nonce is not None and dendrite.nonce <= last_nonce:
+            self.stale_nonces += 1
+            raise Exception("Nonce is too small")
+
+        message = f"{dendrite.nonce}.{dendrite.hotkey}.{axon_hotkey}.{dendrite.uuid}.{body_hash}"
+        if not self.verify_signature(
+            dendrite.hotkey, message, dendrite.signature
+        ):
+            self.bad_signatures += 1
+            raise Exception(
+                f"Signature mismatch with {message} and {dendrite.signature}"
+            )
+
+        self._remember(digest, dendrite.nonce // self.bucket_width_ns)
+        self._nonces[endpoint] = dendrite.nonce
+        self._nonces.move_to_end(endpoint)
+        if len(self._nonces) > self.max_endpoints:
+            self._nonces.popitem(last=False)
+        self.accepted += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the verification counters and the number of remembered requests and endpoints."""
+        return {
+            "entries": len(self._seen),
+            "endpoints": len(self._nonces),
+            "accepted": self.accepted,
+            "replays": self.replays,
+            "stale_nonces": self.stale_nonces,
+            "bad_signatures": self.bad_signatures,
+        }
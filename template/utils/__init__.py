@@ -1,3 +1,15 @@
-from . import config
-from . import misc
-from . import uids
+# Submodules are imported on first access, so that importing the package does not import all their dependencies.
+from .lazy import attach
+
+__getattr__, __dir__ = attach(
+    __name__,
+    submodules=[
+        "cache",
+        "chain",
+        "config",
+        "misc",
+        "uids",
+        "synapse",
+        "snapshot",
+    ],
+)
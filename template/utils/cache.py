@@ -0,0 +1,351 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import asyncio
+import inspect
+import functools
+import threading
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+_MISSING = object()
+
+
+class _Call:
+    """A computation in progress, shared by the threads asking for the same key."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: BaseException = None
+
+    def result(self) -> Any:
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _AsyncCall:
+    """A computation in progress in its own task, shared by the coroutines asking for the same key."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class TTLCache:
+    """
+    A bounded, thread-safe cache whose entries expire `ttl` seconds after they were stored. Each entry has its own
+    expiry time, so entries stored at different times do not all expire at once, and the least recently used entry
+    is evicted once the cache holds `maxsize` entries.
+
+    `get_or_compute` and `get_or_compute_async` compute missing values with single-flight: concurrent callers asking
+    for the same key share one computation instead of all computing it. With `stale_ttl`, an expired entry is still
+    served for `stale_ttl` more seconds while it is refreshed in the background (stale-while-revalidate), so callers
+    never wait for a refresh.
+
+    Errors are not cached. The async variant must be used from a single event loop. It computes values in their own
+    task, so a caller that is cancelled does not cancel the computation for the others; the computation is only
+    cancelled once no caller is waiting for it any more.
+
+    Args:
+        maxsize (int): Maximum number of entries.
+        ttl (float): Lifetime of an entry, in seconds. If not positive, entries never expire.
+        stale_ttl (float): Number of seconds an expired entry is still served while it is refreshed.
+        timer (Callable[[], float]): Clock used for expiry, in seconds.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: float = -1,
+        stale_ttl: float = 0.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl if ttl > 0 else float("inf")
+        self.stale_ttl = stale_ttl
+        self.timer = timer
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.RLock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, _AsyncCall] = {}
+        self._tasks = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable) -> Tuple[Any, bool]:
+        # Returns the value of the key, or _MISSING, and whether it is stale.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING, False
+            value, expires_at = entry
+            now = self.timer()
+            if now < expires_at:
+                self._entries.move_to_end(key)
+                return value, False
+            if now < expires_at + self.stale_ttl:
+                return value, True
+            del self._entries[key]
+            self.expirations += 1
+            return _MISSING, False
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value of the key, or `default` if it is missing or expired."""
+        value, stale = self._lookup(key)
+        if value is _MISSING or stale:
+            return default
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Stores the value of the key, evicting the least recently used entries if needed."""
+        with self._lock:
+            self._entries[key] = (value, self.timer() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Removes the key from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes all the entries. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the value of the key, computing and storing it with `compute` if it is missing. Thread-safe: if
+        another thread is already computing the key, waits for its result instead.
+        """
+        with self._lock:
+            value, stale = self._lookup(key)
+            if value is not _MISSING:
+                if stale:
+                    self.stale_hits += 1
+                    if key not in self._calls:
+                        call = self._calls[key] = _Call()
+                        threading.Thread(
+                            target=self._run_call,
+                            args=(key, call, compute),
+                            daemon=True,
+                        ).start()
+                else:
+                    self.hits += 1
+                return value
+
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                self.misses += 1
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if leader:
+            self._run_call(key, call, compute)
+        return call.result()
+
+    def _run_call(
+        self, key: Hashable, call: _Call, compute: Callable[[], Any]
+    ):
+        try:
+            call.value = compute()
+            self.put(key, call.value)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def get_or_compute_async(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Returns the value of the key, computing and storing it with the coroutine function `compute` if it is
+        missing. If another task is already computing the key, waits for its result instead.
+        """
+        value, stale = self._lookup(key)
+        if value is not _MISSING:
+            if stale:
+                self.stale_hits += 1
+                if key not in self._async_calls:
+                    # Nobody waits for the refresh, so it is never cancelled; its errors are counted, not raised.
+                    self._start_async(key, compute)
+            else:
+                self.hits += 1
+            return value
+
+        call = self._async_calls.get(key)
+        if call is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            call = self._start_async(key, compute)
+        return await self._wait_async(key, call)
+
+    def _start_async(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> _AsyncCall:
+        task = asyncio.create_task(self._compute_async(key, compute))
+        # Keep a reference until the computation is done.
+        self._tasks.add(task)
+        task.add_done_callback(self._discard_task)
+        call = self._async_calls[key] = _AsyncCall(task)
+        return call
+
+    async def _wait_async(self, key: Hashable, call: _AsyncCall) -> Any:
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # The last caller went away: nobody needs the value any more.
+                call.task.cancel()
+                if self._async_calls.get(key) is call:
+                    del self._async_calls[key]
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _discard_task(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _compute_async(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        try:
+            value = await compute()
+            self.put(key, value)
+            return value
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            call = self._async_calls.get(key)
+            if call is not None and call.task is asyncio.current_task():
+                del self._async_calls[key]
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the cache counters and the hit rate, counting stale hits and shared computations as hits."""
+        requests = self.hits + self.stale_hits + self.shared + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "errors": self.errors,
+            "hit_rate": (self.hits + self.stale_hits + self.shared) / requests
+            if requests
+            else 0.0,
+        }
+
+
+def _make_key(args: tuple, kwargs: dict, typed: bool) -> Hashable:
+    key = args
+    if kwargs:
+        key += (_MISSING,) + tuple(sorted(kwargs.items()))
+    if typed:
+        key += tuple(type(arg) for arg in args)
+        key += tuple(type(value) for _, value in sorted(kwargs.items()))
+    return key
+
+
+def ttl_cache(
+    maxsize: int = 128,
+    typed: bool = False,
+    ttl: float = -1,
+    stale_ttl: float = 0.0,
+):
+    """
+    Decorator caching the results of a function in a `TTLCache`, keyed by its arguments. Works with regular and
+    async functions; concurrent calls with the same arguments share a single call of the function.
+
+    Args:
+        maxsize (int): Maximum number of cached results. Defaults to 128.
+        typed (bool): If set to True, arguments of different types will be cached separately. For example,
+                      f(3) and f(3.0) will be treated as distinct calls with distinct results. Defaults to False.
+        ttl (float): The time-to-live of each cached result, measured in seconds from the moment it was computed.
+                     If set to a non-positive value, the results never expire. Defaults to -1.
+        stale_ttl (float): Number of seconds an expired result is still returned while it is recomputed in the
+                     background. Defaults to 0.
+
+    Returns:
+        Callable: A decorator that can be applied to functions to cache their return values. The decorated
+        function exposes its cache as `cache`, with `cache_clear()` and `cache_stats()` shortcuts.
+
+    Example:
+        @ttl_cache(ttl=10)
+        def get_data(param):
+            # Expensive data retrieval operation
+            return data
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cache = TTLCache(maxsize=maxsize, ttl=ttl, stale_ttl=stale_ttl)
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapped(*args, **kwargs) -> Any:
+                return await cache.get_or_compute_async(
+                    _make_key(args, kwargs, typed),
+                    lambda: func(*args, **kwargs),
+                )
+
+        else:
+
+            @functools.wraps(func)
+            def wrapped(*args, **kwargs) -> Any:
+                return cache.get_or_compute(
+                    _make_key(args, kwargs, typed),
+                    lambda: func(*args, **kwargs),
+                )
+
+        wrapped.cache = cache
+        wrapped.cache_clear = cache.clear
+        wrapped.cache_stats = cache.stats
+        return wrapped
+
+    return decorator
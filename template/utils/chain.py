@@ -0,0 +1,130 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import bittensor as bt
+
+from typing import Callable, Optional
+
+
+class ChainState:
+    """
+    Caches the chain facts that neurons check on every step, so that checking them costs no chain request most of
+    the time.
+
+    - The current block is predicted from a block read from the chain (the anchor) and the block time. The anchor
+      is refreshed by every metagraph sync, and read from the chain again once it is `ttl_blocks` blocks old.
+    - The registration of the hotkey is taken from the synced metagraph, and confirmed with the chain once it is
+      `ttl_blocks` blocks old. A hotkey found unregistered is always checked with the chain again.
+    - The block of the last weights update of the neuron is taken from the metagraph and updated locally when the
+      neuron sets weights, so it does not wait for the next metagraph sync.
+
+    Args:
+        subtensor (bt.subtensor): The subtensor to read from.
+        netuid (int): The subnet of the neuron.
+        hotkey (str): The ss58 address of the hotkey of the neuron.
+        ttl_blocks (int): Number of blocks the anchor and the registration status are trusted.
+        block_time (float): Seconds per block.
+        timer (Callable[[], float]): Clock used to predict the block, in seconds.
+    """
+
+    def __init__(
+        self,
+        subtensor: "bt.subtensor",
+        netuid: int,
+        hotkey: str,
+        ttl_blocks: int = 100,
+        block_time: float = bt.__blocktime__,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.subtensor = subtensor
+        self.netuid = netuid
+        self.hotkey = hotkey
+        self.ttl_blocks = ttl_blocks
+        self.block_time = block_time
+        self.timer = timer
+
+        self.anchor_block: Optional[int] = None
+        self.anchor_time = 0.0
+        self.uid: Optional[int] = None
+        self.registered: Optional[bool] = None
+        self.registration_block = 0
+        self.last_update: Optional[int] = None
+        self.chain_reads = 0
+
+    def observe(self, metagraph: "bt.metagraph"):
+        """Updates the state from a freshly synced metagraph. Called after every metagraph sync."""
+        self._anchor(int(metagraph.block))
+        self.registered = self.hotkey in metagraph.hotkeys
+        self.registration_block = self.anchor_block
+        if not self.registered:
+            self.uid = None
+            return
+        self.uid = metagraph.hotkeys.index(self.hotkey)
+        last_update = getattr(metagraph, "last_update", None)
+        if last_update is not None:
+            # The metagraph may not include weights this neuron set since its sync.
+            self.last_update = max(
+                int(last_update[self.uid]), self.last_update or 0
+            )
+
+    def _anchor(self, block: int):
+        self.anchor_block = block
+        self.anchor_time = self.timer()
+
+    def current_block(self) -> int:
+        """Reads the current block from the chain and anchors the prediction to it."""
+        self.chain_reads += 1
+        self._anchor(self.subtensor.get_current_block())
+        return self.anchor_block
+
+    @property
+    def block(self) -> int:
+        """The predicted current block, read from the chain if the anchor is missing or too old."""
+        if self.anchor_block is None:
+            return self.current_block()
+        block = self.anchor_block + int(
+            (self.timer() - self.anchor_time) / self.block_time
+        )
+        if block - self.anchor_block >= self.ttl_blocks:
+            return self.current_block()
+        return block
+
+    def is_registered(self) -> bool:
+        """Returns True if the hotkey is registered on the subnet, asking the chain only if the status is stale."""
+        if (
+            self.registered
+            and self.block - self.registration_block < self.ttl_blocks
+        ):
+            return True
+        self.chain_reads += 1
+        self.registered = self.subtensor.is_hotkey_registered(
+            netuid=self.netuid, hotkey_ss58=self.hotkey
+        )
+        self.registration_block = self.block
+        return self.registered
+
+    def blocks_since_last_update(self) -> int:
+        """Number of blocks since the neuron last set weights."""
+        return self.block - (self.last_update or 0)
+
+    def record_weights_set(self, block: int):
+        """
+        Records that the neuron set weights at `block`. Does not read from the chain, so it can be called from the
+        thread setting the weights, with the block read by that thread's own subtensor.
+        """
+        self.last_update = block
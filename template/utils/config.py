@@ -17,7 +17,6 @@
 # DEALINGS IN THE SOFTWARE.
 
 import os
-import torch
 import argparse
 import bittensor as bt
 from loguru import logger
@@ -42,8 +41,12 @@ def check_config(cls, config: "bt.Config"):
         os.makedirs(config.neuron.full_path, exist_ok=True)
 
     if not config.neuron.dont_save_events:
-        # Add custom event logger for the events.
-        logger.level("EVENTS", no=38, icon="📝")
+        # Add custom event logger for the events. The level is registered once per process, which can hold
+        # several neurons, e.g. in a miner host.
+        try:
+            logger.level("EVENTS")
+        except ValueError:
+            logger.level("EVENTS", no=38, icon="📝")
         logger.add(
             os.path.join(config.neuron.full_path, "events.log"),
             rotation=config.neuron.events_retention_size,
@@ -56,6 +59,15 @@ def check_config(cls, config: "bt.Config"):
         )
 
 
+def resolve_device(device: str) -> str:
+    """Returns the device to run on, resolving 'auto' to cuda if it is available. Only then is torch imported."""
+    if device != "auto":
+        return device
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
 def add_args(cls, parser):
     """
     Adds relevant arguments to the parser for operation.
@@ -66,8 +78,8 @@ def add_args(cls, parser):
     parser.add_argument(
         "--neuron.device",
         type=str,
-        help="Device to run on.",
-        default="cuda" if torch.cuda.is_available() else "cpu",
+        help="Device to run on. 'auto' picks cuda if it is available, cpu otherwise.",
+        default="auto",
     )
 
     parser.add_argument(
@@ -77,6 +89,27 @@ def add_args(cls, parser):
         default=100,
     )
 
+    parser.add_argument(
+        "--neuron.metagraph_snapshot_off",
+        action="store_true",
+        help="If set, the metagraph is always synced at startup instead of loaded from a snapshot.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--neuron.metagraph_snapshot_keep",
+        type=int,
+        help="Number of metagraph snapshots kept on disk.",
+        default=3,
+    )
+
+    parser.add_argument(
+        "--neuron.metagraph_snapshot_max_age",
+        type=int,
+        help="Maximum age in blocks of a metagraph snapshot loaded at startup.",
+        default=7200,
+    )
+
     parser.add_argument(
         "--mock",
         action="store_true",
@@ -144,6 +177,154 @@ def add_miner_args(cls, parser):
         default=False,
     )
 
+    parser.add_argument(
+        "--neuron.lite_metagraph",
+        action="store_true",
+        help="If set, the miner only keeps the hotkeys, stake and validator permits of the metagraph.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--neuron.full_sync_interval",
+        type=int,
+        help="With --neuron.lite_metagraph, the number of incremental metagraph refreshes between two full syncs.",
+        default=10,
+    )
+
+    parser.add_argument(
+        "--neuron.deadline_margin",
+        type=float,
+        help="Seconds kept aside from the timeout of each request to send its response back.",
+        default=0.5,
+    )
+
+    parser.add_argument(
+        "--neuron.deadline_off",
+        action="store_true",
+        help="If set, requests are not cancelled when they reach the timeout sent by the validator.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--forward_pool.size",
+        type=int,
+        help="Number of worker processes running worker_forward. If 0, it runs inline on the axon event loop.",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--forward_pool.max_queue",
+        type=int,
+        help="Maximum number of requests waiting for a free forward pool worker before new ones are rejected.",
+        default=64,
+    )
+
+    parser.add_argument(
+        "--handler.max_concurrency",
+        type=int,
+        help="Default maximum number of concurrent requests per synapse type. If 0, there is no limit.",
+        default=0,
+    )
+
+    parser.add_argument(
+        "--handler.max_queue",
+        type=int,
+        help="Default maximum number of requests per synapse type waiting for a free slot before new ones are rejected.",
+        default=256,
+    )
+
+    parser.add_argument(
+        "--handler.stream_start_timeout",
+        type=float,
+        help="Seconds after which the slot of a streaming response the axon never started sending is released.",
+        default=12.0,
+    )
+
+    parser.add_argument(
+        "--response_cache.synapses",
+        type=str,
+        nargs="*",
+        help="Names of the synapse types whose responses are cached, e.g. Dummy. The cache is off if empty.",
+        default=[],
+    )
+
+    parser.add_argument(
+        "--response_cache.size",
+        type=int,
+        help="Maximum number of cached responses.",
+        default=1024,
+    )
+
+    parser.add_argument(
+        "--response_cache.ttl",
+        type=float,
+        help="Number of seconds a cached response stays valid.",
+        default=60,
+    )
+
+    parser.add_argument(
+        "--response_cache.per_caller",
+        action="store_true",
+        help="If set, cached responses are only served to the hotkey that caused them.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--verify_cache.off",
+        action="store_true",
+        help="If set, requests are verified by the default axon verification instead of the verification cache.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--verify_cache.window",
+        type=float,
+        help="Number of seconds accepted requests are remembered to detect replays.",
+        default=60,
+    )
+
+    parser.add_argument(
+        "--verify_cache.max_entries",
+        type=int,
+        help="Maximum number of requests remembered to detect replays.",
+        default=100000,
+    )
+
+    parser.add_argument(
+        "--verify_cache.max_endpoints",
+        type=int,
+        help="Maximum number of caller endpoints whose last nonce is remembered.",
+        default=10000,
+    )
+
+    parser.add_argument(
+        "--verify_cache.clock_skew",
+        type=float,
+        help="Number of seconds a request nonce may be ahead of the miner's clock.",
+        default=4,
+    )
+
+    parser.add_argument(
+        "--warmup.timeout",
+        type=float,
+        help="Maximum number of seconds to wait for the warm-up before serving the axon anyway.",
+        default=300,
+    )
+
+    parser.add_argument(
+        "--warmup.max_rounds",
+        type=int,
+        help="Maximum number of rounds of synthetic warm-up requests.",
+        default=3,
+    )
+
+    parser.add_argument(
+        "--warmup.max_latency",
+        type=float,
+        help="Warm-up rounds stop once every synthetic request is served within this many seconds. If 0, a single round is run.",
+        default=0,
+    )
+
     parser.add_argument(
         "--wandb.project_name",
         type=str,
@@ -159,6 +340,26 @@ def add_miner_args(cls, parser):
     )
 
 
+def add_host_args(cls, parser):
+    """Add miner host specific arguments to the parser."""
+
+    parser.add_argument(
+        "--host.hotkeys",
+        type=str,
+        nargs="+",
+        help="Hotkeys of the wallet to serve from this process, one miner and axon per hotkey.",
+        default=[],
+    )
+
+    parser.add_argument(
+        "--host.ports",
+        type=int,
+        nargs="*",
+        help="Axon port of each hotkey. Defaults to consecutive ports starting at --axon.port.",
+        default=[],
+    )
+
+
 def add_validator_args(cls, parser):
     """Add validator specific arguments to the parser."""
 
@@ -197,6 +398,43 @@ def add_validator_args(cls, parser):
         default=False,
     )
 
+    parser.add_argument(
+        "--neuron.set_weights_backoff",
+        type=float,
+        help="Seconds before retrying a failed set_weights, doubled after every failed attempt.",
+        default=12,
+    )
+
+    parser.add_argument(
+        "--neuron.set_weights_max_backoff",
+        type=float,
+        help="Maximum number of seconds between two set_weights attempts.",
+        default=120,
+    )
+
+    parser.add_argument(
+        "--neuron.weights_change_threshold",
+        type=float,
+        help="Fraction of the weight mass that must move since the last weights set for weights to be set again. "
+        "Set to -1 to always set weights.",
+        default=0.01,
+    )
+
+    parser.add_argument(
+        "--neuron.weights_max_staleness",
+        type=int,
+        help="Number of blocks after which weights are set again even if they did not change.",
+        default=1000,
+    )
+
+    parser.add_argument(
+        "--neuron.score_backend",
+        type=str,
+        choices=["numpy", "torch"],
+        help="Array library holding the moving average scores: numpy on the CPU, or torch on neuron.device.",
+        default="numpy",
+    )
+
     parser.add_argument(
         "--neuron.moving_average_alpha",
         type=float,
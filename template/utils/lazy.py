@@ -0,0 +1,60 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import importlib
+
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+def attach(
+    package: str,
+    submodules: Iterable[str] = (),
+    attributes: Dict[str, str] = None,
+) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    Makes the submodules and names of a package importable on first access (PEP 562), so that importing the package
+    does not import all of its dependencies.
+
+    Example:
+        __getattr__, __dir__ = attach(__name__, ["protocol"], {"SUBNET_LINKS": "subnet_links"})
+
+    Args:
+        package (str): The name of the package, `__name__` in its `__init__.py`.
+        submodules (Iterable[str]): Submodules imported when accessed as attributes of the package.
+        attributes (Dict[str, str]): Names of the package mapped to the submodule defining them.
+
+    Returns:
+        Tuple[Callable, Callable]: The `__getattr__` and `__dir__` functions of the package.
+    """
+    submodules = set(submodules)
+    attributes = dict(attributes or {})
+    namespace = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str):
+        if name in submodules:
+            # Importing a submodule also sets it as an attribute of the package.
+            return importlib.import_module(f"{package}.{name}")
+        if name in attributes:
+            module = importlib.import_module(f"{package}.{attributes[name]}")
+            value = namespace[name] = getattr(module, name)
+            return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | submodules | set(attributes))
+
+    return __getattr__, __dir__
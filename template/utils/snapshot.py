@@ -0,0 +1,174 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import re
+import torch
+import shutil
+import threading
+import bittensor as bt
+
+from typing import Callable, List, Optional
+
+_SNAPSHOT_NAME = re.compile(r"^block-(\d+)\.pt$")
+
+
+class MetagraphSnapshots:
+    """
+    Versioned snapshots of the metagraph on disk, one file per block: `directory/block-N.pt`, in the format of
+    `bt.metagraph.save`, so they can be loaded with `bt.metagraph.load_from_path`.
+
+    Files are written to a temporary path and moved into place, so a crash while saving never leaves a partial
+    snapshot behind. Only the `keep` most recent snapshots are kept.
+
+    Args:
+        directory (str): The directory of the snapshots, e.g. `config.neuron.full_path + "/metagraph"`.
+        keep (int): Number of snapshots kept.
+    """
+
+    def __init__(self, directory: str, keep: int = 3):
+        self.directory = directory
+        self.keep = keep
+
+    def blocks(self) -> List[int]:
+        """Returns the blocks of the snapshots on disk, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        blocks = []
+        for filename in os.listdir(self.directory):
+            match = _SNAPSHOT_NAME.match(filename)
+            if match is not None:
+                blocks.append(int(match.group(1)))
+        return sorted(blocks)
+
+    def latest_block(self) -> Optional[int]:
+        """Returns the block of the most recent snapshot, None if there is none."""
+        blocks = self.blocks()
+        return blocks[-1] if blocks else None
+
+    def path(self, block: int) -> str:
+        return os.path.join(self.directory, f"block-{block}.pt")
+
+    def save(self, metagraph: "bt.metagraph") -> str:
+        """Saves a snapshot of the metagraph at its block and removes the old ones. Returns its path."""
+        block = int(metagraph.block)
+        state_dict = metagraph.state_dict()
+        state_dict["axons"] = metagraph.axons
+
+        # The temporary file lives outside the snapshot directory so that loading never picks it up.
+        staging = self.directory + ".tmp"
+        os.makedirs(staging, exist_ok=True)
+        os.makedirs(self.directory, exist_ok=True)
+        staged_path = os.path.join(staging, f"block-{block}.pt")
+        torch.save(state_dict, staged_path)
+        os.replace(staged_path, self.path(block))
+
+        for old_block in self.blocks()[: -self.keep]:
+            try:
+                os.remove(self.path(old_block))
+            except OSError:
+                pass
+        return self.path(block)
+
+    def load(self, metagraph: "bt.metagraph") -> bool:
+        """
+        Loads the most recent snapshot into the metagraph, in place. Returns False if there is no snapshot or it
+        cannot be read, in which case the metagraph is left as it was.
+        """
+        block = self.latest_block()
+        if block is None:
+            return False
+        try:
+            # Written by the neuron itself; the axons are not plain tensors, so the torch>=2.6 default of
+            # weights_only=True, which `metagraph.load_from_path` relies on, cannot read them.
+            state_dict = torch.load(self.path(block), weights_only=False)
+            metagraph.axons = state_dict.pop("axons")
+            for name, value in state_dict.items():
+                setattr(
+                    metagraph,
+                    name,
+                    torch.nn.Parameter(value, requires_grad=False),
+                )
+        except Exception as e:
+            bt.logging.warning(f"Failed to load metagraph snapshot: {e}")
+            return False
+        return True
+
+    def clear(self):
+        """Removes every snapshot."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class MetagraphReconciler:
+    """
+    Fetches a fresh metagraph in a background thread and saves it as a snapshot, so that a neuron that started from
+    a snapshot can serve or query right away and catch up with the chain without waiting for a full sync.
+
+    `fetch` should use its own subtensor connection, since a subtensor must not be shared between threads. The
+    neuron adopts the fresh metagraph from its main loop once `done` is True, by loading the newest snapshot into
+    its metagraph in place.
+
+    Args:
+        snapshots (MetagraphSnapshots): Where the fresh metagraph is saved.
+        fetch (Callable[[], bt.metagraph]): Builds and syncs a fresh metagraph.
+    """
+
+    def __init__(
+        self,
+        snapshots: MetagraphSnapshots,
+        fetch: Callable[[], "bt.metagraph"],
+    ):
+        self.snapshots = snapshots
+        self.fetch = fetch
+        self.block: Optional[int] = None
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def succeeded(self) -> bool:
+        return self.done and self.error is None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="MetagraphReconciler", daemon=True
+        )
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the fresh metagraph has been saved or fetching it failed. Returns `done`."""
+        return self._done.wait(timeout)
+
+    def _run(self):
+        try:
+            metagraph = self.fetch()
+            self.snapshots.save(metagraph)
+            self.block = int(metagraph.block)
+            bt.logging.info(
+                f"Fetched the metagraph at block {self.block} in the background."
+            )
+        except Exception as e:
+            self.error = e
+            bt.logging.warning(
+                f"Failed to fetch the metagraph in the background: {e}"
+            )
+        finally:
+            self._done.set()
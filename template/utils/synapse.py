@@ -0,0 +1,123 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import typing
+import bittensor as bt
+
+
+def _model_fields(cls) -> typing.Dict[str, typing.Any]:
+    # Pydantic v2 exposes `model_fields`, v1 only `__fields__`.
+    return getattr(cls, "model_fields", None) or cls.__fields__
+
+
+# Fields every synapse carries (terminal info, headers, hashes). They are
+# filled in by the axon and never need to leave the miner process.
+_BASE_FIELDS = frozenset(_model_fields(bt.Synapse)) | {"required_hash_fields"}
+
+
+def synapse_fields(synapse: bt.Synapse) -> typing.Dict[str, typing.Any]:
+    """
+    Returns the protocol specific fields of a synapse as a plain dictionary.
+
+    Only the fields declared by the synapse subclass are included (e.g. `dummy_input` and `dummy_output` for
+    `Dummy`), which keeps the payload small and cheap to pickle when it is shipped to another process.
+
+    Args:
+        synapse (bt.Synapse): The synapse to read the fields from.
+
+    Returns:
+        Dict[str, Any]: A mapping of field name to value.
+    """
+    return {
+        name: getattr(synapse, name)
+        for name in _model_fields(type(synapse))
+        if name not in _BASE_FIELDS
+    }
+
+
+def _is_request_field(field) -> bool:
+    # Response fields are optional and default to None, like `dummy_output`.
+    if hasattr(field, "is_required"):
+        required = field.is_required()
+    else:
+        required = field.required
+    return required or field.default is not None
+
+
+def request_fields(synapse: bt.Synapse) -> typing.Dict[str, typing.Any]:
+    """
+    Returns the request fields of a synapse, the ones filled by the validator, as a plain dictionary.
+
+    They are the fields named by the `cache_key_fields` class variable of the synapse type if it declares one, else
+    its `required_hash_fields` if it declares them, else the protocol fields that are required or have a default
+    other than None, since response fields default to None (e.g. `dummy_input` but not `dummy_output` for `Dummy`).
+
+    Args:
+        synapse (bt.Synapse): The synapse to read the fields from.
+
+    Returns:
+        Dict[str, Any]: A mapping of field name to value.
+    """
+    names = getattr(type(synapse), "cache_key_fields", None) or getattr(
+        synapse, "required_hash_fields", None
+    )
+    if not names:
+        fields = _model_fields(type(synapse))
+        names = [
+            name
+            for name in fields
+            if name not in _BASE_FIELDS and _is_request_field(fields[name])
+        ]
+    return {name: getattr(synapse, name) for name in names}
+
+
+def response_fields(synapse: bt.Synapse) -> typing.Dict[str, typing.Any]:
+    """
+    Returns the response fields of a synapse, the protocol fields that are not request fields (see `request_fields`),
+    as a plain dictionary.
+
+    Args:
+        synapse (bt.Synapse): The synapse to read the fields from.
+
+    Returns:
+        Dict[str, Any]: A mapping of field name to value.
+    """
+    request = request_fields(synapse)
+    return {
+        name: value
+        for name, value in synapse_fields(synapse).items()
+        if name not in request
+    }
+
+
+def apply_fields(
+    synapse: bt.Synapse, fields: typing.Dict[str, typing.Any]
+) -> bt.Synapse:
+    """
+    Writes the given fields back onto the synapse, skipping the ones whose value did not change.
+
+    Args:
+        synapse (bt.Synapse): The synapse to update in place.
+        fields (Dict[str, Any]): A mapping of field name to value, as returned by `synapse_fields`.
+
+    Returns:
+        bt.Synapse: The updated synapse.
+    """
+    for name, value in fields.items():
+        if getattr(synapse, name) != value:
+            setattr(synapse, name, value)
+    return synapse
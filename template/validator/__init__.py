@@ -1,2 +1,3 @@
 from .forward import forward
 from .reward import reward
+from .weights import WeightSubmitter
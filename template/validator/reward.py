@@ -17,7 +17,6 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 
-import torch
 from typing import List
 
 
@@ -37,18 +36,19 @@ def get_rewards(
     self,
     query: int,
     responses: List[float],
-) -> torch.FloatTensor:
+) -> "np.ndarray | torch.FloatTensor":
     """
-    Returns a tensor of rewards for the given query and responses.
+    Returns an array of rewards for the given query and responses, in the array type of the score backend of the
+    validator.
 
     Args:
     - query (int): The query sent to the miner.
     - responses (List[float]): A list of responses from the miner.
 
     Returns:
-    - torch.FloatTensor: A tensor of rewards for the given query and responses.
+    - np.ndarray | torch.FloatTensor: An array of rewards for the given query and responses.
     """
     # Get all the reward results by iteratively calling your reward() function.
-    return torch.FloatTensor(
+    return self.score_backend.array(
         [reward(query, response) for response in responses]
-    ).to(self.device)
+    )
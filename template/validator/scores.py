@@ -0,0 +1,353 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import numpy as np
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Sequence
+
+"""
+Backends holding the moving average scores of a validator. The validator only does cheap vector arithmetic on its
+scores, so by default they are kept in numpy on the CPU; the torch backend keeps them on `neuron.device`. Both
+backends compute the same float32 values, and each one loads the state saved by the other.
+"""
+
+
+def _to_numpy(values: Any) -> np.ndarray:
+    # Converts torch tensors without importing torch.
+    if hasattr(values, "detach"):
+        return values.detach().cpu().numpy()
+    return np.asarray(values)
+
+
+class ScoreBackend(ABC):
+    """
+    The array library holding the scores. `self.scores` of the validator is an array of the backend, so it can be
+    indexed and assigned like before; the operations below are the ones whose implementation differs.
+    """
+
+    name: str = None
+    state_file: str = None
+
+    @abstractmethod
+    def zeros(self, n: int):
+        """Returns n zero scores."""
+        ...
+
+    @abstractmethod
+    def array(self, values: Any):
+        """Converts rewards, e.g. a list, numpy array or torch tensor, to a float32 array of the backend."""
+        ...
+
+    @abstractmethod
+    def update(self, scores, uids: Sequence[int], rewards: Any, alpha: float):
+        """
+        Returns the exponential moving average of the scores with the rewards of the uids:
+        `alpha * rewards + (1 - alpha) * scores` for the uids, unchanged scores for the others. NaN rewards count
+        as 0.
+        """
+        ...
+
+    @abstractmethod
+    def update_many(self, scores, uids: Any, rewards: Any, alpha: float):
+        """
+        Returns the scores after applying the rewards one after the other, in order, as if `update` was called for
+        each of them. Computed in one pass: a uid rewarded r_1, ..., r_k gets
+        `(1 - alpha)^k * score + sum_j alpha * (1 - alpha)^(k - j) * r_j`, in float64. NaN rewards count as 0.
+
+        Args:
+            uids: The uids of all the rewards, in arrival order; a uid can appear several times.
+            rewards: The rewards, one per uid.
+        """
+        ...
+
+    @abstractmethod
+    def resize(self, scores, n: int, keep: int):
+        """Returns n scores, the first `keep` copied from `scores`, the others zero."""
+        ...
+
+    @abstractmethod
+    def has_nan(self, values) -> bool:
+        ...
+
+    @abstractmethod
+    def normalize(self, scores):
+        """Returns the scores divided by the sum of their absolute values, like `torch.nn.functional.normalize(p=1)`."""
+        ...
+
+    @abstractmethod
+    def to_torch(self, scores):
+        """Returns the scores as a torch tensor on the CPU, e.g. to compute weights."""
+        ...
+
+    @abstractmethod
+    def save(self, directory: str, state: Dict[str, Any]):
+        """Saves the state of the validator: its step, scores and hotkeys."""
+        ...
+
+    def load(self, directory: str) -> Dict[str, Any]:
+        """
+        Loads the state of the validator, with the scores as an array of this backend. Falls back to the state file
+        of the other backend, so switching backends keeps the scores.
+        """
+        own = os.path.join(directory, self.state_file)
+        if os.path.exists(own):
+            state = self._load(own)
+        elif os.path.exists(os.path.join(directory, "state.pt")):
+            state = TorchScoreBackend._load(
+                os.path.join(directory, "state.pt")
+            )
+        else:
+            state = NumpyScoreBackend._load(
+                os.path.join(directory, "state.npz")
+            )
+        state["scores"] = self.array(state["scores"])
+        return state
+
+    @staticmethod
+    @abstractmethod
+    def _load(path: str) -> Dict[str, Any]:
+        ...
+
+
+class NumpyScoreBackend(ScoreBackend):
+    """Keeps the scores in a float32 numpy array, with no torch dispatch or device transfers per operation."""
+
+    name = "numpy"
+    state_file = "state.npz"
+
+    def zeros(self, n: int) -> np.ndarray:
+        return np.zeros(int(n), dtype=np.float32)
+
+    def array(self, values: Any) -> np.ndarray:
+        return _to_numpy(values).astype(np.float32, copy=False)
+
+    def update(
+        self,
+        scores: np.ndarray,
+        uids: Sequence[int],
+        rewards: Any,
+        alpha: float,
+    ) -> np.ndarray:
+        rewards = np.nan_to_num(self.array(rewards), nan=0.0)
+        scattered = scores.copy()
+        scattered[_to_numpy(uids).astype(np.int64, copy=False)] = rewards
+        return alpha * scattered + (1 - alpha) * scores
+
+    def update_many(
+        self, scores: np.ndarray, uids: Any, rewards: Any, alpha: float
+    ) -> np.ndarray:
+        uids = _to_numpy(uids).astype(np.int64, copy=False)
+        rewards = np.nan_to_num(_to_numpy(rewards).astype(np.float64), nan=0.0)
+        n = len(scores)
+
+        # Number of later rewards of the same uid, for every reward: its rank among the rewards of its uid, counted
+        # from the last one.
+        reversed_uids = uids[::-1]
+        order = np.argsort(reversed_uids, kind="stable")
+        sorted_uids = reversed_uids[order]
+        ranks = np.empty(len(uids), dtype=np.int64)
+        ranks[order] = np.arange(len(uids)) - np.searchsorted(
+            sorted_uids, sorted_uids, side="left"
+        )
+        later = ranks[::-1]
+
+        decay = (1 - alpha) ** np.bincount(uids, minlength=n)
+        gains = np.bincount(
+            uids, weights=alpha * (1 - alpha) ** later * rewards, minlength=n
+        )
+        return (decay * scores + gains).astype(np.float32)
+
+    def resize(self, scores: np.ndarray, n: int, keep: int) -> np.ndarray:
+        resized = self.zeros(n)
+        resized[:keep] = scores[:keep]
+        return resized
+
+    def has_nan(self, values: Any) -> bool:
+        return bool(np.isnan(_to_numpy(values)).any())
+
+    def normalize(self, scores: np.ndarray) -> np.ndarray:
+        return scores / max(float(np.abs(scores).sum()), 1e-12)
+
+    def to_torch(self, scores: np.ndarray):
+        import torch
+
+        return torch.from_numpy(scores)
+
+    def save(self, directory: str, state: Dict[str, Any]):
+        # np.savez appends the extension, so write to a name that already has it.
+        np.savez(
+            os.path.join(directory, self.state_file),
+            step=np.int64(state["step"]),
+            scores=self.array(state["scores"]),
+            hotkeys=np.array(state["hotkeys"], dtype=str),
+        )
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, Any]:
+        with np.load(path, allow_pickle=False) as data:
+            return {
+                "step": int(data["step"]),
+                "scores": data["scores"],
+                "hotkeys": [str(hotkey) for hotkey in data["hotkeys"]],
+            }
+
+
+class TorchScoreBackend(ScoreBackend):
+    """
+    Keeps the scores in a float32 torch tensor on `device`, for validators whose rewards are computed on a GPU.
+
+    Args:
+        device (str): The device of the scores.
+    """
+
+    name = "torch"
+    state_file = "state.pt"
+
+    def __init__(self, device: str = "cpu"):
+        import torch
+
+        self.torch = torch
+        self.device = device
+
+    def zeros(self, n: int):
+        return self.torch.zeros(
+            int(n), dtype=self.torch.float32, device=self.device
+        )
+
+    def array(self, values: Any):
+        if not isinstance(values, self.torch.Tensor):
+            values = self.torch.from_numpy(
+                np.asarray(values, dtype=np.float32)
+            )
+        return values.to(device=self.device, dtype=self.torch.float32)
+
+    def update(self, scores, uids: Sequence[int], rewards: Any, alpha: float):
+        rewards = self.torch.nan_to_num(self.array(rewards), 0)
+        if isinstance(uids, self.torch.Tensor):
+            uids = uids.clone().detach()
+        else:
+            uids = self.torch.tensor(uids)
+        # Compute forward pass rewards, assumes uids are mutually exclusive.
+        scattered = scores.scatter(0, uids.to(self.device), rewards)
+        return alpha * scattered + (1 - alpha) * scores
+
+    def update_many(self, scores, uids: Any, rewards: Any, alpha: float):
+        torch = self.torch
+        if not isinstance(uids, torch.Tensor):
+            uids = torch.from_numpy(_to_numpy(uids).astype(np.int64))
+        uids = uids.to(device=self.device, dtype=torch.int64)
+        rewards = torch.nan_to_num(self.array(rewards).to(torch.float64), 0)
+        n = len(scores)
+
+        # Number of later rewards of the same uid, for every reward; see the numpy backend.
+        reversed_uids = uids.flip(0)
+        sorted_uids, order = torch.sort(reversed_uids, stable=True)
+        ranks = torch.empty_like(uids)
+        ranks[order] = torch.arange(
+            len(uids), device=self.device
+        ) - torch.searchsorted(sorted_uids, sorted_uids, side="left")
+        later = ranks.flip(0)
+
+        decay = (1 - alpha) ** torch.bincount(uids, minlength=n).to(
+            torch.float64
+        )
+        gains = torch.bincount(
+            uids,
+            weights=alpha * (1 - alpha) ** later.to(torch.float64) * rewards,
+            minlength=n,
+        )
+        return (decay * scores.to(torch.float64) + gains).to(torch.float32)
+
+    def resize(self, scores, n: int, keep: int):
+        resized = self.zeros(n)
+        resized[:keep] = scores[:keep]
+        return resized
+
+    def has_nan(self, values: Any) -> bool:
+        if isinstance(values, self.torch.Tensor):
+            return bool(self.torch.isnan(values).any())
+        return bool(np.isnan(_to_numpy(values)).any())
+
+    def normalize(self, scores):
+        return self.torch.nn.functional.normalize(scores, p=1, dim=0)
+
+    def to_torch(self, scores):
+        return scores.to("cpu")
+
+    def save(self, directory: str, state: Dict[str, Any]):
+        self.torch.save(state, os.path.join(directory, self.state_file))
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, Any]:
+        import torch
+
+        return torch.load(path)
+
+
+class RewardBuffer:
+    """
+    Collects the rewards of concurrent forwards, so that they are applied to the scores together, once per step.
+
+    Appending is cheap: it only keeps a reference to the uids and rewards. `flush` then applies all the rewards
+    received since the last flush in one vectorized update, in the order they arrived, so rewards of overlapping
+    forwards are never lost and the scores are rewritten once per step instead of once per forward.
+    """
+
+    def __init__(self):
+        self._uids: List[Any] = []
+        self._rewards: List[Any] = []
+        self.appended = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._uids)
+
+    def append(self, uids: Any, rewards: Any):
+        self._uids.append(uids)
+        self._rewards.append(rewards)
+        self.appended += 1
+
+    def flush(self, backend: ScoreBackend, scores, alpha: float):
+        """Returns the scores updated with the buffered rewards, and empties the buffer."""
+        if not self._uids:
+            return scores
+        uids, self._uids = self._uids, []
+        rewards, self._rewards = self._rewards, []
+        self.flushes += 1
+        return backend.update_many(
+            scores,
+            np.concatenate(
+                [_to_numpy(u).reshape(-1).astype(np.int64) for u in uids]
+            ),
+            np.concatenate(
+                [_to_numpy(r).reshape(-1).astype(np.float32) for r in rewards]
+            ),
+            alpha,
+        )
+
+
+def get_score_backend(name: str, device: str = "cpu") -> ScoreBackend:
+    """Returns the score backend named by `--neuron.score_backend`."""
+    if name == "numpy":
+        return NumpyScoreBackend()
+    if name == "torch":
+        return TorchScoreBackend(device)
+    raise ValueError(
+        f"Unknown score backend {name!r}, expected 'numpy' or 'torch'."
+    )
@@ -0,0 +1,540 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import torch
+import numpy as np
+import threading
+import bittensor as bt
+
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from template.utils.cache import TTLCache
+
+U16_MAX = 65535
+
+
+class SubnetHyperparameters:
+    """
+    The subnet limits that weights must respect, read from the chain once per `ttl` seconds (typically one epoch)
+    instead of on every weights update.
+
+    Args:
+        subtensor (bt.subtensor): The subtensor to read from.
+        netuid (int): The subnet.
+        ttl (float): Number of seconds a value read from the chain is used.
+    """
+
+    def __init__(self, subtensor: "bt.subtensor", netuid: int, ttl: float):
+        self.subtensor = subtensor
+        self.netuid = netuid
+        self._cache = TTLCache(maxsize=16, ttl=ttl)
+
+    def _get(self, name: str):
+        return self._cache.get_or_compute(
+            name, lambda: getattr(self.subtensor, name)(netuid=self.netuid)
+        )
+
+    @property
+    def min_allowed_weights(self) -> int:
+        return self._get("min_allowed_weights")
+
+    @property
+    def max_weight_limit(self) -> float:
+        return self._get("max_weight_limit")
+
+    def clear(self):
+        """Forgets the cached values, so they are read from the chain again."""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return self._cache.stats()
+
+
+def normalize_max_weight(
+    x: torch.FloatTensor, limit: float = 0.1
+) -> torch.FloatTensor:
+    """
+    Normalizes `x` so that it sums to 1 and no value is greater than `limit`. Same result as
+    `bt.utils.weight_utils.normalize_max_weight`, without building a tensor from a python list.
+    """
+    epsilon = 1e-7  # For numerical stability after normalization
+    weights = x.clone()
+    values, _ = torch.sort(weights)
+
+    if x.sum() == 0 or len(x) * limit <= 1:
+        return torch.ones_like(x) / x.size(0)
+
+    estimation = values / values.sum()
+    if estimation.max() <= limit:
+        return weights / weights.sum()
+
+    # Find the cumulative sum and sorted tensor
+    cumsum = torch.cumsum(estimation, 0)
+
+    # Determine the index of cutoff
+    estimation_sum = (
+        torch.arange(
+            len(values) - 1,
+            -1,
+            -1,
+            dtype=estimation.dtype,
+            device=estimation.device,
+        )
+        * estimation
+    )
+    n_values = (estimation / (estimation_sum + cumsum + epsilon) < limit).sum()
+
+    # Determine the cutoff based on the index
+    cutoff_scale = (limit * cumsum[n_values - 1] - epsilon) / (
+        1 - (limit * (len(estimation) - n_values))
+    )
+    cutoff = cutoff_scale * values.sum()
+
+    # Applying the cutoff
+    weights[weights > cutoff] = cutoff
+    return weights / weights.sum()
+
+
+def process_weights(
+    uids: torch.LongTensor,
+    weights: torch.FloatTensor,
+    n: Union[int, torch.Tensor],
+    min_allowed_weights: int,
+    max_weight_limit: float,
+    exclude_quantile: int = 0,
+) -> Tuple[torch.LongTensor, torch.FloatTensor]:
+    """
+    Applies the limits of the subnet to raw weights. Same result as `bt.utils.weight_utils.process_weights_for_netuid`,
+    but takes the limits as arguments instead of reading them from the chain, and does not log the tensors.
+
+    Args:
+        uids (torch.LongTensor): The uids the weights are for.
+        weights (torch.FloatTensor): The raw weights.
+        n (int): The number of neurons of the subnet, `metagraph.n`.
+        min_allowed_weights (int): Minimum number of non-zero weights.
+        max_weight_limit (float): Maximum value of a normalized weight.
+        exclude_quantile (int): Quantile of the lowest weights to drop, in u16 units.
+
+    Returns:
+        Tuple[torch.LongTensor, torch.FloatTensor]: The uids with a weight, and their normalized weights.
+    """
+    weights = weights.to(torch.float32)
+    quantile = exclude_quantile / U16_MAX
+
+    non_zero_weight_idx = torch.argwhere(weights > 0).squeeze(dim=1)
+    non_zero_weight_uids = uids[non_zero_weight_idx]
+    non_zero_weights = weights[non_zero_weight_idx]
+    if non_zero_weights.numel() == 0 or n < min_allowed_weights:
+        bt.logging.warning("No non-zero weights returning all ones.")
+        final_weights = torch.ones(int(n)) / int(n)
+        return torch.arange(len(final_weights)), final_weights
+
+    if non_zero_weights.numel() < min_allowed_weights:
+        bt.logging.warning(
+            "No non-zero weights less then min allowed weight, returning all ones."
+        )
+        # Creating minimum even non-zero weights.
+        weights = torch.ones(int(n)) * 1e-5
+        weights[non_zero_weight_idx] += non_zero_weights
+        normalized_weights = normalize_max_weight(
+            x=weights, limit=max_weight_limit
+        )
+        return torch.arange(len(normalized_weights)), normalized_weights
+
+    # Exclude all weights below the allowed quantile.
+    max_exclude = max(0, len(non_zero_weights) - min_allowed_weights) / len(
+        non_zero_weights
+    )
+    lowest_quantile = non_zero_weights.quantile(min(quantile, max_exclude))
+    kept = lowest_quantile <= non_zero_weights
+    return non_zero_weight_uids[kept], normalize_max_weight(
+        x=non_zero_weights[kept], limit=max_weight_limit
+    )
+
+
+def convert_weights_and_uids_for_emit(
+    uids: torch.LongTensor, weights: torch.FloatTensor
+) -> Tuple[List[int], List[int]]:
+    """
+    Max-upscales the weights to u16 and drops the ones rounding to 0. Same result as
+    `bt.utils.weight_utils.convert_weights_and_uids_for_emit`, computed on tensors in float64 like its python floats.
+
+    Returns:
+        Tuple[List[int], List[int]]: The uids and their u16 weights.
+    """
+    if len(uids) != len(weights):
+        raise ValueError(
+            f"Passed weights and uids must have the same length, got {len(uids)} and {len(weights)}"
+        )
+    if len(weights) and weights.min() < 0:
+        raise ValueError(
+            f"Passed weight is negative cannot exist on chain {weights}"
+        )
+    if len(uids) and uids.min() < 0:
+        raise ValueError(
+            f"Passed uid is negative cannot exist on chain {uids}"
+        )
+
+    weights = weights.to(torch.float64)
+    if weights.sum() == 0:
+        return [], []  # Nothing to set on chain.
+    uint_weights = torch.round(weights / weights.max() * U16_MAX).to(
+        torch.int64
+    )
+    non_zero = uint_weights != 0
+    return uids[non_zero].tolist(), uint_weights[non_zero].tolist()
+
+
+def weights_change(
+    previous_uids: List[int],
+    previous_weights: List[int],
+    uids: List[int],
+    weights: List[int],
+) -> float:
+    """
+    Returns the fraction of the weight mass that moves between two u16 weight vectors, each normalized to sum to 1:
+    0 if they give every uid the same share, 1 if they share no uid.
+    """
+    size = max(previous_uids + uids, default=-1) + 1
+    shares = torch.zeros((2, size), dtype=torch.float64)
+    shares[0, previous_uids] = torch.tensor(
+        previous_weights, dtype=torch.float64
+    )
+    shares[1, uids] = torch.tensor(weights, dtype=torch.float64)
+    totals = shares.sum(dim=1, keepdim=True)
+    shares = torch.where(totals > 0, shares / totals, shares)
+    return 0.5 * (shares[0] - shares[1]).abs().sum().item()
+
+
+def _to_cpu_tensor(values) -> torch.Tensor:
+    if isinstance(values, torch.Tensor):
+        return values.detach().to("cpu").clone()
+    return torch.tensor(np.asarray(values))
+
+
+class WeightSubmitter:
+    """
+    Sets the weights of a validator on chain from a background thread, so that processing the weights and waiting
+    for the chain never stall the loop driving the forwards.
+
+    Weight vectors are handed over with `submit`, which returns immediately. Only the newest vector is kept: one
+    submitted while another is waiting supersedes it, since there is no point in setting weights that are already
+    out of date. A failed submission is retried with exponential backoff for up to `window` seconds after the vector
+    was submitted, typically one epoch; a retry always sends the newest vector. Once weights have been set, vectors
+    submitted before that are dropped.
+
+    Setting weights that hardly differ from the ones on chain only costs fees and time, so a vector is skipped when
+    less than `change_threshold` of its weight mass moved since the last weights set, unless those are more than
+    `max_staleness` seconds old. A skipped vector counts as set.
+
+    The submitter uses its own subtensor, since a subtensor connection must not be shared between threads. The limits
+    of the subnet applied to the weights are read from the chain once per `window`.
+
+    Args:
+        subtensor (bt.subtensor): The subtensor used to process and set the weights, owned by the submitter.
+        wallet (bt.wallet): The wallet of the validator.
+        netuid (int): The subnet of the validator.
+        metagraph (bt.metagraph): The metagraph of the subnet.
+        version_key (int): The version key sent with the weights.
+        window (float): Seconds after a submission during which a failed submission is retried.
+        initial_backoff (float): Seconds before the first retry; doubled after every failed attempt.
+        max_backoff (float): Maximum number of seconds between two attempts.
+        change_threshold (float): Fraction of the weight mass that must move for weights to be set again. If 0,
+            only identical vectors are skipped; if negative, none is.
+        max_staleness (float): Seconds after which weights are set again even if they did not change.
+        on_success (Callable[[int], None], optional): Called from the worker thread when weights have been set or
+            skipped, with the current block read from the submitter's subtensor.
+    """
+
+    def __init__(
+        self,
+        subtensor: "bt.subtensor",
+        wallet: "bt.wallet",
+        netuid: int,
+        metagraph: "bt.metagraph",
+        version_key: int,
+        window: float = 100 * bt.__blocktime__,
+        initial_backoff: float = bt.__blocktime__,
+        max_backoff: float = 120.0,
+        change_threshold: float = 0.01,
+        max_staleness: float = 1000 * bt.__blocktime__,
+        on_success: Optional[Callable[[int], None]] = None,
+    ):
+        self.subtensor = subtensor
+        self.wallet = wallet
+        self.netuid = netuid
+        self.metagraph = metagraph
+        self.version_key = version_key
+        self.window = window
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.change_threshold = change_threshold
+        self.max_staleness = max_staleness
+        self.on_success = on_success
+        self.hyperparameters = SubnetHyperparameters(
+            subtensor, netuid, ttl=window
+        )
+
+        # The newest vector waiting to be sent: (uids, weights, submission time).
+        self._pending: Optional[
+            Tuple[torch.Tensor, torch.Tensor, float]
+        ] = None
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._should_exit = False
+        self.in_flight = False
+        # The last u16 vector set on chain, and when.
+        self.last_uids: Optional[List[int]] = None
+        self.last_weights: Optional[List[int]] = None
+        self.last_set_time = 0.0
+
+        self.submissions = 0
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.superseded = 0
+        self.skipped = 0
+        self.last_change: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self.total_latency = 0.0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Starts the worker thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._should_exit = False
+        self._thread = threading.Thread(
+            target=self._run, name="WeightSubmitter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the worker thread. A vector still waiting is dropped."""
+        with self._condition:
+            self._should_exit = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def busy(self) -> bool:
+        """True while a vector is waiting or being sent."""
+        return self._pending is not None or self.in_flight
+
+    def submit(self, uids, weights):
+        """
+        Queues a weight vector to be set on chain, superseding the one waiting, if any. Returns immediately.
+
+        Args:
+            uids (torch.Tensor | np.ndarray): The uids the weights are for.
+            weights (torch.Tensor | np.ndarray): The raw weights, one per uid.
+        """
+        # Copies to cpu tensors so the caller can keep updating its arrays.
+        pending = (
+            _to_cpu_tensor(uids),
+            _to_cpu_tensor(weights),
+            time.monotonic(),
+        )
+        with self._condition:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = pending
+            self.submissions += 1
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._pending is not None or self._should_exit
+                )
+                if self._should_exit:
+                    return
+                pending = self._pending
+                self._pending = None
+                self.in_flight = True
+            try:
+                self._submit_with_retry(*pending)
+            except Exception as e:
+                bt.logging.error(f"Weight submission failed: {e}")
+            finally:
+                self.in_flight = False
+
+    def _submit_with_retry(
+        self, uids: torch.Tensor, weights: torch.Tensor, submitted_at: float
+    ):
+        deadline = submitted_at + self.window
+        backoff = self.initial_backoff
+        attempts = 0
+        while True:
+            try:
+                uint_uids, uint_weights = self.prepare(uids, weights)
+                skip = not self.should_set(uint_uids, uint_weights)
+                if not skip:
+                    attempts += 1
+                    self.attempts += 1
+                    success, message = self.set_weights(
+                        uint_uids, uint_weights
+                    )
+            except Exception as e:
+                skip, success, message = False, False, str(e)
+
+            if skip or success:
+                with self._condition:
+                    if self._pending is not None:
+                        # Computed before the weights on chain were checked: setting them now would only hit the rate limit.
+                        self.superseded += 1
+                        self._pending = None
+
+            if skip:
+                self.skipped += 1
+                bt.logging.info(
+                    f"Skipping set_weights, only {self.last_change:.2%} of the weight mass changed."
+                )
+                self._notify_success()
+                return
+
+            if success:
+                self.last_uids, self.last_weights = uint_uids, uint_weights
+                self.last_set_time = time.monotonic()
+                self.successes += 1
+                self.last_latency = time.monotonic() - submitted_at
+                self.total_latency += self.last_latency
+                self.last_error = None
+                bt.logging.info(
+                    f"set_weights on chain successfully in {self.last_latency:.1f}s!"
+                )
+                self._notify_success()
+                return
+
+            self.last_error = message
+            if time.monotonic() + backoff > deadline:
+                self.failures += 1
+                bt.logging.error(
+                    f"set_weights failed, giving up after {attempts} attempts: {message}"
+                )
+                return
+            bt.logging.warning(
+                f"set_weights failed, retrying in {backoff:.0f}s: {message}"
+            )
+
+            # Waits out the backoff, then retries with the newest vector.
+            retry_at = time.monotonic() + backoff
+            with self._condition:
+                while not self._should_exit:
+                    remaining = retry_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._should_exit:
+                    return
+                if self._pending is not None:
+                    self.superseded += 1
+                    uids, weights, _ = self._pending
+                    self._pending = None
+            self.retries += 1
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _notify_success(self):
+        if self.on_success is None:
+            return
+        try:
+            block = self.subtensor.get_current_block()
+        except Exception as e:
+            bt.logging.warning(
+                f"Could not read the block the weights were set at: {e}"
+            )
+            return
+        self.on_success(block)
+
+    def prepare(
+        self, uids: torch.Tensor, weights: torch.Tensor
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Processes the raw weights according to the limits of the subnet and converts them to u16.
+
+        Returns:
+            Tuple[List[int], List[int]]: The uids and their u16 weights.
+        """
+        processed_uids, processed_weights = process_weights(
+            uids=uids,
+            weights=weights,
+            n=self.metagraph.n,
+            min_allowed_weights=self.hyperparameters.min_allowed_weights,
+            max_weight_limit=self.hyperparameters.max_weight_limit,
+        )
+        return convert_weights_and_uids_for_emit(
+            uids=processed_uids, weights=processed_weights
+        )
+
+    def should_set(self, uids: List[int], weights: List[int]) -> bool:
+        """Returns False if the u16 weights are close to the last ones set, and those are recent enough."""
+        if self.last_uids is None or self.change_threshold < 0:
+            return True
+        self.last_change = weights_change(
+            self.last_uids, self.last_weights, uids, weights
+        )
+        if time.monotonic() - self.last_set_time >= self.max_staleness:
+            return True
+        return self.last_change > self.change_threshold
+
+    def set_weights(
+        self, uids: List[int], weights: List[int]
+    ) -> Tuple[bool, str]:
+        """
+        Sets u16 weights on chain. Runs on the worker thread.
+
+        Returns:
+            Tuple[bool, str]: Whether the weights were set, and the message of the chain.
+        """
+        bt.logging.debug(
+            f"Setting {len(uids)} weights, max weight {max(weights, default=0)}"
+        )
+        return self.subtensor.set_weights(
+            wallet=self.wallet,
+            netuid=self.netuid,
+            uids=uids,
+            weights=weights,
+            wait_for_finalization=False,
+            wait_for_inclusion=False,
+            version_key=self.version_key,
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the submission counters, how much the last vector changed compared to the weights on chain and the
+        latency from submission to weights set.
+        """
+        return {
+            "submissions": self.submissions,
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "superseded": self.superseded,
+            "skipped": self.skipped,
+            "last_change": self.last_change,
+            "busy": self.busy,
+            "last_latency": self.last_latency,
+            "mean_latency": self.total_latency / self.successes
+            if self.successes
+            else None,
+        }
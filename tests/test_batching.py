@@ -0,0 +1,149 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import sys
+import pytest
+import asyncio
+
+# The stream tutorial is a set of standalone scripts, importable from their directory.
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "docs", "stream_tutorial")
+)
+
+from batching import BatchScheduler, EchoModel
+
+
+class RecordingModel(EchoModel):
+    """Records the prompts stepped together by every decode step."""
+
+    def __init__(self):
+        super().__init__(str.split)
+        self.batches = []
+
+    def prefill(self, prompt):
+        if prompt == "bad prefill":
+            raise ValueError("prefill failed")
+        state = super().prefill(prompt)
+        state["prompt"] = prompt
+        return state
+
+    def step(self, states):
+        if any(state["prompt"] == "bad step" for state in states):
+            raise ValueError("step failed")
+        self.batches.append([state["prompt"] for state in states])
+        return super().step(states)
+
+
+async def collect(scheduler, prompt, paused=None):
+    return [token async for token in scheduler.generate(prompt, paused)]
+
+
+def test_streams_join_and_leave_between_steps():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model, step_delay=0.02)
+    long_prompt = "a1 a2 a3 a4 a5 a6"
+
+    async def run():
+        stream = scheduler.generate(long_prompt)
+        tokens = [await stream.__anext__()]
+        # Joins the batch of the running stream.
+        assert await collect(scheduler, "b1") == ["b1"]
+        tokens += [token async for token in stream]
+        return tokens
+
+    assert asyncio.run(run()) == long_prompt.split()
+    assert model.batches[0] == [long_prompt]
+    assert [long_prompt, "b1"] in model.batches
+    # The short stream left the batch once it finished.
+    assert model.batches[-1] == [long_prompt]
+    stats = scheduler.stats()
+    assert stats["completed"] == 2 and stats["tokens"] == 7
+    assert stats["active"] == 0 and stats["waiting"] == 0
+
+
+def test_batch_size_is_capped():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model, max_batch_size=2)
+    prompts = [f"s{i}w1 s{i}w2 s{i}w3" for i in range(5)]
+
+    async def run():
+        return await asyncio.gather(
+            *(collect(scheduler, prompt) for prompt in prompts)
+        )
+
+    assert asyncio.run(run()) == [prompt.split() for prompt in prompts]
+    assert max(len(batch) for batch in model.batches) == 2
+    assert scheduler.stats()["completed"] == 5
+
+
+def test_paused_streams_are_skipped():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model, step_delay=0.01)
+    paused = True
+
+    async def run():
+        nonlocal paused
+        slow = asyncio.ensure_future(
+            collect(scheduler, "p1 p2", lambda: paused)
+        )
+        assert await collect(scheduler, "f1 f2 f3") == ["f1", "f2", "f3"]
+        assert not slow.done()
+        paused = False
+        return await slow
+
+    assert asyncio.run(run()) == ["p1", "p2"]
+    # The paused stream was not stepped while the other one ran.
+    assert all(batch == ["f1 f2 f3"] for batch in model.batches[:4])
+    assert scheduler.stats()["skipped"] > 0
+
+
+def test_cancelled_consumer_leaves_the_batch():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model, step_delay=0.01)
+    long_prompt = " ".join(f"w{i}" for i in range(1000))
+
+    async def run():
+        stream = scheduler.generate(long_prompt)
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        assert scheduler.stats()["active"] == 0
+        steps = len(model.batches)
+        # The remaining streams keep being served.
+        assert await collect(scheduler, "x1 x2") == ["x1", "x2"]
+        return steps
+
+    steps = asyncio.run(run())
+    assert all(long_prompt not in batch for batch in model.batches[steps:])
+    assert scheduler.stats()["completed"] == 1
+
+
+def test_failures_reach_the_consumer():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model)
+
+    async def run():
+        with pytest.raises(ValueError, match="prefill failed"):
+            await collect(scheduler, "bad prefill")
+        with pytest.raises(ValueError, match="step failed"):
+            await collect(scheduler, "bad step")
+        # The scheduler keeps serving after a failure.
+        return await collect(scheduler, "ok")
+
+    assert asyncio.run(run()) == ["ok"]
+    assert scheduler.stats()["active"] == 0
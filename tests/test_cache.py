@@ -0,0 +1,306 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import typing
+import asyncio
+import threading
+
+from types import SimpleNamespace
+
+from template.protocol import Dummy
+from template.miner.cache import ResponseCache
+from template.base.miner import BaseMinerNeuron
+from template.utils.synapse import response_fields
+from template.utils.cache import TTLCache, ttl_cache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_individually():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=10, timer=timer)
+    cache.put("a", 1)
+    timer.now = 5
+    cache.put("b", 2)
+    timer.now = 11
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    timer.now = 16
+    assert cache.get("b") is None
+    assert cache.stats()["expirations"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_threads_share_one_computation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+
+    def worker(results):
+        barrier.wait()
+        results.append(cache.get_or_compute("key", compute))
+
+    results = []
+    threads = [
+        threading.Thread(target=worker, args=(results,)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["shared"] == 7
+
+
+def test_concurrent_tasks_share_one_computation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_compute_async("key", compute) for _ in range(10))
+        )
+
+    assert asyncio.run(main()) == ["value"] * 10
+    assert len(calls) == 1
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.create_task(
+            cache.get_or_compute_async("key", compute)
+        )
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(
+            cache.get_or_compute_async("key", compute)
+        )
+        await asyncio.sleep(0.01)
+        # e.g. the leader reached its deadline.
+        leader.cancel()
+        assert await follower == "value"
+        assert leader.cancelled()
+
+    asyncio.run(main())
+    assert len(calls) == 1
+    assert cache.get("key") == "value"
+
+
+def test_computation_is_cancelled_once_nobody_waits():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cancelled = []
+
+    async def compute():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "value"
+
+    async def compute_again():
+        return "again"
+
+    async def main():
+        callers = [
+            asyncio.create_task(cache.get_or_compute_async("key", compute))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.sleep(0.01)
+        # A new caller starts a new computation.
+        return await cache.get_or_compute_async("key", compute_again)
+
+    assert asyncio.run(main()) == "again"
+    assert cancelled == [1]
+    assert cache.stats()["misses"] == 2
+
+
+def test_errors_are_not_cached():
+    cache = TTLCache(maxsize=10, ttl=60)
+    attempts = []
+
+    def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("chain unavailable")
+        return 1
+
+    try:
+        cache.get_or_compute("key", compute)
+        assert False, "The error should be raised."
+    except ValueError:
+        pass
+    assert cache.get_or_compute("key", compute) == 1
+    assert cache.stats()["errors"] == 1
+
+
+def test_stale_value_is_served_while_refreshing():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=10, stale_ttl=5, timer=timer)
+    refreshed = threading.Event()
+
+    def compute():
+        refreshed.set()
+        return "new"
+
+    cache.put("key", "old")
+    timer.now = 12
+    assert cache.get_or_compute("key", compute) == "old"
+    assert refreshed.wait(1)
+    # Wait for the refresh thread to store its result.
+    for _ in range(100):
+        if cache.get("key") == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get("key") == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+    timer.now = 100
+    assert cache.get_or_compute("key", lambda: "fresh") == "fresh"
+
+
+def test_ttl_cache_decorator():
+    calls = []
+
+    @ttl_cache(maxsize=4, ttl=60)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert square(x=3) == 9
+    assert calls == [3, 3]
+    assert square.cache_stats()["hits"] == 1
+    square.cache_clear()
+    assert square(3) == 9
+    assert calls == [3, 3, 3]
+
+
+def test_ttl_cache_decorator_on_coroutine_function():
+    calls = []
+
+    @ttl_cache(ttl=60)
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x
+
+    async def main():
+        return await asyncio.gather(*(fetch(1) for _ in range(5)))
+
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == [1]
+
+
+def test_response_cache_key_ignores_response_fields():
+    key = ResponseCache.key(Dummy(dummy_input=3))
+    assert ResponseCache.key(Dummy(dummy_input=3, dummy_output=6)) == key
+    assert ResponseCache.key(Dummy(dummy_input=4)) != key
+    assert ResponseCache.key(Dummy(dummy_input=3), scope="hotkey") != key
+
+
+class Tagged(Dummy):
+    # Declares its request fields: the tag is not part of the request.
+    cache_key_fields: typing.ClassVar[typing.Tuple[str, ...]] = (
+        "dummy_input",
+    )
+    tag: str = "default"
+
+
+def test_response_cache_key_uses_declared_fields():
+    assert ResponseCache.key(
+        Tagged(dummy_input=3, tag="a")
+    ) == ResponseCache.key(Tagged(dummy_input=3, tag="b"))
+
+
+def test_response_fields_are_the_non_request_fields():
+    assert response_fields(Dummy(dummy_input=3, dummy_output=6)) == {
+        "dummy_output": 6
+    }
+    assert response_fields(Tagged(dummy_input=3, tag="a")) == {
+        "dummy_output": None,
+        "tag": "a",
+    }
+
+
+def test_cached_response_keeps_the_request_fields():
+    miner = SimpleNamespace(
+        config=SimpleNamespace(
+            response_cache=SimpleNamespace(per_caller=False)
+        ),
+        response_cache=ResponseCache(max_size=10, ttl=60),
+    )
+    calls = []
+
+    async def forward(synapse):
+        calls.append(synapse.dummy_input)
+        synapse.dummy_output = synapse.dummy_input * 2
+        # A forward that consumes its input must not clear it for cache hits.
+        synapse.dummy_input = 0
+        return synapse
+
+    async def run(synapse):
+        return await BaseMinerNeuron._cached_forward(miner, forward, synapse)
+
+    asyncio.run(run(Dummy(dummy_input=3)))
+    response = asyncio.run(run(Dummy(dummy_input=3)))
+    assert calls == [3]
+    assert response.dummy_input == 3
+    assert response.dummy_output == 6
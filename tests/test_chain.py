@@ -0,0 +1,156 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from types import SimpleNamespace
+
+from template.utils.chain import ChainState
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSubtensor:
+    def __init__(self, block=1000, registered=True):
+        self.block = block
+        self.registered = registered
+        self.block_reads = 0
+        self.registration_reads = 0
+
+    def get_current_block(self):
+        self.block_reads += 1
+        return self.block
+
+    def is_hotkey_registered(self, netuid, hotkey_ss58):
+        self.registration_reads += 1
+        return self.registered
+
+
+def make_chain(subtensor, timer, ttl_blocks=10):
+    return ChainState(
+        subtensor,
+        netuid=1,
+        hotkey="hotkey",
+        ttl_blocks=ttl_blocks,
+        block_time=12,
+        timer=timer,
+    )
+
+
+def metagraph(block, hotkeys=("other", "hotkey"), last_update=(0, 990)):
+    return SimpleNamespace(
+        block=block, hotkeys=list(hotkeys), last_update=list(last_update)
+    )
+
+
+def test_block_is_predicted_from_the_anchor():
+    timer = FakeTimer()
+    subtensor = FakeSubtensor(block=1000)
+    chain = make_chain(subtensor, timer)
+    assert chain.block == 1000
+    assert subtensor.block_reads == 1
+
+    timer.now = 12 * 3 + 5
+    assert chain.block == 1003
+    assert subtensor.block_reads == 1
+
+
+def test_old_anchor_is_read_again():
+    timer = FakeTimer()
+    subtensor = FakeSubtensor(block=1000)
+    chain = make_chain(subtensor, timer, ttl_blocks=10)
+    assert chain.block == 1000
+
+    timer.now = 12 * 9
+    assert chain.block == 1009
+    assert subtensor.block_reads == 1
+
+    # The anchor is `ttl_blocks` old; the block is read from the chain and the prediction anchored to it.
+    subtensor.block = 1012
+    timer.now = 12 * 10
+    assert chain.block == 1012
+    assert subtensor.block_reads == 2
+    timer.now = 12 * 11
+    assert chain.block == 1013
+    assert chain.chain_reads == 2
+
+
+def test_metagraph_sync_anchors_the_block():
+    timer = FakeTimer()
+    subtensor = FakeSubtensor()
+    chain = make_chain(subtensor, timer)
+    chain.observe(metagraph(block=2000))
+    timer.now = 12 * 2
+    assert chain.block == 2002
+    assert chain.uid == 1
+    assert chain.is_registered()
+    assert subtensor.block_reads == 0
+    assert subtensor.registration_reads == 0
+
+
+def test_registration_is_confirmed_once_stale():
+    timer = FakeTimer()
+    subtensor = FakeSubtensor(block=2000, registered=False)
+    chain = make_chain(subtensor, timer, ttl_blocks=10)
+    chain.observe(metagraph(block=2000))
+
+    subtensor.block = 2010
+    timer.now = 12 * 10
+    assert not chain.is_registered()
+    assert subtensor.registration_reads == 1
+    # An unregistered hotkey is always checked again.
+    assert not chain.is_registered()
+    assert subtensor.registration_reads == 2
+
+
+def test_blocks_since_last_update():
+    timer = FakeTimer()
+    subtensor = FakeSubtensor()
+    chain = make_chain(subtensor, timer)
+    chain.observe(metagraph(block=1000, last_update=(0, 990)))
+    assert chain.blocks_since_last_update() == 10
+
+    timer.now = 12 * 5
+    assert chain.blocks_since_last_update() == 15
+
+
+def test_recorded_weights_survive_an_older_metagraph():
+    timer = FakeTimer()
+    subtensor = FakeSubtensor()
+    chain = make_chain(subtensor, timer)
+    chain.observe(metagraph(block=1000, last_update=(0, 990)))
+
+    chain.record_weights_set(1000)
+    assert chain.blocks_since_last_update() == 0
+    assert subtensor.block_reads == 0
+
+    # A metagraph synced before the weights were set does not move the last update back.
+    chain.observe(metagraph(block=1001, last_update=(0, 990)))
+    assert chain.last_update == 1000
+    assert chain.blocks_since_last_update() == 1
+
+
+def test_unregistered_hotkey_has_no_uid():
+    timer = FakeTimer()
+    chain = make_chain(FakeSubtensor(registered=False), timer)
+    chain.observe(metagraph(block=1000, hotkeys=("other",), last_update=(0,)))
+    assert chain.uid is None
+    assert not chain.registered
@@ -0,0 +1,129 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import pytest
+import asyncio
+
+from template.miner.deadline import Deadline, current_deadline
+
+
+def test_remaining_accounts_for_the_margin():
+    deadline = Deadline(timeout=10, margin=2)
+    assert 7.9 < deadline.remaining() <= 8
+    assert not deadline.expired
+
+    assert Deadline(timeout=1, margin=2).remaining() == 0
+    assert Deadline(timeout=None).remaining() == float("inf")
+
+
+def test_remaining_decreases_to_zero():
+    deadline = Deadline(timeout=0.05)
+    time.sleep(0.06)
+    assert deadline.remaining() == 0
+    assert deadline.expired
+
+
+def test_cancel_runs_hooks_once():
+    deadline = Deadline(timeout=10)
+    calls = []
+    deadline.on_cancel(lambda: calls.append("first"))
+    deadline.on_cancel(lambda: 1 / 0)
+    deadline.on_cancel(lambda: calls.append("second"))
+    deadline.cancel()
+    deadline.cancel()
+    # A failing hook does not stop the others.
+    assert calls == ["first", "second"]
+
+    # Hooks registered after the cancellation run immediately.
+    deadline.on_cancel(lambda: calls.append("late"))
+    assert calls == ["first", "second", "late"]
+
+
+def test_run_returns_the_result_and_sets_the_current_deadline():
+    deadline = Deadline(timeout=1)
+    calls = []
+
+    async def forward(value):
+        assert current_deadline() is deadline
+        return value * 2
+
+    deadline.on_cancel(lambda: calls.append("cancelled"))
+    assert asyncio.run(deadline.run(forward, 21)) == 42
+    assert current_deadline() is None
+    assert not deadline.cancelled and calls == []
+
+
+def test_run_returns_the_best_partial_result_at_the_deadline():
+    deadline = Deadline(timeout=0.1)
+    calls = []
+
+    async def forward():
+        current_deadline().on_cancel(lambda: calls.append("cancelled"))
+        for step in range(100):
+            current_deadline().offer(step)
+            await asyncio.sleep(0.01)
+        return "complete"
+
+    result = asyncio.run(deadline.run(forward))
+    assert isinstance(result, int) and 0 < result < 100
+    assert deadline.cancelled and calls == ["cancelled"]
+
+
+def test_run_raises_without_a_partial_result():
+    deadline = Deadline(timeout=0.05)
+
+    async def forward():
+        await asyncio.sleep(1)
+
+    with pytest.raises(TimeoutError, match="deadline"):
+        asyncio.run(deadline.run(forward))
+    assert deadline.cancelled
+
+
+def test_best_returns_the_last_result_before_the_deadline():
+    deadline = Deadline(timeout=0.1)
+    closed = []
+
+    async def refine():
+        try:
+            for step in range(100):
+                yield step
+                await asyncio.sleep(0.01)
+        finally:
+            closed.append(True)
+
+    best = asyncio.run(deadline.best(refine(), default=-1))
+    assert 0 < best < 100
+    assert deadline.partial == best
+    assert closed == [True]
+
+
+def test_best_returns_the_last_result_when_exhausted():
+    deadline = Deadline(timeout=None)
+
+    async def refine():
+        for step in range(3):
+            yield step
+
+    assert asyncio.run(deadline.best(refine())) == 2
+
+    async def nothing():
+        return
+        yield
+
+    assert asyncio.run(deadline.best(nothing(), default="none")) == "none"
@@ -0,0 +1,62 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import asyncio
+import pytest
+
+from template.miner.handler import SynapseHandler
+
+
+class StreamingResponse:
+    def __init__(self):
+        self.sent = []
+
+    async def token_streamer(self, send):
+        await send(b"token")
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+async def forward(synapse):
+    return StreamingResponse()
+
+
+def test_slot_of_a_stream_never_sent_is_released():
+    async def main():
+        handler = SynapseHandler(
+            "Stream", max_concurrency=1, max_queue=0, stream_start_timeout=0.05
+        )
+        abandoned = await handler.run(forward, None)
+        with pytest.raises(RuntimeError):
+            await handler.run(forward, None)
+
+        await asyncio.sleep(0.1)
+        response = await handler.run(forward, None)
+        await response.token_streamer(response.send)
+        assert response.sent == [b"token"]
+
+        stats = handler.stats()
+        assert stats["abandoned"] == 1
+        assert stats["completed"] == 2
+        assert stats["in_flight"] == 0
+        # Once released, the abandoned stream cannot take the slot again.
+        with pytest.raises(RuntimeError):
+            await abandoned.token_streamer(abandoned.send)
+        assert not handler._semaphore.locked()
+
+    asyncio.run(main())
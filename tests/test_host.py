@@ -0,0 +1,77 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import sys
+import bittensor as bt
+
+from neurons.miner import Miner
+from template.base.host import MinerHost
+from template.mock import MockSubtensor
+
+
+def test_host_builds_a_miner_per_hotkey(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["miner_host"])
+    config = MinerHost.config(Miner)
+    config.wallet.path = str(tmp_path / "wallets")
+    config.wallet.name = "host"
+    config.host.hotkeys = ["first", "second"]
+    config.axon.external_ip = "127.0.0.1"
+    config.axon.port = 18191
+    config.logging.logging_dir = str(tmp_path / "logs")
+    config.neuron.metagraph_snapshot_off = True
+
+    # Registers real hotkeys on a mock chain, which the host connects to.
+    # The mock chain state is shared by all mock subtensors in the process.
+    bt.MockSubtensor.reset()
+    subtensor = MockSubtensor(config.netuid)
+    coldkey = bt.wallet(name=config.wallet.name, path=config.wallet.path)
+    coldkey.create_new_coldkey(
+        use_password=False, overwrite=True, suppress=True
+    )
+    for hotkey in config.host.hotkeys:
+        wallet = bt.wallet(
+            name=config.wallet.name, hotkey=hotkey, path=config.wallet.path
+        )
+        wallet.create_new_hotkey(
+            use_password=False, overwrite=True, suppress=True
+        )
+        subtensor.force_register_neuron(
+            netuid=config.netuid,
+            hotkey=wallet.hotkey.ss58_address,
+            coldkey=wallet.coldkey.ss58_address,
+            balance=100000,
+            stake=100000,
+        )
+
+    class SharedSubtensor(bt.subtensor):
+        def __new__(cls, *args, **kwargs):
+            return subtensor
+
+    monkeypatch.setattr(bt, "subtensor", SharedSubtensor)
+
+    host = MinerHost(Miner, config=config)
+    try:
+        assert [type(miner) for miner in host.miners] == [Miner, Miner]
+        assert [miner.axon.port for miner in host.miners] == [18191, 18192]
+        assert len({miner.uid for miner in host.miners}) == 2
+        for miner in host.miners:
+            assert miner.subtensor is subtensor
+            assert miner.metagraph is host.metagraph
+            assert miner.forward_pool is host.forward_pool
+            assert not miner.owns_forward_pool
+    finally:
+        host.stop()
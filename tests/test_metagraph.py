@@ -0,0 +1,126 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import bittensor as bt
+
+from types import SimpleNamespace
+
+from template.mock import MockSubtensor
+from template.miner.metagraph import LiteMetagraph
+
+
+class FakeSubtensor:
+    """A chain whose neurons, given as (hotkey, stake, validator permit), can be changed between reads."""
+
+    def __init__(self, neurons, block=100):
+        self.neurons = neurons
+        self.block = block
+        self.stake_reads = []
+        self.syncs = 0
+        self.storage_error = None
+
+    def get_current_block(self):
+        return self.block
+
+    def neurons_lite(self, netuid, block=None):
+        self.syncs += 1
+        return [
+            SimpleNamespace(
+                hotkey=hotkey, total_stake=stake, validator_permit=permit
+            )
+            for hotkey, stake, permit in self.neurons
+        ]
+
+    def query_map_subtensor(self, name, block=None, params=[]):
+        if self.storage_error is not None:
+            raise self.storage_error
+        return [
+            (SimpleNamespace(value=uid), SimpleNamespace(value=hotkey))
+            for uid, (hotkey, _, _) in enumerate(self.neurons)
+        ]
+
+    def query_subtensor(self, name, block=None, params=[]):
+        return SimpleNamespace(value=[permit for _, _, permit in self.neurons])
+
+    def get_total_stake_for_hotkey(self, hotkey, block=None):
+        self.stake_reads.append(hotkey)
+        for neuron_hotkey, stake, _ in self.neurons:
+            if neuron_hotkey == hotkey and stake > 0:
+                return stake
+        # The chain has no stake entry for hotkeys that never received stake.
+        return None
+
+
+def test_sync_reads_every_neuron():
+    subtensor = FakeSubtensor([("a", 10.0, True), ("b", 2.0, False)])
+    metagraph = LiteMetagraph(netuid=1).sync(subtensor)
+    assert metagraph.hotkeys == ["a", "b"]
+    assert metagraph.S.tolist() == [10.0, 2.0]
+    assert metagraph.validator_permit.tolist() == [True, False]
+    assert metagraph.n == 2 and metagraph.uids.tolist() == [0, 1]
+    assert metagraph.block == 100
+
+
+def test_refresh_reads_the_stake_of_changed_hotkeys():
+    subtensor = FakeSubtensor([("a", 10.0, True), ("b", 2.0, False)])
+    metagraph = LiteMetagraph(netuid=1).sync(subtensor)
+
+    subtensor.block = 101
+    subtensor.neurons = [
+        ("a", 11.0, True),
+        ("c", 5.0, True),
+        ("d", 0.0, False),
+    ]
+    metagraph.refresh(subtensor)
+    assert subtensor.syncs == 1
+    assert subtensor.stake_reads == ["c", "d"]
+    assert metagraph.hotkeys == ["a", "c", "d"]
+    # The stake of unchanged hotkeys waits for the next full sync, new hotkeys without stake have none.
+    assert metagraph.S.tolist() == [10.0, 5.0, 0.0]
+    assert metagraph.validator_permit.tolist() == [True, True, False]
+    assert metagraph.block == 101
+
+
+def test_refresh_falls_back_to_a_full_sync():
+    subtensor = FakeSubtensor([("a", 10.0, True)])
+    metagraph = LiteMetagraph(netuid=1, full_sync_interval=3).sync(subtensor)
+
+    subtensor.storage_error = RuntimeError("storage unavailable")
+    subtensor.neurons = [("a", 12.0, True)]
+    metagraph.refresh(subtensor)
+    assert subtensor.syncs == 2
+    assert metagraph.S.tolist() == [12.0]
+
+    subtensor.storage_error = None
+    metagraph.refresh(subtensor)
+    metagraph.refresh(subtensor)
+    assert subtensor.syncs == 2
+    metagraph.refresh(subtensor)
+    assert subtensor.syncs == 3
+
+
+def test_sync_matches_the_full_metagraph():
+    bt.MockSubtensor.reset()
+    subtensor = MockSubtensor(netuid=1, n=4)
+    metagraph = LiteMetagraph(netuid=1).sync(subtensor)
+    full = bt.metagraph(netuid=1, network="mock", sync=False)
+    full.sync(subtensor=subtensor)
+    assert metagraph.hotkeys == full.hotkeys
+    assert metagraph.S.tolist() == full.S.tolist()
+    assert (
+        metagraph.validator_permit.tolist() == full.validator_permit.tolist()
+    )
@@ -0,0 +1,90 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import os
+import time
+import pytest
+import asyncio
+
+from template.miner.pool import ForwardPool
+
+
+# Workers are spawned, so the pool functions must be importable module level functions.
+def init_fn():
+    return {"pid": os.getpid()}
+
+
+def forward_fn(state, request):
+    time.sleep(request.get("sleep", 0))
+    return {"pid": state["pid"], "value": request["value"] * 2}
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ForwardPool(init_fn, forward_fn, num_workers=1, max_queue=1)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+async def wait_until_released(pool, timeout=10):
+    deadline = time.monotonic() + timeout
+    while pool.pending and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_requests_run_in_the_initialized_worker(pool):
+    async def run():
+        return await asyncio.gather(
+            pool.run({"value": 1}), pool.run({"value": 2})
+        )
+
+    first, second = asyncio.run(run())
+    assert first["value"] == 2 and second["value"] == 4
+    # The worker state is built once and reused.
+    assert first["pid"] == second["pid"] != os.getpid()
+    assert pool.pending == 0
+
+
+def test_full_pool_rejects_requests(pool):
+    async def run():
+        running = asyncio.ensure_future(pool.run({"value": 1, "sleep": 0.5}))
+        queued = asyncio.ensure_future(pool.run({"value": 2}))
+        await asyncio.sleep(0)
+        assert pool.pending == 2
+        with pytest.raises(RuntimeError, match="full"):
+            await pool.run({"value": 3})
+        assert pool.pending == 2
+        return await asyncio.gather(running, queued)
+
+    assert [response["value"] for response in asyncio.run(run())] == [2, 4]
+    assert pool.pending == 0
+
+
+def test_cancelled_request_keeps_its_slot_until_the_worker_is_done(pool):
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                pool.run({"value": 1, "sleep": 0.5}), timeout=0.05
+            )
+        # The worker is still busy with the cancelled request.
+        assert pool.pending == 1
+        await wait_until_released(pool)
+        assert pool.pending == 0
+        return await pool.run({"value": 2})
+
+    assert asyncio.run(run())["value"] == 4
@@ -0,0 +1,123 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import torch
+import numpy as np
+
+from template.validator.scores import (
+    NumpyScoreBackend,
+    RewardBuffer,
+    TorchScoreBackend,
+)
+
+
+def run_updates(backend, steps, n=256, k=16, alpha=0.1, seed=0):
+    generator = np.random.default_rng(seed)
+    scores = backend.zeros(n)
+    for _ in range(steps):
+        uids = generator.choice(n, size=k, replace=False)
+        rewards = generator.random(k, dtype=np.float32)
+        rewards[0] = np.nan
+        scores = backend.update(
+            scores, uids.tolist(), torch.from_numpy(rewards), alpha
+        )
+    return scores
+
+
+def test_backends_compute_identical_scores():
+    numpy_scores = run_updates(NumpyScoreBackend(), steps=200)
+    torch_scores = run_updates(TorchScoreBackend("cpu"), steps=200)
+    assert numpy_scores.dtype == np.float32
+    assert np.array_equal(numpy_scores, torch_scores.numpy())
+    assert not np.isnan(numpy_scores).any()
+
+
+def test_backends_resize_identically():
+    for backend in [NumpyScoreBackend(), TorchScoreBackend("cpu")]:
+        scores = backend.array([1.0, 2.0, 3.0])
+        resized = backend.resize(scores, 5, keep=2)
+        assert np.array_equal(
+            np.asarray(backend.to_torch(resized)), [1.0, 2.0, 0.0, 0.0, 0.0]
+        )
+
+
+def test_state_can_be_loaded_by_either_backend(tmp_path):
+    state = {
+        "step": 7,
+        "scores": np.array([0.5, 0.25], dtype=np.float32),
+        "hotkeys": ["a", "b"],
+    }
+    NumpyScoreBackend().save(str(tmp_path), state)
+    loaded = TorchScoreBackend("cpu").load(str(tmp_path))
+    assert loaded["step"] == 7
+    assert loaded["hotkeys"] == ["a", "b"]
+    assert torch.equal(loaded["scores"], torch.tensor([0.5, 0.25]))
+
+    other = tmp_path / "torch"
+    other.mkdir()
+    TorchScoreBackend("cpu").save(str(other), loaded)
+    loaded = NumpyScoreBackend().load(str(other))
+    assert np.array_equal(loaded["scores"], state["scores"])
+    assert loaded["step"] == 7
+
+
+def test_reward_buffer_matches_sequential_updates():
+    generator = np.random.default_rng(1)
+    batches = []
+    for _ in range(8):
+        # Overlapping forwards reward the same uids, and a batch can repeat a uid.
+        uids = generator.choice(32, size=12).tolist()
+        batches.append((uids, generator.random(12, dtype=np.float32)))
+    batches[3][1][0] = np.nan
+
+    for backend in [NumpyScoreBackend(), TorchScoreBackend("cpu")]:
+        expected = np.linspace(0, 1, 32)
+        for uids, rewards in batches:
+            for uid, reward in zip(uids, np.nan_to_num(rewards)):
+                expected[uid] = 0.1 * reward + 0.9 * expected[uid]
+
+        buffer = RewardBuffer()
+        for uids, rewards in batches:
+            buffer.append(uids, torch.from_numpy(rewards))
+        scores = buffer.flush(
+            backend, backend.array(np.linspace(0, 1, 32)), 0.1
+        )
+        assert len(buffer) == 0
+        assert buffer.flushes == 1
+        assert np.allclose(
+            backend.to_torch(scores).numpy(), expected, atol=1e-6
+        )
+
+
+def test_empty_reward_buffer_keeps_scores():
+    backend = NumpyScoreBackend()
+    scores = backend.array([0.5, 0.25])
+    assert RewardBuffer().flush(backend, scores, 0.1) is scores
+
+
+def test_backends_normalize_like_torch():
+    scores = np.random.default_rng(2).random(256, dtype=np.float32)
+    expected = torch.nn.functional.normalize(
+        torch.from_numpy(scores), p=1, dim=0
+    )
+    for backend in [NumpyScoreBackend(), TorchScoreBackend("cpu")]:
+        normalized = backend.normalize(backend.array(scores))
+        assert np.allclose(
+            backend.to_torch(normalized).numpy(), expected.numpy(), rtol=1e-6
+        )
+        zeros = backend.normalize(backend.zeros(4))
+        assert not backend.to_torch(zeros).any()
@@ -0,0 +1,121 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import sys
+import torch
+import threading
+import bittensor as bt
+
+from neurons.miner import Miner
+from template.mock import MockMetagraph, MockSubtensor
+from template.utils.snapshot import MetagraphReconciler, MetagraphSnapshots
+
+
+def make_metagraph(block, n):
+    metagraph = bt.metagraph(netuid=1, network="mock", sync=False)
+    metagraph.block = torch.nn.Parameter(
+        torch.tensor(block), requires_grad=False
+    )
+    metagraph.n = torch.nn.Parameter(torch.tensor(n), requires_grad=False)
+    metagraph.uids = torch.nn.Parameter(torch.arange(n), requires_grad=False)
+    return metagraph
+
+
+def test_snapshots_are_versioned_by_block(tmp_path):
+    snapshots = MetagraphSnapshots(str(tmp_path / "metagraph"), keep=2)
+    assert snapshots.latest_block() is None
+    assert not snapshots.load(make_metagraph(0, 0))
+
+    for block in [100, 300, 200]:
+        snapshots.save(make_metagraph(block, block // 100))
+    assert snapshots.blocks() == [200, 300]
+
+    metagraph = make_metagraph(0, 0)
+    assert snapshots.load(metagraph)
+    assert int(metagraph.block) == 300
+    assert int(metagraph.n) == 3
+
+
+def test_reconciler_saves_the_fresh_metagraph(tmp_path):
+    snapshots = MetagraphSnapshots(str(tmp_path / "metagraph"))
+    snapshots.save(make_metagraph(100, 1))
+
+    reconciler = MetagraphReconciler(snapshots, lambda: make_metagraph(150, 2))
+    reconciler.start()
+    assert reconciler.wait(5)
+    assert reconciler.succeeded
+    assert snapshots.latest_block() == 150
+
+    def fail():
+        raise RuntimeError("unreachable")
+
+    reconciler = MetagraphReconciler(snapshots, fail)
+    reconciler.start()
+    assert reconciler.wait(5)
+    assert not reconciler.succeeded
+    assert snapshots.latest_block() == 150
+
+
+class ChainAtBlock(MockSubtensor):
+    def get_current_block(self):
+        return 1000
+
+
+class SnapshotMiner(Miner):
+    """Warm starts from a snapshot of block 500, while the chain is at block 1000."""
+
+    fetched = threading.Event()
+
+    def load_metagraph(self):
+        metagraph = MockMetagraph(self.config.netuid, subtensor=self.subtensor)
+        metagraph.block = torch.nn.Parameter(
+            torch.tensor(500), requires_grad=False
+        )
+        self.metagraph_snapshots.save(metagraph)
+        return self.load_metagraph_snapshot()
+
+    def fetch_metagraph(self):
+        # Still fetching while the test runs.
+        self.fetched.wait(5)
+        raise RuntimeError("unreachable")
+
+
+def test_miner_schedules_syncs_from_the_chain_after_a_stale_snapshot(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(sys, "argv", ["miner"])
+    config = SnapshotMiner.config()
+    config.mock = True
+    config.axon.external_ip = "127.0.0.1"
+    config.axon.port = 18291
+    config.logging.logging_dir = str(tmp_path)
+    # The mock chain state is shared by all mock subtensors in the process.
+    bt.MockSubtensor.reset()
+    subtensor = ChainAtBlock(
+        config.netuid, wallet=bt.MockWallet(config=config)
+    )
+
+    miner = SnapshotMiner(config=config, subtensor=subtensor)
+    try:
+        assert int(miner.metagraph.block) == 500
+        assert miner.metagraph_reconciler is not None
+        # The next sync is one epoch after the current block, not after the block of the snapshot.
+        assert miner.last_sync_block == 1000
+        assert not miner.should_sync_metagraph()
+        assert not miner.metagraph_sync_due()
+    finally:
+        SnapshotMiner.fetched.set()
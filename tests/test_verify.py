@@ -0,0 +1,153 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import pytest
+
+from types import SimpleNamespace
+
+from template.miner.verify import VerificationCache
+
+SECOND = 1_000_000_000
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000 * SECOND
+
+    def __call__(self):
+        return self.now
+
+
+def request(nonce, hotkey="validator", uuid="endpoint", body_hash="body"):
+    return SimpleNamespace(
+        dendrite=SimpleNamespace(
+            hotkey=hotkey, uuid=uuid, nonce=nonce, signature="signature"
+        ),
+        computed_body_hash=body_hash,
+    )
+
+
+def make_cache(timer, **kwargs):
+    return VerificationCache(
+        verify_signature=lambda hotkey, message, signature: True,
+        timer=timer,
+        **kwargs,
+    )
+
+
+def test_replay_is_rejected():
+    timer = FakeTimer()
+    cache = make_cache(timer, window=60)
+    cache.verify(request(timer.now), "miner")
+    with pytest.raises(Exception, match="already received"):
+        cache.verify(request(timer.now), "miner")
+    assert cache.stats()["replays"] == 1
+
+
+def test_nonce_must_increase_per_endpoint():
+    timer = FakeTimer()
+    cache = make_cache(timer, window=60)
+    cache.verify(request(timer.now, body_hash="a"), "miner")
+    with pytest.raises(Exception, match="too small"):
+        cache.verify(request(timer.now - SECOND, body_hash="b"), "miner")
+    # Other endpoints keep their own nonces.
+    cache.verify(request(timer.now - SECOND, uuid="other"), "miner")
+
+
+def test_nonce_outside_window_is_rejected():
+    timer = FakeTimer()
+    cache = make_cache(timer, window=60, clock_skew=4)
+    with pytest.raises(Exception, match="too old"):
+        cache.verify(request(timer.now - 61 * SECOND), "miner")
+    with pytest.raises(Exception, match="future"):
+        cache.verify(request(timer.now + 5 * SECOND), "miner")
+    cache.verify(request(timer.now + 3 * SECOND), "miner")
+    assert cache.stats()["stale_nonces"] == 2
+
+
+def test_expired_request_is_not_replayable():
+    timer = FakeTimer()
+    cache = make_cache(timer, window=60, max_endpoints=1)
+    nonce = timer.now
+    cache.verify(request(nonce), "miner")
+    # The endpoint nonce is forgotten and the request expires from the window.
+    cache.verify(request(nonce, uuid="other"), "miner")
+    timer.now += 61 * SECOND
+    with pytest.raises(Exception, match="too old"):
+        cache.verify(request(nonce), "miner")
+
+
+def test_bad_signature_is_rejected():
+    timer = FakeTimer()
+    cache = VerificationCache(
+        verify_signature=lambda hotkey, message, signature: False,
+        timer=timer,
+    )
+    with pytest.raises(Exception, match="Signature mismatch"):
+        cache.verify(request(timer.now), "miner")
+    assert cache.stats()["bad_signatures"] == 1
+    assert cache.stats()["accepted"] == 0
+    assert len(cache) == 0
+
+
+def test_signature_covers_request():
+    timer = FakeTimer()
+    messages = []
+    cache = VerificationCache(
+        verify_signature=lambda hotkey, message, signature: messages.append(
+            (hotkey, message, signature)
+        )
+        or True,
+        timer=timer,
+    )
+    cache.verify(request(timer.now), "miner")
+    assert messages == [
+        (
+            "validator",
+            f"{timer.now}.validator.miner.endpoint.body",
+            "signature",
+        )
+    ]
+
+
+def test_memory_bound_rejects_dropped_requests():
+    timer = FakeTimer()
+    cache = make_cache(
+        timer, window=80, num_buckets=8, max_entries=4, max_endpoints=1
+    )
+    nonces = [timer.now - (40 - 10 * i) * SECOND for i in range(5)]
+    for i, nonce in enumerate(nonces):
+        cache.verify(request(nonce, uuid=str(i)), "miner")
+        assert len(cache) <= 4
+
+    # The oldest request was dropped to bound memory, it is rejected even though its endpoint nonce is forgotten
+    # and it is still within the window.
+    with pytest.raises(Exception, match="too old"):
+        cache.verify(request(nonces[0], uuid="0"), "miner")
+    with pytest.raises(Exception, match="already received"):
+        cache.verify(request(nonces[1], uuid="1"), "miner")
+    assert cache.stats()["endpoints"] == 1
+
+
+def test_expired_buckets_are_dropped():
+    timer = FakeTimer()
+    cache = make_cache(timer, window=60, max_endpoints=1)
+    for i in range(10):
+        cache.verify(request(timer.now, uuid=str(i)), "miner")
+        timer.now += 10 * SECOND
+    assert len(cache) <= 7
+    assert cache.stats()["accepted"] == 10
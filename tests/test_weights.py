@@ -0,0 +1,329 @@
+# The MIT License (MIT)
+# Copyright © 2023 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+import torch
+import pytest
+import numpy as np
+import bittensor as bt
+
+from template.validator.weights import (
+    SubnetHyperparameters,
+    convert_weights_and_uids_for_emit,
+    normalize_max_weight,
+    process_weights,
+    weights_change,
+    WeightSubmitter,
+)
+
+
+class FakeSubtensor:
+    def __init__(self, min_allowed_weights, max_weight_limit, failures=0):
+        self._min_allowed_weights = min_allowed_weights
+        self._max_weight_limit = max_weight_limit
+        self.failures = failures
+        self.reads = 0
+        self.calls = []
+
+    def min_allowed_weights(self, netuid):
+        self.reads += 1
+        return self._min_allowed_weights
+
+    def max_weight_limit(self, netuid):
+        self.reads += 1
+        return self._max_weight_limit
+
+    def set_weights(self, uids, weights, **kwargs):
+        self.calls.append((uids, weights))
+        if len(self.calls) <= self.failures:
+            return False, "rate limited"
+        return True, ""
+
+    def get_current_block(self):
+        return 1000 + len(self.calls)
+
+
+class FakeMetagraph:
+    def __init__(self, n):
+        self.n = torch.nn.Parameter(torch.tensor(n), requires_grad=False)
+
+
+def make_weights(n, zeros, seed):
+    generator = torch.Generator().manual_seed(seed)
+    weights = torch.rand(n, generator=generator)
+    weights[torch.randperm(n, generator=generator)[:zeros]] = 0
+    return torch.nn.functional.normalize(weights, p=1, dim=0)
+
+
+CASES = [
+    # n, number of zero weights, min_allowed_weights, max_weight_limit
+    (256, 0, 8, 455 / 65535),
+    (256, 100, 8, 0.1),
+    (256, 250, 8, 0.1),
+    (256, 256, 8, 0.1),
+    (64, 10, 128, 0.1),
+    (1024, 3, 16, 0.05),
+    (16, 0, 1, 1.0),
+]
+
+
+@pytest.mark.parametrize(
+    "n, zeros, min_allowed_weights, max_weight_limit", CASES
+)
+@pytest.mark.parametrize("seed", range(5))
+def test_pipeline_matches_bittensor(
+    n, zeros, min_allowed_weights, max_weight_limit, seed
+):
+    uids = torch.arange(n)
+    weights = make_weights(n, zeros, seed)
+    subtensor = FakeSubtensor(min_allowed_weights, max_weight_limit)
+    metagraph = FakeMetagraph(n)
+
+    (
+        expected_uids,
+        expected_weights,
+    ) = bt.utils.weight_utils.process_weights_for_netuid(
+        uids=uids,
+        weights=weights,
+        netuid=1,
+        subtensor=subtensor,
+        metagraph=metagraph,
+    )
+    processed_uids, processed_weights = process_weights(
+        uids=uids,
+        weights=weights,
+        n=metagraph.n,
+        min_allowed_weights=min_allowed_weights,
+        max_weight_limit=max_weight_limit,
+    )
+    assert torch.equal(processed_uids, expected_uids)
+    assert torch.equal(processed_weights, expected_weights)
+
+    assert convert_weights_and_uids_for_emit(
+        processed_uids, processed_weights
+    ) == bt.utils.weight_utils.convert_weights_and_uids_for_emit(
+        expected_uids, expected_weights
+    )
+
+
+@pytest.mark.parametrize("zeros", [256, 250, 0])
+def test_process_weights_accepts_an_int_n(zeros):
+    uids = torch.arange(256)
+    weights = make_weights(256, zeros, seed=0)
+    expected = process_weights(
+        uids=uids,
+        weights=weights,
+        n=FakeMetagraph(256).n,
+        min_allowed_weights=8,
+        max_weight_limit=0.1,
+    )
+    processed = process_weights(
+        uids=uids,
+        weights=weights,
+        n=256,
+        min_allowed_weights=8,
+        max_weight_limit=0.1,
+    )
+    assert torch.equal(processed[0], expected[0])
+    assert torch.equal(processed[1], expected[1])
+
+
+@pytest.mark.parametrize("limit", [0.01, 0.05, 0.1, 0.5])
+def test_normalize_max_weight_matches_bittensor(limit):
+    x = make_weights(500, 50, seed=0) ** 3
+    assert torch.equal(
+        normalize_max_weight(x, limit),
+        bt.utils.weight_utils.normalize_max_weight(x, limit),
+    )
+
+
+def test_negative_weights_are_rejected():
+    with pytest.raises(ValueError):
+        convert_weights_and_uids_for_emit(
+            torch.arange(2), torch.tensor([0.5, -0.5])
+        )
+
+
+def test_hyperparameters_are_read_once_per_ttl():
+    subtensor = FakeSubtensor(8, 0.1)
+    hyperparameters = SubnetHyperparameters(subtensor, netuid=1, ttl=60)
+    for _ in range(10):
+        assert hyperparameters.min_allowed_weights == 8
+        assert hyperparameters.max_weight_limit == 0.1
+    assert subtensor.reads == 2
+    hyperparameters.clear()
+    assert hyperparameters.min_allowed_weights == 8
+    assert subtensor.reads == 3
+
+
+def test_weights_change_is_the_fraction_of_moved_mass():
+    assert weights_change([0, 1], [100, 100], [0, 1], [200, 200]) == 0.0
+    assert weights_change([0, 1], [100, 100], [1, 2], [100, 100]) == 0.5
+    assert weights_change([0], [100], [1], [100]) == 1.0
+
+
+def submit_and_wait(submitter, weights):
+    submitter.submit(torch.arange(len(weights)), torch.tensor(weights))
+    deadline = time.monotonic() + 5
+    while submitter.busy and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_submitter_skips_unchanged_weights():
+    subtensor = FakeSubtensor(1, 1.0)
+    set_count = []
+    submitter = WeightSubmitter(
+        subtensor,
+        wallet=None,
+        netuid=1,
+        metagraph=FakeMetagraph(4),
+        version_key=0,
+        change_threshold=0.01,
+        on_success=set_count.append,
+    )
+    submitter.start()
+    try:
+        submit_and_wait(submitter, [0.1, 0.2, 0.3, 0.4])
+        submit_and_wait(submitter, [0.1, 0.2, 0.3, 0.4])
+        submit_and_wait(submitter, [0.1, 0.2, 0.301, 0.399])
+        submit_and_wait(submitter, [0.4, 0.3, 0.2, 0.1])
+    finally:
+        submitter.stop()
+
+    assert len(subtensor.calls) == 2
+    assert submitter.stats()["skipped"] == 2
+    assert submitter.stats()["successes"] == 2
+    assert set_count == [1001, 1001, 1001, 1002]
+
+    submitter.max_staleness = 0
+    assert submitter.should_set(*subtensor.calls[-1])
+
+
+def make_submitter(subtensor, **kwargs):
+    return WeightSubmitter(
+        subtensor,
+        wallet=None,
+        netuid=1,
+        metagraph=FakeMetagraph(4),
+        version_key=0,
+        **kwargs,
+    )
+
+
+def test_submitter_retries_with_backoff():
+    subtensor = FakeSubtensor(1, 1.0, failures=2)
+    blocks = []
+    submitter = make_submitter(
+        subtensor, initial_backoff=0.05, window=5, on_success=blocks.append
+    )
+    submitter.start()
+    try:
+        start_time = time.monotonic()
+        submit_and_wait(submitter, [0.1, 0.2, 0.3, 0.4])
+        elapsed = time.monotonic() - start_time
+    finally:
+        submitter.stop()
+
+    stats = submitter.stats()
+    assert len(subtensor.calls) == 3
+    assert stats["retries"] == 2
+    assert stats["successes"] == 1
+    assert stats["failures"] == 0
+    assert blocks == [1003]
+    # Waited 0.05s, then 0.1s.
+    assert elapsed >= 0.15
+
+
+def test_submitter_gives_up_after_the_window():
+    subtensor = FakeSubtensor(1, 1.0, failures=100)
+    blocks = []
+    submitter = make_submitter(
+        subtensor,
+        initial_backoff=0.02,
+        max_backoff=0.02,
+        window=0.1,
+        on_success=blocks.append,
+    )
+    submitter.start()
+    try:
+        submit_and_wait(submitter, [0.1, 0.2, 0.3, 0.4])
+    finally:
+        submitter.stop()
+
+    stats = submitter.stats()
+    assert stats["failures"] == 1
+    assert stats["successes"] == 0
+    assert 2 <= stats["attempts"] <= 6
+    assert submitter.last_error == "rate limited"
+    assert blocks == []
+
+
+def test_submitter_accepts_numpy_arrays():
+    subtensor = FakeSubtensor(1, 1.0)
+    submitter = make_submitter(subtensor)
+    submitter.start()
+    try:
+        submitter.submit(
+            np.arange(4), np.array([0.1, 0.2, 0.3, 0.4], dtype=np.float32)
+        )
+        deadline = time.monotonic() + 5
+        while submitter.busy and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        submitter.stop()
+
+    assert subtensor.calls == [([0, 1, 2, 3], [16384, 32768, 49151, 65535])]
+
+
+def test_retry_sends_the_newest_vector():
+    subtensor = FakeSubtensor(1, 1.0, failures=1)
+    submitter = make_submitter(subtensor, initial_backoff=0.2, window=5)
+    submitter.start()
+    try:
+        submitter.submit(torch.arange(4), torch.tensor([0.1, 0.2, 0.3, 0.4]))
+        deadline = time.monotonic() + 5
+        while not subtensor.calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Submitted while the first vector waits for its retry.
+        submit_and_wait(submitter, [0.4, 0.3, 0.2, 0.1])
+    finally:
+        submitter.stop()
+
+    assert len(subtensor.calls) == 2
+    assert subtensor.calls[0][1] == [16384, 32768, 49151, 65535]
+    assert subtensor.calls[1][1] == [65535, 49151, 32768, 16384]
+    assert submitter.stats()["superseded"] == 1
+    assert submitter.stats()["successes"] == 1
+
+
+def test_unchanged_weights_are_set_again_once_stale():
+    subtensor = FakeSubtensor(1, 1.0)
+    submitter = make_submitter(
+        subtensor, change_threshold=0.5, max_staleness=0.1
+    )
+    submitter.start()
+    try:
+        submit_and_wait(submitter, [0.1, 0.2, 0.3, 0.4])
+        submit_and_wait(submitter, [0.1, 0.2, 0.3, 0.4])
+        assert len(subtensor.calls) == 1
+        time.sleep(0.15)
+        submit_and_wait(submitter, [0.1, 0.2, 0.3, 0.4])
+    finally:
+        submitter.stop()
+
+    assert len(subtensor.calls) == 2
+    assert submitter.stats()["skipped"] == 1